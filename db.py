@@ -1,5 +1,6 @@
 import duckdb
 import logging
+import threading
 
 DB_FILE = "data/budget.duckdb"
 
@@ -29,10 +30,28 @@ def get_db():
     """
     return duckdb.connect(DB_FILE)
 
+# -----------------------------
+# Ledger version
+# -----------------------------
+# In-process counter bumped by every write that changes what read models
+# (dashboard snapshot) show. Caches key on it instead of re-scanning.
+_ledger_version = 0
+_ledger_version_lock = threading.Lock()
+
+def bump_ledger_version():
+    global _ledger_version
+    with _ledger_version_lock:
+        _ledger_version += 1
+
+def get_ledger_version():
+    return _ledger_version
+
 # -----------------------------
 # Initialize database schema
 # -----------------------------
 def init_db():
+    from repositories.spend_rollup_repository import rebuild_rollup
+
     conn = get_db()
     try:
         # Accounts table
@@ -81,6 +100,39 @@ def init_db():
         """)
         log_info("Transactions backfilled with reconciliation defaults.")
 
+        # 64-bit duplicate-detection key over the unique columns; every write of
+        # account_id/date/description/amount sets it (rows missed are backfilled here)
+        conn.execute("""
+        CREATE OR REPLACE MACRO tx_fingerprint(account_id, date, description, amount) AS
+            md5_number_lower(concat_ws(chr(31), account_id::VARCHAR, date::DATE::VARCHAR,
+                                       amount::DOUBLE::VARCHAR, description));
+        """)
+        conn.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS fingerprint UBIGINT")
+        conn.execute("""
+        UPDATE transactions
+        SET fingerprint = tx_fingerprint(account_id, date, description, amount)
+        WHERE fingerprint IS NULL;
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tx_fingerprint ON transactions(fingerprint);")
+        log_info("Transaction fingerprints ensured.")
+
+        # Padded-trigram Jaccard similarity, as merchant_clustering.trigram_similarity
+        # computes it in Python; fuzzy search scores merchants with it in SQL
+        conn.execute("""
+        CREATE OR REPLACE MACRO trigrams(s) AS
+            list_distinct(list_transform(range(length(s) + 1), i -> substr('  ' || s || ' ', i + 1, 3)));
+        """)
+        conn.execute("""
+        CREATE OR REPLACE MACRO trigram_similarity(a, b) AS
+            len(list_intersect(trigrams(a), trigrams(b))) / len(list_distinct(list_concat(trigrams(a), trigrams(b))));
+        """)
+
+        # Provenance: the ingestion run that inserted a row (NULL for manual entries
+        # and rows imported before runs were tracked); undo deletes by it
+        conn.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS ingestion_run_id BIGINT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tx_ingestion_run ON transactions(ingestion_run_id);")
+        log_info("Transaction ingestion run provenance ensured.")
+
         # Category rules table
         conn.execute("CREATE SEQUENCE IF NOT EXISTS category_rules_id_seq;")
 
@@ -116,8 +168,92 @@ def init_db():
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         """)
+        # Background ingestion jobs share the run row; pre-existing runs were synchronous
+        for column, ddl in [
+            ("status", "VARCHAR DEFAULT 'completed'"),  # queued | parsing | matching | inserting | awaiting_review | completed | duplicate | failed | undone
+            ("mode", "VARCHAR"),                         # direct | reconcile | bulk
+            ("account_id", "BIGINT"),
+            ("upload_path", "VARCHAR"),
+            ("bytes_total", "BIGINT DEFAULT 0"),
+            ("bytes_processed", "BIGINT DEFAULT 0"),
+            ("rows_parsed", "INTEGER DEFAULT 0"),
+            ("rows_matched", "INTEGER DEFAULT 0"),
+            ("review_session_id", "VARCHAR"),
+            ("error", "VARCHAR"),
+            ("started_at", "TIMESTAMP"),
+            ("updated_at", "TIMESTAMP"),
+            ("finished_at", "TIMESTAMP"),
+            # Diagnostics: rows read and wall time (ms) per ingest phase
+            ("row_count", "INTEGER DEFAULT 0"),
+            ("decode_ms", "DOUBLE"),
+            ("parse_ms", "DOUBLE"),
+            ("normalize_ms", "DOUBLE"),
+            ("categorize_ms", "DOUBLE"),
+            ("match_ms", "DOUBLE"),
+            ("write_ms", "DOUBLE"),
+            ("total_ms", "DOUBLE"),
+            ("profile", "VARCHAR"),                      # bank format profile requested or sniffed
+            ("content_hash", "VARCHAR"),                 # sha256 of the uploaded file
+            ("batch_id", "VARCHAR"),                     # files uploaded together (multi-file / ZIP)
+            ("duplicate_of", "BIGINT"),                  # 'duplicate' runs: the run that imported the same file
+        ]:
+            conn.execute(f"ALTER TABLE ingestion_runs ADD COLUMN IF NOT EXISTS {column} {ddl}")
+        # Re-upload placeholders used to be stored as 'completed'
+        conn.execute("""
+        UPDATE ingestion_runs
+        SET status = 'duplicate',
+            duplicate_of = TRY_CAST(regexp_extract(error, '\\(run (\\d+)\\)', 1) AS BIGINT)
+        WHERE status = 'completed'
+          AND duplicate_of IS NULL
+          AND error LIKE 'Identical file already imported (run %'
+        """)
         log_info("Ingestion runs table ensured.")
 
+        # Rows an ingest run skipped, one compact row each (replaces per-row log lines)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_rejections (
+            run_id BIGINT NOT NULL,
+            row_number INTEGER,          -- 1-based data row in the file; NULL for file-level errors
+            reason VARCHAR NOT NULL
+        );
+        """)
+        log_info("Ingestion rejections table ensured.")
+
+        # Fingerprints of raw CSV rows already ingested (see services.csv_ingest_service),
+        # each with the tx_fingerprint of the ledger row it became; a raw row only
+        # counts as imported while that ledger row exists
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_row_fingerprints (
+            run_id BIGINT NOT NULL,
+            fingerprint BIGINT NOT NULL
+        );
+        """)
+        conn.execute("ALTER TABLE ingestion_row_fingerprints ADD COLUMN IF NOT EXISTS tx_fingerprint UBIGINT")
+        # Older entries cannot be checked against the ledger; they are only a shortcut
+        conn.execute("DELETE FROM ingestion_row_fingerprints WHERE tx_fingerprint IS NULL")
+        log_info("Ingestion row fingerprints table ensured.")
+
+        # Prior values of existing rows a reconciliation run rewrote, so undo can restore them
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingestion_run_revisions (
+            run_id BIGINT NOT NULL,
+            transaction_id BIGINT NOT NULL,
+            date DATE,
+            description TEXT,
+            amount DOUBLE,
+            balance DOUBLE,
+            source TEXT,
+            source_id TEXT,
+            reconciliation_status TEXT,
+            merchant_id BIGINT,
+            merchant_normalized TEXT,
+            recurring_event_id BIGINT,
+            fingerprint UBIGINT,
+            PRIMARY KEY (run_id, transaction_id)
+        );
+        """)
+        log_info("Ingestion run revisions table ensured.")
+
         # Indexes
         conn.execute("CREATE INDEX IF NOT EXISTS idx_tx_account_date ON transactions(account_id, date);")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_tx_category ON transactions(category);")
@@ -154,18 +290,12 @@ def init_db():
         log_info("Recurring transactions table ensured.")
 
         # Migration: add allow_consume to recurring_events
-        try:
-            conn.execute("ALTER TABLE recurring_events ADD COLUMN allow_consume BOOLEAN DEFAULT TRUE")
-            log_info("Added allow_consume column to recurring_events.")
-        except Exception:
-            conn.rollback()  # reset aborted transaction so subsequent statements can run
+        conn.execute("ALTER TABLE recurring_events ADD COLUMN IF NOT EXISTS allow_consume BOOLEAN DEFAULT TRUE")
+        log_info("allow_consume column on recurring_events ensured.")
 
         # Migration: add recurring_event_id to transactions
-        try:
-            conn.execute("ALTER TABLE transactions ADD COLUMN recurring_event_id BIGINT")
-            log_info("Added recurring_event_id column to transactions.")
-        except Exception:
-            conn.rollback()  # reset aborted transaction so subsequent statements can run
+        conn.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS recurring_event_id BIGINT")
+        log_info("recurring_event_id column on transactions ensured.")
 
         # AI category suggestions cache table
         conn.execute("""
@@ -177,7 +307,132 @@ def init_db():
         );
         """)
         log_info("AI category suggestions table ensured.")
-    
+
+        # AI categorization background jobs
+        conn.execute("CREATE SEQUENCE IF NOT EXISTS ai_jobs_id_seq;")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS ai_jobs (
+            id BIGINT PRIMARY KEY DEFAULT nextval('ai_jobs_id_seq'),
+            status VARCHAR NOT NULL DEFAULT 'queued',  -- queued | running | completed | cancelled | failed
+            batch_size INTEGER NOT NULL,
+            total_merchants INTEGER NOT NULL DEFAULT 0,
+            merchants_processed INTEGER NOT NULL DEFAULT 0,
+            transactions_updated INTEGER NOT NULL DEFAULT 0,
+            cache_hits INTEGER NOT NULL DEFAULT 0,
+            ai_calls INTEGER NOT NULL DEFAULT 0,
+            failure_count INTEGER NOT NULL DEFAULT 0,
+            last_merchant TEXT,                        -- checkpoint cursor (keyset on merchant_normalized)
+            cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+        """)
+        log_info("AI jobs table ensured.")
+
+        # AI negative cache: merchants the model answered outside the allowed set
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS ai_negative_cache (
+            merchant_normalized TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        log_info("AI negative cache table ensured.")
+
+        # AI categorization instrumentation (one row per lookup / Ollama call)
+        conn.execute("CREATE SEQUENCE IF NOT EXISTS ai_metrics_id_seq;")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS ai_metrics (
+            id BIGINT PRIMARY KEY DEFAULT nextval('ai_metrics_id_seq'),
+            event VARCHAR NOT NULL,       -- rule | cache_hit | negative_cache_hit | ai_call
+            model TEXT,
+            outcome VARCHAR,              -- ok | invalid | http_error | timeout | error
+            http_status INTEGER,
+            connect_ms DOUBLE,            -- request sent -> response headers
+            ttft_ms DOUBLE,               -- request sent -> first generated token
+            total_ms DOUBLE,
+            prompt_tokens INTEGER,
+            response_tokens INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_metrics_created ON ai_metrics(created_at);")
+        log_info("AI metrics table ensured.")
+
+        # Merchant dimension: interns merchant_normalized to integer ids
+        conn.execute("CREATE SEQUENCE IF NOT EXISTS merchants_id_seq;")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS merchants (
+            id BIGINT PRIMARY KEY DEFAULT nextval('merchants_id_seq'),
+            merchant_normalized TEXT NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        log_info("Merchants table ensured.")
+
+        # Backfill: intern existing merchant names and link transactions to them
+        conn.execute("""
+        INSERT INTO merchants (merchant_normalized)
+        SELECT DISTINCT merchant_normalized
+        FROM transactions
+        WHERE merchant_normalized IS NOT NULL
+          AND merchant_normalized != ''
+          AND merchant_id IS NULL
+        ON CONFLICT (merchant_normalized) DO NOTHING;
+        """)
+        conn.execute("""
+        UPDATE transactions
+        SET merchant_id = m.id
+        FROM merchants m
+        WHERE transactions.merchant_normalized = m.merchant_normalized
+          AND transactions.merchant_id IS NULL;
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tx_merchant_id ON transactions(merchant_id);")
+        log_info("Transactions backfilled with merchant_id.")
+
+        # Monthly category spend rollup, maintained incrementally by ledger writes
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS category_month_spend (
+            account_id BIGINT NOT NULL,
+            month DATE NOT NULL,                 -- first day of month
+            category TEXT NOT NULL,              -- '' for uncategorized
+            total_amount DOUBLE NOT NULL DEFAULT 0,
+            income DOUBLE NOT NULL DEFAULT 0,
+            expenses DOUBLE NOT NULL DEFAULT 0,  -- negative, like amount
+            tx_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (account_id, month, category)
+        );
+        """)
+        rollup_empty = conn.execute("SELECT COUNT(*) FROM category_month_spend").fetchone()[0] == 0
+        if rollup_empty:
+            rebuild_rollup(conn)
+        log_info("Category month spend rollup ensured.")
+
+        # Budget threshold alerts (outbox for Telegram; one row per category/month/threshold)
+        conn.execute("CREATE SEQUENCE IF NOT EXISTS budget_alerts_id_seq;")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS budget_alerts (
+            id BIGINT PRIMARY KEY DEFAULT nextval('budget_alerts_id_seq'),
+            category TEXT NOT NULL,
+            month DATE NOT NULL,
+            threshold_pct INTEGER NOT NULL,
+            spent DOUBLE NOT NULL,
+            budget DOUBLE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP,
+            UNIQUE (category, month, threshold_pct)
+        );
+        """)
+        # Failed deliveries; an alert is given up after BUDGET_ALERT_MAX_ATTEMPTS
+        conn.execute("ALTER TABLE budget_alerts ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 0")
+        conn.execute("ALTER TABLE budget_alerts ADD COLUMN IF NOT EXISTS last_error VARCHAR")
+        # Chats that already received an alert, so a retry only goes to the others
+        conn.execute("ALTER TABLE budget_alerts ADD COLUMN IF NOT EXISTS delivered_chats VARCHAR[]")
+        log_info("Budget alerts table ensured.")
+
     except Exception as e:
             log_error(f"Error initializing DB: {e}")
     finally:
@@ -35,3 +35,11 @@ async def startup_event():
     t.start()
     print("Telegram bot thread launched.", flush=True)
 
+    from services.ai_job_service import start_ai_job_worker
+    threading.Thread(target=start_ai_job_worker, daemon=True).start()
+    print("AI job worker thread launched.", flush=True)
+
+    from services.ingestion_job_service import start_ingestion_worker
+    threading.Thread(target=start_ingestion_worker, daemon=True).start()
+    print("Ingestion worker thread launched.", flush=True)
+
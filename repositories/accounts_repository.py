@@ -46,3 +46,27 @@ def list_accounts():
         return [{"id": r[0], "account_name": r[1]} for r in rows]
     finally:
         conn.close()
+
+
+def get_or_create_account_ids(conn, account_names) -> dict[str, int]:
+    """
+    Batch form of get_or_create_account on a caller-owned connection:
+    returns {account_name: id}, creating missing accounts.
+    """
+    names = sorted({n for n in account_names if n})
+    if not names:
+        return {}
+    conn.execute(
+        """
+        INSERT INTO accounts (id, account_name)
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM accounts) + row_number() OVER (ORDER BY name), name
+        FROM (SELECT unnest(?::VARCHAR[]) AS name)
+        WHERE name NOT IN (SELECT account_name FROM accounts)
+        """,
+        [names],
+    )
+    rows = conn.execute(
+        "SELECT account_name, id FROM accounts WHERE account_name IN (SELECT unnest(?::VARCHAR[]))",
+        [names],
+    ).fetchall()
+    return {r[0]: r[1] for r in rows}
@@ -1,17 +1,30 @@
-def list_uncategorized_merchants(conn, limit: int) -> list[str]:
+from repositories.merchants_repository import get_merchant_ids
+from repositories.spend_rollup_repository import adjust_rollup_for_ids
+
+
+def list_uncategorized_merchants(conn, limit: int, after: str | None = None) -> list[str]:
     """
-    Return distinct merchant_normalized values where category IS NULL.
+    Return distinct merchant names that have transactions where category IS NULL.
+    Transactions are matched to the merchants dimension on integer merchant_id.
+    If ``after`` is given, only merchants sorting strictly after it are returned
+    (keyset cursor used by background jobs to resume from a checkpoint).
     Deterministic read-only.
     """
     query = """
-        SELECT DISTINCT merchant_normalized
-        FROM transactions
-        WHERE category IS NULL
-          AND merchant_normalized IS NOT NULL
-          AND merchant_normalized != ''
-        ORDER BY merchant_normalized
+        SELECT m.merchant_normalized
+        FROM merchants m
+        WHERE m.id IN (
+            SELECT merchant_id
+            FROM transactions
+            WHERE category IS NULL
+              AND merchant_id IS NOT NULL
+        )
     """
     params = []
+    if after is not None:
+        query += " AND m.merchant_normalized > ?"
+        params.append(after)
+    query += " ORDER BY m.merchant_normalized"
     if limit:
         query += " LIMIT ?"
         params.append(int(limit))
@@ -20,6 +33,22 @@ def list_uncategorized_merchants(conn, limit: int) -> list[str]:
     return [row[0] for row in rows]
 
 
+def count_uncategorized_merchants(conn) -> int:
+    """
+    Return the number of distinct merchants with uncategorized transactions.
+    Deterministic read-only.
+    """
+    row = conn.execute(
+        """
+        SELECT COUNT(DISTINCT merchant_id)
+        FROM transactions
+        WHERE category IS NULL
+          AND merchant_id IS NOT NULL
+        """
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
 def get_cached_suggestion(conn, merchant_normalized: str) -> str | None:
     """
     Return cached suggested_category for merchant, or None if not cached.
@@ -32,6 +61,29 @@ def get_cached_suggestion(conn, merchant_normalized: str) -> str | None:
     return row[0] if row else None
 
 
+def get_cached_suggestion_for_any(conn, merchants: list[str]) -> str | None:
+    """
+    Return the cached suggested_category for the first merchant in ``merchants``
+    that has one, or None. Used to reuse a cache row across a merchant cluster.
+    Deterministic read.
+    """
+    if not merchants:
+        return None
+    rows = conn.execute(
+        """
+        SELECT merchant_normalized, suggested_category
+        FROM ai_category_suggestions
+        WHERE merchant_normalized IN (SELECT unnest(?::VARCHAR[]))
+        """,
+        [merchants]
+    ).fetchall()
+    cached = {r[0]: r[1] for r in rows}
+    for merchant in merchants:
+        if merchant in cached:
+            return cached[merchant]
+    return None
+
+
 def upsert_suggestion(conn, merchant_normalized: str, category: str, model: str) -> None:
     """
     Insert or update cached suggestion using ON CONFLICT.
@@ -44,7 +96,7 @@ def upsert_suggestion(conn, merchant_normalized: str, category: str, model: str)
         ON CONFLICT(merchant_normalized) DO UPDATE SET
             suggested_category = excluded.suggested_category,
             model = excluded.model,
-            created_at = CURRENT_TIMESTAMP
+            created_at = now()
         """,
         [merchant_normalized, category, model]
     )
@@ -52,30 +104,87 @@ def upsert_suggestion(conn, merchant_normalized: str, category: str, model: str)
 
 def apply_suggestion_to_uncategorized(conn, merchant_normalized: str, category: str) -> int:
     """
-    Bulk update category where category IS NULL and merchant_normalized matches.
-    Return reliable row count via count-before/count-after.
+    Bulk update category where category IS NULL for a single merchant.
+    Return reliable row count via count-before.
     """
-    # Count matching rows BEFORE update
-    count_before = conn.execute(
+    return apply_suggestion_to_merchants(conn, [merchant_normalized], category)
+
+
+def is_negatively_cached(conn, merchant_normalized: str, model: str, ttl_hours: int) -> bool:
+    """
+    Return True if ``model`` returned an invalid category for this merchant
+    within the last ``ttl_hours``. Deterministic read.
+    """
+    row = conn.execute(
         """
-        SELECT COUNT(*)
-        FROM transactions
+        SELECT 1
+        FROM ai_negative_cache
         WHERE merchant_normalized = ?
-          AND category IS NULL
+          AND model = ?
+          AND created_at >= now() - to_hours(CAST(? AS INTEGER))
         """,
+        [merchant_normalized, model, ttl_hours]
+    ).fetchone()
+    return bool(row)
+
+
+def upsert_negative_cache(conn, merchant_normalized: str, model: str) -> None:
+    """
+    Record that ``model`` could not categorize this merchant.
+    """
+    conn.execute(
+        """
+        INSERT INTO ai_negative_cache (merchant_normalized, model)
+        VALUES (?, ?)
+        ON CONFLICT(merchant_normalized) DO UPDATE SET
+            model = excluded.model,
+            created_at = now()
+        """,
+        [merchant_normalized, model]
+    )
+
+
+def clear_negative_cache(conn, merchant_normalized: str) -> None:
+    conn.execute(
+        "DELETE FROM ai_negative_cache WHERE merchant_normalized = ?",
         [merchant_normalized]
-    ).fetchone()[0]
-    
-    # Perform update
+    )
+
+
+def apply_suggestion_to_merchants(conn, merchants: list[str], category: str) -> int:
+    """
+    Bulk update category where category IS NULL and the transaction's merchant
+    is any of ``merchants`` (one UPDATE for a whole cluster). Names are resolved
+    to merchant ids once; the ledger is matched on integer merchant_id.
+    The affected ids are selected first so the spend rollup can be moved
+    from the uncategorized bucket; returns their count. Run it inside the
+    caller's transaction so the rollup and the ledger move together.
+    """
+    merchant_ids = get_merchant_ids(conn, merchants)
+    if not merchant_ids:
+        return 0
+
+    transaction_ids = [r[0] for r in conn.execute(
+        """
+        SELECT id
+        FROM transactions
+        WHERE merchant_id IN (SELECT unnest(?::BIGINT[]))
+          AND category IS NULL
+        """,
+        [merchant_ids]
+    ).fetchall()]
+    if not transaction_ids:
+        return 0
+
+    adjust_rollup_for_ids(conn, transaction_ids, -1)
     conn.execute(
         """
         UPDATE transactions
         SET category = ?
-        WHERE merchant_normalized = ?
-          AND category IS NULL
+        WHERE id IN (SELECT unnest(?::BIGINT[]))
         """,
-        [category, merchant_normalized]
+        [category, transaction_ids]
     )
-    
-    # Return count of affected rows (those that had category=NULL before)
-    return count_before
+    adjust_rollup_for_ids(conn, transaction_ids, +1)
+
+    return len(transaction_ids)
@@ -0,0 +1,173 @@
+_JOB_COLUMNS = """
+    id, status, batch_size, total_merchants, merchants_processed,
+    transactions_updated, cache_hits, ai_calls, failure_count,
+    last_merchant, cancel_requested, error,
+    created_at, started_at, updated_at, finished_at
+"""
+
+
+def _row_to_job(row) -> dict:
+    return {
+        "id": row[0],
+        "status": row[1],
+        "batch_size": row[2],
+        "total_merchants": row[3],
+        "merchants_processed": row[4],
+        "transactions_updated": row[5],
+        "cache_hits": row[6],
+        "ai_calls": row[7],
+        "failure_count": row[8],
+        "last_merchant": row[9],
+        "cancel_requested": row[10],
+        "error": row[11],
+        "created_at": row[12],
+        "started_at": row[13],
+        "updated_at": row[14],
+        "finished_at": row[15],
+    }
+
+
+def create_job(conn, batch_size: int, total_merchants: int) -> dict:
+    """
+    Insert a queued AI categorization job and return it.
+    """
+    row = conn.execute(
+        f"""
+        INSERT INTO ai_jobs (status, batch_size, total_merchants)
+        VALUES ('queued', ?, ?)
+        RETURNING {_JOB_COLUMNS}
+        """,
+        [batch_size, total_merchants],
+    ).fetchone()
+    return _row_to_job(row)
+
+
+def get_job(conn, job_id: int) -> dict | None:
+    """
+    Return a job by id, or None if not found.
+    Deterministic read.
+    """
+    row = conn.execute(
+        f"SELECT {_JOB_COLUMNS} FROM ai_jobs WHERE id = ?",
+        [job_id],
+    ).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def list_jobs(conn, limit: int = 20) -> list[dict]:
+    """
+    Return most recent jobs first.
+    Deterministic read.
+    """
+    rows = conn.execute(
+        f"SELECT {_JOB_COLUMNS} FROM ai_jobs ORDER BY id DESC LIMIT ?",
+        [limit],
+    ).fetchall()
+    return [_row_to_job(r) for r in rows]
+
+
+def claim_next_job(conn) -> dict | None:
+    """
+    Mark the oldest queued job as running and return it, or None if the queue is empty.
+    """
+    row = conn.execute(
+        """
+        UPDATE ai_jobs
+        SET status = 'running',
+            started_at = COALESCE(started_at, CURRENT_TIMESTAMP),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = (SELECT MIN(id) FROM ai_jobs WHERE status = 'queued')
+        RETURNING id
+        """
+    ).fetchone()
+    return get_job(conn, row[0]) if row else None
+
+
+def requeue_interrupted_jobs(conn) -> int:
+    """
+    Move jobs left 'running' by a previous process back to 'queued' so they
+    resume from their last checkpoint. Returns number of jobs requeued.
+    """
+    rows = conn.execute(
+        """
+        UPDATE ai_jobs
+        SET status = 'queued', updated_at = CURRENT_TIMESTAMP
+        WHERE status = 'running'
+        RETURNING id
+        """
+    ).fetchall()
+    return len(rows)
+
+
+def checkpoint_job(conn, job_id: int, last_merchant: str, deltas: dict, failure_count: int) -> None:
+    """
+    Persist progress after a batch: advance the cursor and add counter deltas.
+    """
+    conn.execute(
+        """
+        UPDATE ai_jobs
+        SET last_merchant = ?,
+            merchants_processed = merchants_processed + ?,
+            transactions_updated = transactions_updated + ?,
+            cache_hits = cache_hits + ?,
+            ai_calls = ai_calls + ?,
+            failure_count = failure_count + ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        """,
+        [
+            last_merchant,
+            deltas["merchants_processed"],
+            deltas["transactions_updated"],
+            deltas["cache_hits"],
+            deltas["ai_calls"],
+            failure_count,
+            job_id,
+        ],
+    )
+
+
+def request_cancel(conn, job_id: int) -> dict | None:
+    """
+    Flag a job for cancellation. Queued jobs are cancelled immediately;
+    running jobs stop at the next batch boundary. Finished jobs are unchanged.
+    Returns the updated job, or None if not found.
+    """
+    conn.execute(
+        """
+        UPDATE ai_jobs
+        SET cancel_requested = TRUE,
+            status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+            finished_at = CASE WHEN status = 'queued' THEN CURRENT_TIMESTAMP ELSE finished_at END,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+          AND status IN ('queued', 'running')
+        """,
+        [job_id],
+    )
+    return get_job(conn, job_id)
+
+
+def is_cancel_requested(conn, job_id: int) -> bool:
+    row = conn.execute(
+        "SELECT cancel_requested FROM ai_jobs WHERE id = ?",
+        [job_id],
+    ).fetchone()
+    return bool(row[0]) if row else True
+
+
+def finish_job(conn, job_id: int, status: str, error: str | None = None) -> None:
+    """
+    Set terminal status (completed | cancelled | failed).
+    """
+    conn.execute(
+        """
+        UPDATE ai_jobs
+        SET status = ?,
+            error = ?,
+            finished_at = CURRENT_TIMESTAMP,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        """,
+        [status, error, job_id],
+    )
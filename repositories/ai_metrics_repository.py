@@ -0,0 +1,133 @@
+# Upper bounds (ms) for latency histogram buckets; anything above the last is overflow
+LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def record_ai_metric(conn, metric: dict) -> None:
+    """
+    Insert one categorization event. ``metric`` must contain ``event``
+    (rule | cache_hit | negative_cache_hit | ai_call); timing and token
+    fields are only present for ai_call events.
+    """
+    conn.execute(
+        """
+        INSERT INTO ai_metrics
+        (event, model, outcome, http_status, connect_ms, ttft_ms, total_ms, prompt_tokens, response_tokens)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            metric["event"],
+            metric.get("model"),
+            metric.get("outcome"),
+            metric.get("http_status"),
+            metric.get("connect_ms"),
+            metric.get("ttft_ms"),
+            metric.get("total_ms"),
+            metric.get("prompt_tokens"),
+            metric.get("response_tokens"),
+        ],
+    )
+
+
+def get_event_counts(conn, since_hours: int) -> dict:
+    """
+    Return {event: count} for events in the window.
+    Deterministic read.
+    """
+    rows = conn.execute(
+        """
+        SELECT event, COUNT(*)
+        FROM ai_metrics
+        WHERE created_at >= now() - to_hours(CAST(? AS INTEGER))
+        GROUP BY event
+        """,
+        [since_hours],
+    ).fetchall()
+    return {r[0]: r[1] for r in rows}
+
+
+def get_model_call_stats(conn, since_hours: int, num_predict: int) -> list[dict]:
+    """
+    Return per-model AI call statistics: outcome counts, latency percentiles
+    and response token distribution. ``num_predict`` is used to count calls
+    that hit the generation limit. Deterministic read.
+    """
+    rows = conn.execute(
+        """
+        SELECT
+            model,
+            COUNT(*) AS calls,
+            COUNT(*) FILTER (WHERE outcome = 'ok') AS ok,
+            COUNT(*) FILTER (WHERE outcome = 'invalid') AS invalid,
+            COUNT(*) FILTER (WHERE outcome NOT IN ('ok', 'invalid')) AS errors,
+            quantile_cont(connect_ms, [0.5, 0.9, 0.99]) AS connect_pcts,
+            quantile_cont(ttft_ms, [0.5, 0.9, 0.99]) AS ttft_pcts,
+            quantile_cont(total_ms, [0.5, 0.9, 0.99]) AS total_pcts,
+            AVG(prompt_tokens) AS avg_prompt_tokens,
+            AVG(response_tokens) AS avg_response_tokens,
+            quantile_cont(response_tokens, 0.9) AS p90_response_tokens,
+            MAX(response_tokens) AS max_response_tokens,
+            COUNT(*) FILTER (WHERE response_tokens >= ?) AS hit_num_predict
+        FROM ai_metrics
+        WHERE event = 'ai_call'
+          AND created_at >= now() - to_hours(CAST(? AS INTEGER))
+        GROUP BY model
+        ORDER BY model
+        """,
+        [num_predict, since_hours],
+    ).fetchall()
+
+    return [
+        {
+            "model": r[0],
+            "calls": r[1],
+            "ok": r[2],
+            "invalid": r[3],
+            "errors": r[4],
+            "connect_ms": r[5],
+            "ttft_ms": r[6],
+            "total_ms": r[7],
+            "avg_prompt_tokens": r[8],
+            "avg_response_tokens": r[9],
+            "p90_response_tokens": r[10],
+            "max_response_tokens": r[11],
+            "hit_num_predict": r[12],
+        }
+        for r in rows
+    ]
+
+
+def get_latency_histograms(conn, since_hours: int) -> list[dict]:
+    """
+    Return bucket counts of connect/ttft/total latency per model.
+    Bucket index i counts values <= LATENCY_BUCKETS_MS[i]; the final index is overflow.
+    Deterministic read.
+    """
+    bucket_expr = "CASE " + " ".join(
+        f"WHEN v <= {edge} THEN {i}" for i, edge in enumerate(LATENCY_BUCKETS_MS)
+    ) + f" ELSE {len(LATENCY_BUCKETS_MS)} END"
+
+    rows = conn.execute(
+        f"""
+        WITH samples AS (
+            SELECT model, 'connect_ms' AS phase, connect_ms AS v FROM ai_metrics
+            WHERE event = 'ai_call' AND created_at >= now() - to_hours(CAST(? AS INTEGER))
+            UNION ALL
+            SELECT model, 'ttft_ms', ttft_ms FROM ai_metrics
+            WHERE event = 'ai_call' AND created_at >= now() - to_hours(CAST(? AS INTEGER))
+            UNION ALL
+            SELECT model, 'total_ms', total_ms FROM ai_metrics
+            WHERE event = 'ai_call' AND created_at >= now() - to_hours(CAST(? AS INTEGER))
+        )
+        SELECT model, phase, {bucket_expr} AS bucket, COUNT(*)
+        FROM samples
+        WHERE v IS NOT NULL
+        GROUP BY ALL
+        ORDER BY model, phase, bucket
+        """,
+        [since_hours, since_hours, since_hours],
+    ).fetchall()
+
+    return [
+        {"model": r[0], "phase": r[1], "bucket": r[2], "count": r[3]}
+        for r in rows
+    ]
@@ -0,0 +1,121 @@
+from repositories.spend_rollup_repository import UNCATEGORIZED_KEY
+
+
+def get_bucket_budget_status(conn, month, category: str) -> tuple[float, float] | None:
+    """
+    Return (spent, monthly_budget) for one (month, category) bucket, or None
+    if the category has no active positive budget. Reads one budget row and
+    the rollup rows for that bucket only. spent is net outflow.
+    """
+    row = conn.execute(
+        """
+        SELECT
+            COALESCE((
+                SELECT -SUM(total_amount)
+                FROM category_month_spend
+                WHERE month = CAST(date_trunc('month', CAST(? AS DATE)) AS DATE)
+                  AND category = ?
+            ), 0),
+            b.monthly_budget
+        FROM category_budgets b
+        WHERE b.category_name = ?
+          AND b.active
+          AND b.monthly_budget > 0
+        """,
+        [month, category or UNCATEGORIZED_KEY, category],
+    ).fetchone()
+    if row is None:
+        return None
+    return float(row[0]), float(row[1])
+
+
+def record_alerts(conn, month, category: str, thresholds: list[int],
+                  spent: float, budget: float) -> list[dict]:
+    """
+    Insert one alert per crossed threshold. Thresholds already recorded for
+    this (category, month) are skipped, so each fires at most once.
+    Returns only the newly recorded alerts.
+    """
+    if not thresholds:
+        return []
+    rows = conn.execute(
+        """
+        INSERT INTO budget_alerts (category, month, threshold_pct, spent, budget)
+        SELECT ?, CAST(date_trunc('month', CAST(? AS DATE)) AS DATE), unnest(?::INTEGER[]), ?, ?
+        ON CONFLICT (category, month, threshold_pct) DO NOTHING
+        RETURNING id, category, month, threshold_pct, spent, budget, created_at
+        """,
+        [category, month, thresholds, spent, budget],
+    ).fetchall()
+    return [_alert_row(r) for r in rows]
+
+
+def list_unsent_alerts(conn, max_attempts: int, limit: int = 50) -> list[dict]:
+    """Unsent alerts with fewer than ``max_attempts`` failed deliveries, oldest first."""
+    rows = conn.execute(
+        """
+        SELECT id, category, month, threshold_pct, spent, budget, created_at,
+               COALESCE(delivered_chats, [])
+        FROM budget_alerts
+        WHERE sent_at IS NULL
+          AND COALESCE(attempts, 0) < ?
+        ORDER BY id
+        LIMIT ?
+        """,
+        [max_attempts, limit],
+    ).fetchall()
+    return [{**_alert_row(r), "delivered_chats": r[7]} for r in rows]
+
+
+def mark_alerts_sent(conn, alert_ids: list[int]) -> None:
+    if not alert_ids:
+        return
+    conn.execute(
+        "UPDATE budget_alerts SET sent_at = now() WHERE id IN (SELECT unnest(?::BIGINT[]))",
+        [alert_ids],
+    )
+
+
+def record_alert_failures(conn, alert_ids: list[int], error: str,
+                          delivered_chats: list[str] = ()) -> None:
+    """
+    Count a failed delivery attempt against each alert, and remember the
+    chats it did reach so the retry skips them.
+    """
+    if not alert_ids:
+        return
+    conn.execute(
+        """
+        UPDATE budget_alerts
+        SET attempts = COALESCE(attempts, 0) + 1, last_error = ?,
+            delivered_chats = list_distinct(list_concat(COALESCE(delivered_chats, []), ?::VARCHAR[]))
+        WHERE id IN (SELECT unnest(?::BIGINT[]))
+        """,
+        [error, list(delivered_chats), alert_ids],
+    )
+
+
+def list_recent_alerts(conn, limit: int = 50) -> list[dict]:
+    rows = conn.execute(
+        """
+        SELECT id, category, month, threshold_pct, spent, budget, created_at, sent_at,
+               COALESCE(attempts, 0), last_error
+        FROM budget_alerts
+        ORDER BY id DESC
+        LIMIT ?
+        """,
+        [limit],
+    ).fetchall()
+    return [{**_alert_row(r), "sent_at": r[7], "attempts": r[8], "last_error": r[9]} for r in rows]
+
+
+def _alert_row(r) -> dict:
+    return {
+        "id": r[0],
+        "category": r[1],
+        "month": r[2],
+        "threshold_pct": r[3],
+        "spent": r[4],
+        "budget": r[5],
+        "created_at": r[6],
+    }
@@ -0,0 +1,225 @@
+# -----------------------------
+# Bulk (Parquet / Arrow) import
+# -----------------------------
+# The source file is registered on the caller's connection as "bulk_source"
+# (a memory-mapped Arrow table or a Parquet dataset, scanned in place),
+# staged once into the temp table bulk_stage with canonical columns, and
+# then resolved, de-duplicated and inserted with set-based statements.
+# Lookups computed in Python (accounts, merchants, rule categories) are
+# joined in as registered Arrow tables. Temp tables are per connection;
+# drop_bulk_tables removes them.
+
+_BULK_TABLES = ("bulk_stage", "bulk_descriptions", "bulk_keyed", "bulk_new")
+
+# DuckDB expression per canonical column kind; {c} is the quoted source column
+_DATE_EXPRESSIONS = {
+    "string": "COALESCE(TRY_CAST(trim({c}) AS DATE), CAST(try_strptime(trim({c}), '%m/%d/%Y') AS DATE))",
+    "temporal": "CAST({c} AS DATE)",
+}
+
+
+def stage_bulk_rows(conn, columns: dict, date_kind: str) -> int:
+    """
+    Copy "bulk_source" into bulk_stage. ``columns`` maps canonical names
+    (date, description, amount, balance, category, source, user_id,
+    account_name) to source column names; only the first three are
+    required. ``date_kind`` is "string" or "temporal". Invalid rows are
+    kept with a reject_reason. Returns the row count.
+    """
+    def col(name):
+        return '"' + columns[name].replace('"', '""') + '"' if name in columns else "NULL"
+
+    def text(name):
+        return f"NULLIF(trim(CAST({col(name)} AS VARCHAR)), '')"
+
+    raw_date = col("date")
+    date_sql = _DATE_EXPRESSIONS[date_kind].format(c=raw_date)
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE bulk_stage AS
+        SELECT row_number, date, description, amount,
+               TRY_CAST(CAST(balance AS DECIMAL(18, 2)) AS DOUBLE) AS balance,
+               category, source, user_id, account_name,
+               CASE
+                   WHEN raw_date IS NULL OR description IS NULL THEN 'Missing required date or description'
+                   WHEN date IS NULL THEN 'invalid date: ' || CAST(raw_date AS VARCHAR)
+                   WHEN raw_amount IS NULL THEN 'missing money value'
+                   WHEN amount IS NULL THEN 'invalid money value'
+               END AS reject_reason
+        FROM (
+            SELECT row_number() OVER () AS row_number,
+                   {raw_date} AS raw_date,
+                   {date_sql} AS date,
+                   {text("description")} AS description,
+                   {col("amount")} AS raw_amount,
+                   TRY_CAST(TRY_CAST({col("amount")} AS DECIMAL(18, 2)) AS DOUBLE) AS amount,
+                   {col("balance")} AS balance,
+                   {text("category")} AS category,
+                   COALESCE({text("source")}, 'unknown') AS source,
+                   TRY_CAST({col("user_id")} AS BIGINT) AS user_id,
+                   COALESCE({text("account_name")}, 'Primary Account') AS account_name
+            FROM bulk_source
+        )
+        """
+    )
+    return conn.execute("SELECT count(*) FROM bulk_stage").fetchone()[0]
+
+
+def get_bulk_rejections(conn, limit: int) -> tuple[int, list[tuple]]:
+    """(count, first ``limit`` (row_number, reason)) of staged rows that failed validation."""
+    count = conn.execute("SELECT count(*) FROM bulk_stage WHERE reject_reason IS NOT NULL").fetchone()[0]
+    rows = conn.execute(
+        """
+        SELECT row_number, reject_reason FROM bulk_stage
+        WHERE reject_reason IS NOT NULL
+        ORDER BY row_number
+        LIMIT ?
+        """,
+        [limit],
+    ).fetchall()
+    return count, rows
+
+
+def get_bulk_account_names(conn) -> list[str]:
+    rows = conn.execute(
+        "SELECT DISTINCT account_name FROM bulk_stage WHERE reject_reason IS NULL"
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def get_bulk_descriptions(conn) -> list[str]:
+    """Distinct descriptions of the valid staged rows."""
+    table = conn.execute(
+        "SELECT DISTINCT description FROM bulk_stage WHERE reject_reason IS NULL"
+    ).fetch_arrow_table()
+    return table.column(0).to_pylist()
+
+
+def resolve_bulk_descriptions(conn, merchants, rules) -> None:
+    """
+    Build bulk_descriptions (description, merchant_normalized, merchant_id,
+    rule_category) from registered Arrow tables: ``merchants`` (description,
+    merchant_normalized, merchant_id) and ``rules`` (rank, pattern
+    lowercased, category). A description gets the category of the
+    lowest-ranked rule whose pattern it contains, as evaluate_category does.
+    """
+    conn.register("bulk_merchants", merchants)
+    conn.register("bulk_rules", rules)
+    try:
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE bulk_descriptions AS
+            SELECT m.description, m.merchant_normalized, m.merchant_id, c.rule_category
+            FROM bulk_merchants m
+            LEFT JOIN (
+                SELECT m.description, arg_min(r.category, r.rank) AS rule_category
+                FROM bulk_merchants m
+                JOIN bulk_rules r ON contains(lower(m.description), r.pattern)
+                GROUP BY m.description
+            ) c ON c.description = m.description
+            """
+        )
+    finally:
+        conn.unregister("bulk_merchants")
+        conn.unregister("bulk_rules")
+
+
+def build_bulk_new_rows(conn, accounts) -> tuple[int, int]:
+    """
+    Resolve the valid staged rows into bulk_keyed (with account_id,
+    merchant fields, category and fingerprint) and keep in bulk_new the
+    first row per unique key that the ledger does not hold yet (matched on
+    the indexed fingerprint, with the key columns rechecked), with a
+    transaction id drawn from transactions_id_seq. ``accounts`` is a
+    registered Arrow table (account_name, account_id).
+    Returns (valid rows, new rows).
+    """
+    conn.register("bulk_accounts", accounts)
+    try:
+        conn.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE bulk_keyed AS
+            SELECT s.row_number, a.account_id, s.date, s.description, s.amount, s.balance,
+                   COALESCE(s.category, d.rule_category) AS category,
+                   s.source, s.user_id, d.merchant_id, d.merchant_normalized,
+                   tx_fingerprint(a.account_id, s.date, s.description, s.amount) AS fingerprint
+            FROM bulk_stage s
+            JOIN bulk_accounts a ON a.account_name = s.account_name
+            JOIN bulk_descriptions d ON d.description = s.description
+            WHERE s.reject_reason IS NULL
+            """
+        )
+    finally:
+        conn.unregister("bulk_accounts")
+    conn.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE bulk_new AS
+        WITH first_rows AS (
+            SELECT * FROM bulk_keyed
+            QUALIFY row_number() OVER (
+                PARTITION BY account_id, date, description, amount ORDER BY row_number
+            ) = 1
+        )
+        SELECT nextval('transactions_id_seq') AS id, f.*
+        FROM first_rows f
+        ANTI JOIN transactions t
+            ON t.fingerprint = f.fingerprint
+           AND t.account_id = f.account_id AND t.date = f.date
+           AND t.description = f.description AND t.amount = f.amount
+        """
+    )
+    valid = conn.execute("SELECT count(*) FROM bulk_keyed").fetchone()[0]
+    new = conn.execute("SELECT count(*) FROM bulk_new").fetchone()[0]
+    return valid, new
+
+
+def get_bulk_duplicate_rows(conn, limit: int) -> list[int]:
+    """First ``limit`` row numbers of valid rows skipped as duplicates."""
+    rows = conn.execute(
+        """
+        SELECT k.row_number FROM bulk_keyed k
+        ANTI JOIN bulk_new n ON n.row_number = k.row_number
+        ORDER BY k.row_number
+        LIMIT ?
+        """,
+        [limit],
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def insert_bulk_new_rows(conn, run_id: int | None) -> int:
+    """
+    Insert bulk_new into transactions (ids preassigned), tagged with
+    ``run_id``. Returns the row count.
+    """
+    conn.execute(
+        """
+        INSERT INTO transactions
+            (id, account_id, date, description, amount, balance, category, source,
+             user_id, merchant_id, merchant_normalized, fingerprint, ingestion_run_id)
+        SELECT id, account_id, date, description, amount, balance, category, source,
+               user_id, merchant_id, merchant_normalized, fingerprint, ?
+        FROM bulk_new
+        """,
+        [run_id],
+    )
+    return conn.execute("SELECT count(*) FROM bulk_new").fetchone()[0]
+
+
+def get_bulk_category_counts(conn) -> dict[str, int]:
+    rows = conn.execute(
+        "SELECT COALESCE(category, 'Uncategorized'), count(*) FROM bulk_new GROUP BY 1"
+    ).fetchall()
+    return {r[0]: r[1] for r in rows}
+
+
+def get_bulk_alert_buckets(conn) -> list[tuple]:
+    """Distinct (month start, category) pairs of the inserted rows, for budget alerts."""
+    return conn.execute(
+        "SELECT DISTINCT CAST(date_trunc('month', date) AS DATE), category FROM bulk_new"
+    ).fetchall()
+
+
+def drop_bulk_tables(conn) -> None:
+    for table in _BULK_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
@@ -1,4 +1,5 @@
 from db import get_db
+from repositories.spend_rollup_repository import UNCATEGORIZED_KEY, get_month_spend_by_category
 
 
 def upsert_category_budget(category_name: str, monthly_budget: float, active: bool) -> None:
@@ -40,23 +41,59 @@ def get_all_category_budgets() -> list[dict]:
         conn.close()
 
 
-def get_spend_grouped_by_category() -> list[dict]:
+def get_spend_grouped_by_category(month=None) -> list[dict]:
+    """
+    Net amount per category for one month (default: current month),
+    read from the category_month_spend rollup rather than the ledger.
+    """
     conn = get_db()
     try:
-        rows = conn.execute(
-            """
-            SELECT category, SUM(amount)
-            FROM transactions
-            GROUP BY category
-            """
-        ).fetchall()
-
-        return [
-            {
-                "category_name": r[0],
-                "current_spend": float(r[1]) if r[1] is not None else 0.0,
-            }
-            for r in rows
-        ]
+        return get_month_spend_by_category(conn, month)
     finally:
         conn.close()
+
+
+def get_budget_vs_spend(conn, start_month, end_month, months: int) -> list[dict]:
+    """
+    One query over category_budgets and the monthly spend rollup for the
+    months in [start_month, end_month]. ``months`` scales the monthly budget
+    to the period.
+
+    spent is net outflow (positive for expenses, reduced by refunds).
+    Categories with a budget but no spend and spend with no budget both
+    appear; has_budget tells them apart. Ordered by category, uncategorized last.
+    """
+    rows = conn.execute(
+        """
+        WITH spend AS (
+            SELECT NULLIF(category, ?) AS category, -SUM(total_amount) AS spent
+            FROM category_month_spend
+            WHERE month BETWEEN ? AND ?
+            GROUP BY 1
+        )
+        SELECT COALESCE(b.category_name, s.category) AS category,
+               b.category_name IS NOT NULL AS has_budget,
+               b.monthly_budget,
+               b.monthly_budget * ? AS budget,
+               ROUND(COALESCE(s.spent, 0), 2) AS spent,
+               ROUND(b.monthly_budget * ? - COALESCE(s.spent, 0), 2) AS remaining,
+               b.active
+        FROM category_budgets b
+        FULL OUTER JOIN spend s ON s.category = b.category_name
+        ORDER BY category NULLS LAST
+        """,
+        [UNCATEGORIZED_KEY, start_month, end_month, months, months],
+    ).fetchall()
+
+    return [
+        {
+            "category": r[0],
+            "has_budget": r[1],
+            "monthly_budget": r[2],
+            "budget": r[3],
+            "spent": float(r[4]),
+            "remaining": r[5],
+            "active": r[6],
+        }
+        for r in rows
+    ]
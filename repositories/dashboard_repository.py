@@ -0,0 +1,60 @@
+from repositories.spend_rollup_repository import UNCATEGORIZED_KEY
+
+
+def get_dashboard_snapshot(conn, month_start, recent_limit: int = 5) -> dict:
+    """
+    Everything the dashboard reads from the ledger, in one round-trip.
+    Totals come from the category_month_spend rollup; only the recent
+    transactions list touches ``transactions`` (top-N by id).
+
+    Month figures cover ``month_start`` onward and budget status lists
+    every configured budget, active or not (as the dashboard always has);
+    budget status covers exactly that month. categories is expenses per
+    category (negative totals, largest spend first), uncategorized as None.
+    """
+    row = conn.execute(
+        """
+        WITH month_rollup AS (
+            SELECT NULLIF(category, ?) AS category,
+                   SUM(income) AS income,
+                   SUM(expenses) AS expenses
+            FROM category_month_spend
+            WHERE month >= CAST(? AS DATE)
+            GROUP BY 1
+        ), budget_spend AS (
+            SELECT NULLIF(category, ?) AS category, -SUM(total_amount) AS spent
+            FROM category_month_spend
+            WHERE month = CAST(? AS DATE)
+            GROUP BY 1
+        ), budget_status AS (
+            SELECT COALESCE(b.category_name, s.category) AS category,
+                   ROUND(COALESCE(b.monthly_budget, 0), 2) AS budget,
+                   ROUND(COALESCE(s.spent, 0), 2) AS spent
+            FROM category_budgets b
+            FULL OUTER JOIN budget_spend s ON s.category = b.category_name
+            WHERE COALESCE(b.category_name, s.category) IS NOT NULL
+        )
+        SELECT
+            (SELECT COALESCE(SUM(total_amount), 0) FROM category_month_spend),
+            (SELECT COALESCE(SUM(income), 0) FROM month_rollup),
+            (SELECT COALESCE(SUM(expenses), 0) FROM month_rollup),
+            (SELECT list({'category': category, 'total': expenses} ORDER BY expenses, category)
+               FROM month_rollup WHERE expenses < 0),
+            (SELECT list({'id': id, 'date': date, 'description': description, 'amount': amount,
+                          'category': category, 'recurring_event_id': recurring_event_id}
+                         ORDER BY id DESC)
+               FROM (SELECT * FROM transactions ORDER BY id DESC LIMIT ?)),
+            (SELECT list({'category': category, 'budget': budget, 'spent': spent} ORDER BY category)
+               FROM budget_status)
+        """,
+        [UNCATEGORIZED_KEY, month_start, UNCATEGORIZED_KEY, month_start, recent_limit],
+    ).fetchone()
+
+    return {
+        "current_balance": row[0],
+        "monthly_income": row[1],
+        "monthly_expenses": row[2],
+        "categories": row[3] or [],
+        "recent_transactions": row[4] or [],
+        "budget_status": row[5] or [],
+    }
@@ -1,24 +1,32 @@
 from db import get_db
+from repositories.spend_rollup_repository import adjust_rollup_for_relation
 
 
-def record_ingestion_run(filename: str, inserted_count: int, skipped_count: int) -> dict:
+# Wall-time columns on ingestion_runs, as <phase>_ms
+INGEST_PHASES = ("decode", "parse", "normalize", "categorize", "match", "write")
+
+
+def record_ingestion_run(filename: str, inserted_count: int, skipped_count: int,
+                         bytes_total: int = 0, row_count: int = 0,
+                         timings: dict | None = None, profile: str | None = None) -> dict:
+    """
+    Record a finished synchronous ingest. ``timings`` maps phase names
+    (INGEST_PHASES plus "total") to milliseconds.
+    """
+    timings = timings or {}
+    phase_columns = [f"{p}_ms" for p in (*INGEST_PHASES, "total")]
     conn = get_db()
     try:
-        conn.execute(
-            """
-            INSERT INTO ingestion_runs (filename, inserted_count, skipped_count)
-            VALUES (?, ?, ?)
-            """,
-            (filename, inserted_count, skipped_count),
-        )
-
         row = conn.execute(
-            """
-            SELECT id, filename, inserted_count, skipped_count, timestamp
-            FROM ingestion_runs
-            ORDER BY id DESC
-            LIMIT 1
-            """
+            f"""
+            INSERT INTO ingestion_runs
+                (filename, inserted_count, skipped_count, bytes_total, row_count, profile,
+                 {", ".join(phase_columns)})
+            VALUES (?, ?, ?, ?, ?, ?, {", ".join("?" for _ in phase_columns)})
+            RETURNING id, filename, inserted_count, skipped_count, timestamp
+            """,
+            [filename, inserted_count, skipped_count, bytes_total, row_count, profile,
+             *(timings.get(p) for p in (*INGEST_PHASES, "total"))],
         ).fetchone()
 
         return {
@@ -32,12 +40,72 @@ def record_ingestion_run(filename: str, inserted_count: int, skipped_count: int)
         conn.close()
 
 
+def record_rejections(run_id: int, rejections: list[tuple]) -> int:
+    """Store (row_number, reason) pairs for a run. Returns the number stored."""
+    import pyarrow as pa
+
+    if not rejections:
+        return 0
+    table = pa.table({
+        "run_id": pa.array([run_id] * len(rejections), pa.int64()),
+        "row_number": pa.array([r[0] for r in rejections], pa.int32()),
+        "reason": pa.array([r[1] for r in rejections], pa.string()),
+    })
+    conn = get_db()
+    try:
+        conn.register("rejections_batch", table)
+        conn.execute("INSERT INTO ingestion_rejections SELECT run_id, row_number, reason FROM rejections_batch")
+        conn.unregister("rejections_batch")
+        return len(rejections)
+    finally:
+        conn.close()
+
+
+def get_rejections(run_id: int, limit: int = 1000) -> list[dict]:
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            """
+            SELECT row_number, reason
+            FROM ingestion_rejections
+            WHERE run_id = ?
+            ORDER BY row_number NULLS FIRST
+            LIMIT ?
+            """,
+            [run_id, limit],
+        ).fetchall()
+        return [{"row_number": r[0], "reason": r[1]} for r in rows]
+    finally:
+        conn.close()
+
+
+def get_rejection_summary(run_id: int) -> list[dict]:
+    """Rejected row counts per reason, most frequent first."""
+    conn = get_db()
+    try:
+        rows = conn.execute(
+            """
+            SELECT reason, COUNT(*) AS n
+            FROM ingestion_rejections
+            WHERE run_id = ?
+            GROUP BY reason
+            ORDER BY n DESC, reason
+            """,
+            [run_id],
+        ).fetchall()
+        return [{"reason": r[0], "count": r[1]} for r in rows]
+    finally:
+        conn.close()
+
+
 def get_ingestion_history(limit: int = 100) -> list[dict]:
     conn = get_db()
     try:
         rows = conn.execute(
             """
-            SELECT id, filename, inserted_count, skipped_count, timestamp
+            SELECT id, filename, inserted_count, skipped_count, timestamp, status, mode,
+                   bytes_total, row_count, decode_ms, parse_ms, normalize_ms,
+                   categorize_ms, match_ms, write_ms, total_ms, profile
             FROM ingestion_runs
             ORDER BY timestamp DESC, id DESC
             LIMIT ?
@@ -52,8 +120,435 @@ def get_ingestion_history(limit: int = 100) -> list[dict]:
                 "inserted_count": r[2],
                 "skipped_count": r[3],
                 "timestamp": r[4],
+                "status": r[5],
+                "mode": r[6],
+                "bytes_total": r[7],
+                "row_count": r[8],
+                "timings_ms": _timings(r[9:16]),
+                "profile": r[16],
             }
             for r in rows
         ]
     finally:
         conn.close()
+
+
+# -----------------------------
+# Background ingestion jobs
+# -----------------------------
+# A job is an ingestion_runs row that moves through phases while a worker
+# thread processes the uploaded file (see services.ingestion_job_service).
+
+_JOB_COLUMNS = """
+    id, filename, status, mode, account_id, upload_path,
+    bytes_total, bytes_processed, rows_parsed, rows_matched,
+    inserted_count, skipped_count, review_session_id, error,
+    timestamp, started_at, updated_at, finished_at, row_count,
+    decode_ms, parse_ms, normalize_ms, categorize_ms, match_ms, write_ms, total_ms,
+    profile, content_hash, batch_id, duplicate_of
+"""
+
+# Counters a worker may report while a job runs
+_PROGRESS_FIELDS = (
+    "status", "bytes_processed", "rows_parsed", "rows_matched",
+    "inserted_count", "skipped_count", "review_session_id", "row_count", "profile",
+    *(f"{p}_ms" for p in (*INGEST_PHASES, "total")),
+)
+
+
+def _row_to_job(row) -> dict:
+    return {
+        "id": row[0],
+        "filename": row[1],
+        "status": row[2],
+        "mode": row[3],
+        "account_id": row[4],
+        "upload_path": row[5],
+        "bytes_total": row[6],
+        "bytes_processed": row[7],
+        "rows_parsed": row[8],
+        "rows_matched": row[9],
+        "inserted_count": row[10],
+        "skipped_count": row[11],
+        "review_session_id": row[12],
+        "error": row[13],
+        "created_at": row[14],
+        "started_at": row[15],
+        "updated_at": row[16],
+        "finished_at": row[17],
+        "row_count": row[18],
+        "timings_ms": _timings(row[19:26]),
+        "profile": row[26],
+        "content_hash": row[27],
+        "batch_id": row[28],
+        "duplicate_of": row[29],
+    }
+
+
+def _timings(values) -> dict:
+    """Phase column values (INGEST_PHASES order, then total) as {phase: ms}, unset phases omitted."""
+    names = (*INGEST_PHASES, "total")
+    return {name: round(v, 1) for name, v in zip(names, values) if v is not None}
+
+
+def create_ingestion_job(conn, filename: str, mode: str, account_id, upload_path: str,
+                         bytes_total: int, profile: str | None = None,
+                         content_hash: str | None = None, status: str = "queued",
+                         batch_id: str | None = None, duplicate_of: int | None = None) -> dict:
+    """
+    Insert an ingestion job and return it. ``profile`` forces a bank
+    format; a job created with a status other than queued is never claimed.
+    ``duplicate_of`` links a placeholder run to the run it repeats.
+    """
+    row = conn.execute(
+        f"""
+        INSERT INTO ingestion_runs
+            (filename, inserted_count, skipped_count, status, mode, account_id,
+             upload_path, bytes_total, profile, content_hash, batch_id, duplicate_of, updated_at)
+        VALUES (?, 0, 0, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        RETURNING {_JOB_COLUMNS}
+        """,
+        [filename, status, mode, account_id, upload_path, bytes_total, profile, content_hash, batch_id,
+         duplicate_of],
+    ).fetchone()
+    return _row_to_job(row)
+
+
+def get_ingestion_job(conn, job_id: int) -> dict | None:
+    row = conn.execute(
+        f"SELECT {_JOB_COLUMNS} FROM ingestion_runs WHERE id = ?",
+        [job_id],
+    ).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def claim_next_ingestion_job(conn) -> dict | None:
+    """
+    Move the oldest queued job to 'parsing' and return it, or None if the queue is empty.
+    """
+    row = conn.execute(
+        """
+        UPDATE ingestion_runs
+        SET status = 'parsing',
+            started_at = COALESCE(started_at, CURRENT_TIMESTAMP),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = (SELECT MIN(id) FROM ingestion_runs WHERE status = 'queued')
+        RETURNING id
+        """
+    ).fetchone()
+    return get_ingestion_job(conn, row[0]) if row else None
+
+
+def claim_batch_ingestion_jobs(conn, batch_id: str, mode: str) -> list[dict]:
+    """Move every queued job of an upload batch in ``mode`` to 'parsing' and return them."""
+    rows = conn.execute(
+        """
+        UPDATE ingestion_runs
+        SET status = 'parsing',
+            started_at = COALESCE(started_at, CURRENT_TIMESTAMP),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE batch_id = ? AND mode = ? AND status = 'queued'
+        RETURNING id
+        """,
+        [batch_id, mode],
+    ).fetchall()
+    return [get_ingestion_job(conn, r[0]) for r in sorted(rows)]
+
+
+def list_batch_jobs(conn, batch_id: str) -> list[dict]:
+    rows = conn.execute(
+        f"SELECT {_JOB_COLUMNS} FROM ingestion_runs WHERE batch_id = ? ORDER BY id",
+        [batch_id],
+    ).fetchall()
+    return [_row_to_job(r) for r in rows]
+
+
+def list_interrupted_ingestion_jobs(conn) -> list[dict]:
+    """Jobs a previous process left mid-phase."""
+    rows = conn.execute(
+        f"""
+        SELECT {_JOB_COLUMNS} FROM ingestion_runs
+        WHERE status IN ('parsing', 'matching', 'inserting')
+        ORDER BY id
+        """
+    ).fetchall()
+    return [_row_to_job(r) for r in rows]
+
+
+def fail_orphaned_reviews(conn, error: str) -> list[int]:
+    """Mark every awaiting_review job failed with ``error``. Returns their ids."""
+    rows = conn.execute(
+        """
+        UPDATE ingestion_runs
+        SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE status = 'awaiting_review'
+        RETURNING id
+        """,
+        [error],
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def update_ingestion_progress(conn, job_id: int, **fields) -> None:
+    """
+    Set any of the progress fields (status, bytes_processed, rows_parsed,
+    rows_matched, inserted_count, skipped_count, review_session_id) or
+    diagnostics (row_count, <phase>_ms).
+    """
+    unknown = set(fields) - set(_PROGRESS_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown ingestion progress fields: {sorted(unknown)}")
+    if not fields:
+        return
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn.execute(
+        f"UPDATE ingestion_runs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        [*fields.values(), job_id],
+    )
+
+
+def finish_ingestion_job(conn, job_id: int, status: str, error: str | None = None) -> None:
+    """Set a final status (completed | duplicate | awaiting_review | failed) and drop the upload path."""
+    conn.execute(
+        """
+        UPDATE ingestion_runs
+        SET status = ?,
+            error = ?,
+            upload_path = NULL,
+            finished_at = CURRENT_TIMESTAMP,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        """,
+        [status, error, job_id],
+    )
+
+
+def requeue_ingestion_job(conn, job_id: int) -> None:
+    """Reset progress and put a job back in the queue."""
+    conn.execute(
+        """
+        UPDATE ingestion_runs
+        SET status = 'queued', bytes_processed = 0, rows_parsed = 0, rows_matched = 0,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+        """,
+        [job_id],
+    )
+
+
+def find_completed_run_by_hash(conn, content_hash: str, account_id) -> dict | None:
+    """
+    Latest completed run of the same file content into the same account
+    whose rows are all still in the ledger, if any. Placeholder runs of
+    re-uploads have status 'duplicate' and never match, so once the
+    original is undone (or its rows deleted) the file imports again.
+    """
+    row = conn.execute(
+        f"""
+        SELECT {_JOB_COLUMNS} FROM ingestion_runs r
+        WHERE content_hash = ?
+          AND account_id IS NOT DISTINCT FROM ?
+          AND status = 'completed'
+          AND inserted_count = (SELECT count(*) FROM transactions t WHERE t.ingestion_run_id = r.id)
+          AND NOT EXISTS (
+              SELECT 1 FROM ingestion_row_fingerprints f
+              WHERE f.run_id = r.id
+                AND NOT EXISTS (SELECT 1 FROM transactions t WHERE t.fingerprint = f.tx_fingerprint)
+          )
+        ORDER BY id DESC
+        LIMIT 1
+        """,
+        [content_hash, account_id],
+    ).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def mark_duplicate_runs_undone(conn, run_id: int) -> int:
+    """Mark the 'duplicate' placeholder runs of ``run_id`` as undone. Returns their count."""
+    rows = conn.execute(
+        """
+        UPDATE ingestion_runs
+        SET status = 'undone', updated_at = CURRENT_TIMESTAMP
+        WHERE duplicate_of = ? AND status = 'duplicate'
+        RETURNING id
+        """,
+        [run_id],
+    ).fetchall()
+    return len(rows)
+
+
+# -----------------------------
+# Raw row fingerprints
+# -----------------------------
+
+def find_known_fingerprints(conn, fingerprints: list[int]) -> set[int]:
+    """
+    The subset of ``fingerprints`` recorded by earlier runs whose ledger
+    row still exists; rows deleted since then are imported again.
+    """
+    import pyarrow as pa
+
+    if not fingerprints:
+        return set()
+    conn.register("fingerprint_batch", pa.table({"fingerprint": pa.array(fingerprints, pa.int64())}))
+    try:
+        rows = conn.execute(
+            """
+            SELECT DISTINCT b.fingerprint
+            FROM fingerprint_batch b
+            JOIN ingestion_row_fingerprints f ON f.fingerprint = b.fingerprint
+            SEMI JOIN transactions t ON t.fingerprint = f.tx_fingerprint
+            """
+        ).fetchall()
+    finally:
+        conn.unregister("fingerprint_batch")
+    return {r[0] for r in rows}
+
+
+def record_known_fingerprints(conn, run_id: int, fingerprints: list[int]) -> None:
+    """
+    Record for ``run_id`` the live entries of ``fingerprints`` that earlier
+    runs recorded, so the run covers rows it skipped as already imported.
+    """
+    import pyarrow as pa
+
+    if not fingerprints:
+        return
+    conn.register("fingerprint_batch", pa.table({"fingerprint": pa.array(fingerprints, pa.int64())}))
+    try:
+        conn.execute(
+            """
+            INSERT INTO ingestion_row_fingerprints (run_id, fingerprint, tx_fingerprint)
+            SELECT DISTINCT ?, f.fingerprint, f.tx_fingerprint
+            FROM fingerprint_batch b
+            JOIN ingestion_row_fingerprints f ON f.fingerprint = b.fingerprint
+            SEMI JOIN transactions t ON t.fingerprint = f.tx_fingerprint
+            """,
+            [run_id],
+        )
+    finally:
+        conn.unregister("fingerprint_batch")
+
+
+def record_row_fingerprints(conn, run_id: int, rows: list[dict]) -> int:
+    """
+    Remember the raw ``fingerprint`` of rows a run put in the ledger, with
+    the tx_fingerprint of their account_id, date, description and amount.
+    Returns the number stored.
+    """
+    import pyarrow as pa
+
+    if not rows:
+        return 0
+    conn.register("fingerprint_batch", pa.table({
+        "fingerprint": pa.array([row["fingerprint"] for row in rows], pa.int64()),
+        "account_id": pa.array([row["account_id"] for row in rows], pa.int64()),
+        "date": pa.array([row["date"] for row in rows], pa.string()),
+        "description": pa.array([row["description"] for row in rows], pa.string()),
+        "amount": pa.array([row["amount"] for row in rows], pa.float64()),
+    }))
+    try:
+        conn.execute(
+            """
+            INSERT INTO ingestion_row_fingerprints (run_id, fingerprint, tx_fingerprint)
+            SELECT ?, fingerprint, tx_fingerprint(account_id, date, description, amount)
+            FROM fingerprint_batch
+            """,
+            [run_id],
+        )
+    finally:
+        conn.unregister("fingerprint_batch")
+    return len(rows)
+
+
+
+# -----------------------------
+# Run provenance and undo
+# -----------------------------
+# Rows an ingest inserts carry transactions.ingestion_run_id; existing rows
+# a reconciliation run rewrites are snapshotted in ingestion_run_revisions
+# first. Undo deletes the former and restores the latter, set-based.
+
+_REVISION_COLUMNS = (
+    "date", "description", "amount", "balance", "source", "source_id",
+    "reconciliation_status", "merchant_id", "merchant_normalized",
+    "recurring_event_id", "fingerprint",
+)
+
+
+def tag_ingestion_run_rows(conn, run_id: int, transaction_ids: list[int]) -> None:
+    """Set ingestion_run_id on rows inserted before their run was recorded."""
+    import pyarrow as pa
+
+    if not transaction_ids:
+        return
+    conn.register("run_rows", pa.table({"id": pa.array(transaction_ids, pa.int64())}))
+    try:
+        conn.execute(
+            "UPDATE transactions SET ingestion_run_id = ? WHERE id IN (SELECT id FROM run_rows)",
+            [run_id],
+        )
+    finally:
+        conn.unregister("run_rows")
+
+
+def record_run_revisions(conn, run_id: int, transaction_ids: list[int]) -> None:
+    """Snapshot the current values of rows a run is about to rewrite (first snapshot wins)."""
+    if not transaction_ids:
+        return
+    conn.execute(
+        f"""
+        INSERT INTO ingestion_run_revisions (run_id, transaction_id, {", ".join(_REVISION_COLUMNS)})
+        SELECT ?, id, {", ".join(_REVISION_COLUMNS)}
+        FROM transactions
+        WHERE id IN (SELECT unnest(?::BIGINT[]))
+        ON CONFLICT (run_id, transaction_id) DO NOTHING
+        """,
+        [run_id, list(transaction_ids)],
+    )
+
+
+def undo_ingestion_run(conn, run_id: int) -> dict:
+    """
+    Delete the rows ``run_id`` inserted, restore the rows it rewrote and
+    forget its raw row fingerprints, moving rollup contributions to match.
+    Run inside the caller's transaction. Returns {"deleted", "reverted"}.
+    """
+    conn.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE undo_inserted AS
+        SELECT id FROM transactions WHERE ingestion_run_id = ?
+        """,
+        [run_id],
+    )
+    conn.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE undo_revised AS
+        SELECT transaction_id AS id FROM ingestion_run_revisions WHERE run_id = ?
+        """,
+        [run_id],
+    )
+    try:
+        adjust_rollup_for_relation(conn, "undo_inserted", -1)
+        adjust_rollup_for_relation(conn, "undo_revised", -1)
+        conn.execute("DELETE FROM transactions WHERE ingestion_run_id = ?", [run_id])
+        conn.execute(
+            f"""
+            UPDATE transactions AS t
+            SET {", ".join(f"{c} = r.{c}" for c in _REVISION_COLUMNS)}
+            FROM ingestion_run_revisions r
+            WHERE r.run_id = ? AND t.id = r.transaction_id
+            """,
+            [run_id],
+        )
+        adjust_rollup_for_relation(conn, "undo_revised", +1)
+        conn.execute("DELETE FROM ingestion_run_revisions WHERE run_id = ?", [run_id])
+        conn.execute("DELETE FROM ingestion_row_fingerprints WHERE run_id = ?", [run_id])
+        deleted = conn.execute("SELECT count(*) FROM undo_inserted").fetchone()[0]
+        reverted = conn.execute(
+            "SELECT count(*) FROM undo_revised WHERE id IN (SELECT id FROM transactions)"
+        ).fetchone()[0]
+    finally:
+        conn.execute("DROP TABLE IF EXISTS undo_inserted")
+        conn.execute("DROP TABLE IF EXISTS undo_revised")
+    return {"deleted": deleted, "reverted": reverted}
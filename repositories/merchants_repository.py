@@ -0,0 +1,52 @@
+def intern_merchants(conn, merchant_names: list[str]) -> dict[str, int]:
+    """
+    Ensure every name in ``merchant_names`` has a row in merchants and
+    return {merchant_normalized: id} for all of them.
+    Empty names are ignored.
+
+    Names are handed to DuckDB as an Arrow table: a bound list parameter
+    converts value by value, which dominates for bulk imports.
+    """
+    import pyarrow as pa
+
+    names = sorted({n for n in merchant_names if n})
+    if not names:
+        return {}
+
+    conn.register("intern_names", pa.table({"name": pa.array(names, pa.string())}))
+    try:
+        conn.execute(
+            """
+            INSERT INTO merchants (merchant_normalized)
+            SELECT name FROM intern_names
+            ON CONFLICT (merchant_normalized) DO NOTHING
+            """
+        )
+        rows = conn.execute(
+            """
+            SELECT m.merchant_normalized, m.id
+            FROM merchants m
+            SEMI JOIN intern_names n ON n.name = m.merchant_normalized
+            """
+        ).fetchall()
+    finally:
+        conn.unregister("intern_names")
+    return {r[0]: r[1] for r in rows}
+
+
+def get_merchant_ids(conn, merchant_names: list[str]) -> list[int]:
+    """
+    Return ids for the given names that already exist in merchants.
+    Deterministic read.
+    """
+    if not merchant_names:
+        return []
+    rows = conn.execute(
+        """
+        SELECT id
+        FROM merchants
+        WHERE merchant_normalized IN (SELECT unnest(?::VARCHAR[]))
+        """,
+        [merchant_names],
+    ).fetchall()
+    return [r[0] for r in rows]
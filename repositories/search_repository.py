@@ -0,0 +1,143 @@
+# -----------------------------
+# Transaction search (DuckDB FTS + fallbacks)
+# -----------------------------
+# The FTS index lives in schema fts_main_transactions and is built over
+# description and merchant_normalized. DuckDB FTS indexes are static
+# snapshots: rows written after a build are only searchable after the
+# next rebuild (see services.search_service for refresh scheduling).
+
+_RESULT_COLUMNS = """
+    t.id, t.account_id, t.date, t.description, t.merchant_normalized,
+    t.amount, t.category, t.source
+"""
+
+
+def load_fts(conn, install: bool = False) -> None:
+    """LOAD the fts extension on this connection, optionally INSTALLing it first."""
+    if install:
+        conn.execute("INSTALL fts")
+    conn.execute("LOAD fts")
+
+
+def fts_index_exists(conn) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM information_schema.schemata WHERE schema_name = 'fts_main_transactions'"
+    ).fetchone()
+    return row is not None
+
+
+def rebuild_fts_index(conn) -> None:
+    """(Re)build the BM25 index over description and merchant_normalized."""
+    conn.execute(
+        """
+        PRAGMA create_fts_index(
+            'transactions', 'id', 'description', 'merchant_normalized',
+            stemmer = 'english', stopwords = 'english',
+            strip_accents = 1, lower = 1, overwrite = 1
+        )
+        """
+    )
+
+
+def search_fts(conn, query: str, limit: int) -> list[dict]:
+    """Top ``limit`` transactions by BM25 score for ``query``."""
+    rows = conn.execute(
+        f"""
+        SELECT * FROM (
+            SELECT {_RESULT_COLUMNS},
+                   fts_main_transactions.match_bm25(t.id, ?) AS score
+            FROM transactions t
+        )
+        WHERE score IS NOT NULL
+        ORDER BY score DESC, date DESC, id DESC
+        LIMIT ?
+        """,
+        [query, limit],
+    ).fetchall()
+    return [_result_row(r) for r in rows]
+
+
+def search_substring(conn, query: str, limit: int) -> list[dict]:
+    """Case-insensitive substring match on description, newest first (score 1.0)."""
+    rows = conn.execute(
+        f"""
+        SELECT {_RESULT_COLUMNS}, 1.0 AS score
+        FROM transactions t
+        WHERE t.description ILIKE ? OR t.merchant_normalized ILIKE ?
+        ORDER BY t.date DESC, t.id DESC
+        LIMIT ?
+        """,
+        [f"%{query}%", f"%{query}%", limit],
+    ).fetchall()
+    return [_result_row(r) for r in rows]
+
+
+def search_fuzzy(conn, query: str, tokens: list[str], threshold: float,
+                 candidates: int, limit: int) -> list[dict]:
+    """
+    Transactions of merchants trigram-similar to ``query``, best merchant
+    score first, then newest. A merchant scores the better of whole-string
+    similarity and the mean, over ``tokens``, of each token's best match
+    among the merchant's words. Only the ``candidates`` merchants ranked
+    highest by the same shape of score under jaro_winkler_similarity (native,
+    cheap) get the exact trigram score; those below ``threshold`` are dropped.
+    """
+    rows = conn.execute(
+        f"""
+        WITH tokens AS (
+            SELECT unnest(?::VARCHAR[]) AS token, unnest(range(len(?::VARCHAR[]))) AS pos
+        ),
+        merchant_words AS (
+            SELECT id, merchant_normalized AS name,
+                   unnest(COALESCE(NULLIF(string_split(merchant_normalized, ' '), ['']),
+                                   [merchant_normalized])) AS word
+            FROM merchants
+        ),
+        candidates AS (
+            SELECT id, name, greatest(jaro_winkler_similarity(?, name), avg(best)) AS rough
+            FROM (
+                SELECT w.id, w.name, t.pos, max(jaro_winkler_similarity(t.token, w.word)) AS best
+                FROM merchant_words w, tokens t
+                GROUP BY w.id, w.name, t.pos
+            )
+            GROUP BY id, name
+            ORDER BY rough DESC, id
+            LIMIT ?
+        ),
+        scores AS (
+            SELECT id, greatest(trigram_similarity(?, name), avg(best)) AS score
+            FROM (
+                SELECT c.id, c.name, t.pos, max(trigram_similarity(t.token, w.word)) AS best
+                FROM candidates c
+                JOIN merchant_words w ON w.id = c.id
+                CROSS JOIN tokens t
+                GROUP BY c.id, c.name, t.pos
+            )
+            GROUP BY id, name
+            HAVING score >= ?
+            ORDER BY score DESC, id
+            LIMIT ?
+        )
+        SELECT {_RESULT_COLUMNS}, s.score
+        FROM transactions t
+        JOIN scores s ON s.id = t.merchant_id
+        ORDER BY s.score DESC, t.date DESC, t.id DESC
+        LIMIT ?
+        """,
+        [tokens, tokens, query, candidates, query, threshold, limit, limit],
+    ).fetchall()
+    return [_result_row(r) for r in rows]
+
+
+def _result_row(r) -> dict:
+    return {
+        "id": r[0],
+        "account_id": r[1],
+        "date": r[2],
+        "description": r[3],
+        "merchant_normalized": r[4],
+        "amount": r[5],
+        "category": r[6],
+        "source": r[7],
+        "score": round(float(r[8]), 4),
+    }
@@ -0,0 +1,190 @@
+import re
+
+# -----------------------------
+# Monthly category spend rollup
+# -----------------------------
+# category_month_spend holds one row per (account_id, month, category).
+# DuckDB has no triggers, so every ledger write calls adjust_rollup_for_ids:
+# with sign=-1 for the rows' old values (before update/delete) and sign=+1
+# for their new values (after insert/update). rebuild_rollup recomputes the
+# whole table from transactions. Services bump the ledger version
+# (db.bump_ledger_version) once the write is committed, not these helpers.
+
+# Primary key columns cannot be NULL; uncategorized rows are bucketed under ''
+UNCATEGORIZED_KEY = ''
+
+
+def adjust_rollup_for_ids(conn, transaction_ids: list[int], sign: int) -> None:
+    """
+    Add (sign=+1) or subtract (sign=-1) the current contribution of the given
+    transactions to their month buckets. One set-based upsert, regardless of
+    how many rows or buckets are touched.
+    """
+    if not transaction_ids:
+        return
+    _adjust_rollup(conn, "SELECT unnest(?::BIGINT[])", [list(transaction_ids)], sign)
+
+
+def adjust_rollup_for_relation(conn, relation: str, sign: int) -> None:
+    """
+    adjust_rollup_for_ids for ids held in the ``id`` column of a table or
+    registered Arrow relation; avoids binding large Python lists.
+    """
+    _adjust_rollup(conn, f"SELECT id FROM {relation}", [], sign)
+
+
+def _adjust_rollup(conn, ids_sql: str, ids_params: list, sign: int) -> None:
+    conn.execute(
+        f"""
+        INSERT INTO category_month_spend
+            (account_id, month, category, total_amount, income, expenses, tx_count)
+        SELECT account_id,
+               CAST(date_trunc('month', date) AS DATE),
+               COALESCE(category, ?),
+               ? * SUM(amount),
+               ? * SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+               ? * SUM(CASE WHEN amount < 0 THEN amount ELSE 0 END),
+               ? * COUNT(*)
+        FROM transactions
+        WHERE id IN ({ids_sql})
+        GROUP BY 1, 2, 3
+        ON CONFLICT (account_id, month, category) DO UPDATE SET
+            total_amount = category_month_spend.total_amount + excluded.total_amount,
+            income = category_month_spend.income + excluded.income,
+            expenses = category_month_spend.expenses + excluded.expenses,
+            tx_count = category_month_spend.tx_count + excluded.tx_count
+        """,
+        [UNCATEGORIZED_KEY, sign, sign, sign, sign, *ids_params],
+    )
+    if sign < 0:
+        conn.execute("DELETE FROM category_month_spend WHERE tx_count <= 0")
+
+
+def rebuild_rollup(conn) -> int:
+    """
+    Recompute category_month_spend from the full ledger.
+    Returns the number of buckets written.
+    """
+    conn.execute("DELETE FROM category_month_spend")
+    conn.execute(
+        """
+        INSERT INTO category_month_spend
+            (account_id, month, category, total_amount, income, expenses, tx_count)
+        SELECT account_id,
+               CAST(date_trunc('month', date) AS DATE),
+               COALESCE(category, ?),
+               SUM(amount),
+               SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+               SUM(CASE WHEN amount < 0 THEN amount ELSE 0 END),
+               COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2, 3
+        """,
+        [UNCATEGORIZED_KEY],
+    )
+    return conn.execute("SELECT COUNT(*) FROM category_month_spend").fetchone()[0]
+
+
+def get_month_spend_by_category(conn, month=None) -> list[dict]:
+    """
+    Return net amount per category for the month containing ``month``
+    (a date or 'YYYY-MM-DD' string; defaults to the current month),
+    summed across accounts. Deterministic read of the rollup.
+    """
+    rows = conn.execute(
+        """
+        SELECT NULLIF(category, ?), SUM(total_amount)
+        FROM category_month_spend
+        WHERE month = CAST(date_trunc('month', COALESCE(CAST(? AS DATE), current_date)) AS DATE)
+        GROUP BY 1
+        """,
+        [UNCATEGORIZED_KEY, month],
+    ).fetchall()
+    return [
+        {
+            "category_name": r[0],
+            "current_spend": round(float(r[1]), 2) if r[1] is not None else 0.0,
+        }
+        for r in rows
+    ]
+
+
+def get_spend_pivot(conn, month_keys: list[str]) -> list[dict]:
+    """
+    Category x month spend matrix for ``month_keys`` (ascending 'YYYY-MM'),
+    as one DuckDB PIVOT over the rollup joined to active budgets.
+
+    Returns one dict per category: category (None for uncategorized),
+    monthly_budget (None if no active budget), spent (list aligned with
+    month_keys; net outflow clamped at 0, so months with net inflow such
+    as salary and months with no activity are 0.0).
+    Budgeted categories with no spend in the window are included.
+    """
+    if not month_keys:
+        return []
+    # PIVOT ... IN takes literals, not parameters; keys are validated first
+    if not all(re.fullmatch(r"\d{4}-\d{2}", k) for k in month_keys):
+        raise ValueError("month keys must be YYYY-MM")
+    in_list = ", ".join(f"'{k}'" for k in month_keys)
+
+    rows = conn.execute(
+        f"""
+        WITH spend AS (
+            SELECT NULLIF(category, ?) AS category,
+                   strftime(month, '%Y-%m') AS ym,
+                   greatest(-SUM(total_amount), 0) AS spent
+            FROM category_month_spend
+            WHERE month BETWEEN CAST(? AS DATE) AND CAST(? AS DATE)
+            GROUP BY 1, 2
+        ), pivoted AS (
+            PIVOT spend ON ym IN ({in_list}) USING SUM(spent) GROUP BY category
+        )
+        SELECT COALESCE(p.category, b.category_name) AS category,
+               b.monthly_budget,
+               COLUMNS('^\\d{{4}}-\\d{{2}}$')
+        FROM pivoted p
+        FULL OUTER JOIN (
+            SELECT category_name, monthly_budget
+            FROM category_budgets
+            WHERE active
+        ) b ON b.category_name = p.category
+        ORDER BY 1 NULLS LAST
+        """,
+        [UNCATEGORIZED_KEY, f"{month_keys[0]}-01", f"{month_keys[-1]}-01"],
+    ).fetchall()
+
+    return [
+        {
+            "category": r[0],
+            "monthly_budget": r[1],
+            "spent": [round(float(v), 2) if v is not None else 0.0 for v in r[2:]],
+        }
+        for r in rows
+    ]
+
+
+def count_from_rollup(conn, start_month=None, end_month=None,
+                      category: str | None = None, account_id=None) -> int:
+    """
+    Transaction count from the rollup for whole months in [start_month,
+    end_month] (either bound optional), optionally for one category and
+    account. Reads bucket rows only.
+    """
+    where = "WHERE 1=1"
+    params = []
+    if start_month is not None:
+        where += " AND month >= CAST(date_trunc('month', CAST(? AS DATE)) AS DATE)"
+        params.append(start_month)
+    if end_month is not None:
+        where += " AND month <= CAST(date_trunc('month', CAST(? AS DATE)) AS DATE)"
+        params.append(end_month)
+    if category is not None:
+        where += " AND category = ?"
+        params.append(category)
+    if account_id is not None:
+        where += " AND account_id = ?"
+        params.append(account_id)
+    row = conn.execute(
+        f"SELECT COALESCE(SUM(tx_count), 0) FROM category_month_spend {where}", params
+    ).fetchone()
+    return int(row[0])
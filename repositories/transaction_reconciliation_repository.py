@@ -4,6 +4,10 @@ from typing import Dict, List, Optional, Tuple
 import re
 import uuid
 
+from repositories.spend_rollup_repository import adjust_rollup_for_ids
+from repositories.transactions_repository import find_existing_batch_rows
+from repositories.ingestion_repository import record_run_revisions
+
 
 def set_transaction_recurring_link(*, transaction_id: int, recurring_event_id: int | None) -> None:
     """Update transactions.recurring_event_id for the given transaction id."""
@@ -316,7 +320,9 @@ def finalize_reconciliation(conn, account_id: int, reconciliation_data: dict, ap
     Inputs:
     - conn: Database connection
     - account_id: User's account ID
-    - reconciliation_data: Original reconciliation result from reconcile_csv_with_manual
+    - reconciliation_data: Original reconciliation result from reconcile_csv_with_manual;
+      csv_rows are expected to carry merchant_normalized / merchant_id
+      (see services.merchant_service.annotate_merchant_fields)
     - approvals: dict with keys:
       * 'approved_indices': list of (csv_idx, manual_id) tuples to apply
       * 'add_as_new_indices': list of csv_idx values the user wants inserted as new transactions
@@ -326,6 +332,10 @@ def finalize_reconciliation(conn, account_id: int, reconciliation_data: dict, ap
     - For each approved match: UPDATE transactions with CSV data, mark as matched
     - For unmatched CSV rows: INSERT as new transactions
     - For unmatched manual entries: UPDATE reconciliation_status='unmatched'
+
+    With reconciliation_data['ingestion_run_id'] set, inserted rows are
+    tagged with it and the prior values of every row updated here are
+    recorded first (see ingestion_repository.undo_ingestion_run).
     
     Returns:
     - result: dict with keys:
@@ -347,6 +357,13 @@ def finalize_reconciliation(conn, account_id: int, reconciliation_data: dict, ap
         existing_entries = reconciliation_data.get('existing_entries', reconciliation_data.get('manual_entries', []))
         existing_entries_map = {e['id']: e for e in existing_entries}
 
+        run_id = reconciliation_data.get('ingestion_run_id')
+        matched_manual_ids = {mid for _, mid in approved_set}
+        if run_id is not None:
+            record_run_revisions(conn, run_id, sorted(
+                matched_manual_ids | set(reconciliation_data['unmatched_manual'])
+            ))
+
         # Apply approved matches
         for csv_idx, existing_id in approved_set:
             csv_row = csv_rows[csv_idx]
@@ -354,6 +371,8 @@ def finalize_reconciliation(conn, account_id: int, reconciliation_data: dict, ap
 
             if existing_entry.get('source') == 'manual':
                 # Manual entry: update with authoritative CSV data
+                # (amount/date change, so move its rollup contribution)
+                adjust_rollup_for_ids(conn, [existing_id], -1)
                 conn.execute("""
                 UPDATE transactions
                 SET source = 'csv',
@@ -361,17 +380,26 @@ def finalize_reconciliation(conn, account_id: int, reconciliation_data: dict, ap
                     reconciliation_status = 'matched',
                     amount = ?,
                     description = ?,
+                    merchant_normalized = ?,
+                    merchant_id = ?,
                     date = ?,
-                    balance = ?
+                    balance = ?,
+                    fingerprint = tx_fingerprint(account_id, ?, ?, ?)
                 WHERE id = ?
                 """, [
                     reconciliation_data['session_id'],
                     csv_row.get('amount'),
                     csv_row.get('description'),
+                    csv_row.get('merchant_normalized'),
+                    csv_row.get('merchant_id'),
                     csv_row.get('date'),
                     csv_row.get('balance'),
+                    csv_row.get('date'),
+                    csv_row.get('description'),
+                    csv_row.get('amount'),
                     existing_id
                 ])
+                adjust_rollup_for_ids(conn, [existing_id], +1)
                 # Tag with recurring_event_id if a matching event is found
                 rec_event_id = _find_matching_recurring_event(
                     conn, csv_row.get('amount'), csv_row.get('date')
@@ -400,46 +428,56 @@ def finalize_reconciliation(conn, account_id: int, reconciliation_data: dict, ap
         
         # Insert unmatched CSV rows and any review-match rows the user chose "Add as New"
         matched_csv_indices = {idx for idx, _ in approved_set}
-        indices_to_insert = set(reconciliation_data['unmatched_csv']) | add_as_new_set
+        indices_to_insert = sorted(
+            (set(reconciliation_data['unmatched_csv']) | add_as_new_set) - matched_csv_indices
+        )
+
+        # Duplicate detection for all candidate rows in one query
+        existing = find_existing_batch_rows(conn, [
+            {
+                'row_number': csv_idx,
+                'account_id': account_id,
+                'date': csv_rows[csv_idx].get('date'),
+                'description': csv_rows[csv_idx].get('description'),
+                'amount': csv_rows[csv_idx].get('amount'),
+            }
+            for csv_idx in indices_to_insert
+        ])
+        seen_keys = set()
         for csv_idx in indices_to_insert:
-            if csv_idx in matched_csv_indices:
-                continue  # Skip if user approved a match for this row
-            
             csv_row = csv_rows[csv_idx]
-
-            # Check if transaction already exists (duplicate detection)
-            existing = conn.execute("""
-            SELECT id FROM transactions
-            WHERE account_id = ? AND date = ? AND description = ? AND amount = ?
-            """, [
-                account_id,
-                csv_row.get('date'),
-                csv_row.get('description'),
-                csv_row.get('amount')
-            ]).fetchone()
-
-            if existing:
+            key = (csv_row.get('date'), csv_row.get('description'), csv_row.get('amount'))
+            if csv_idx in existing or key in seen_keys:
                 # Duplicate found, skip it silently
                 continue
+            seen_keys.add(key)
 
             new_row = conn.execute("""
             INSERT INTO transactions
-            (account_id, date, description, amount, balance, category, source, source_id, reconciliation_status)
-            VALUES (?, ?, ?, ?, ?, ?, 'csv', ?, 'matched')
+            (account_id, date, description, merchant_normalized, merchant_id, amount, balance, category, source, source_id, reconciliation_status, fingerprint, ingestion_run_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'csv', ?, 'matched', tx_fingerprint(?, ?, ?, ?), ?)
             RETURNING id
             """, [
                 account_id,
                 csv_row.get('date'),
                 csv_row.get('description'),
+                csv_row.get('merchant_normalized'),
+                csv_row.get('merchant_id'),
                 csv_row.get('amount'),
                 csv_row.get('balance'),
                 csv_row.get('category'),
-                reconciliation_data['session_id']
+                reconciliation_data['session_id'],
+                account_id,
+                csv_row.get('date'),
+                csv_row.get('description'),
+                csv_row.get('amount'),
+                run_id,
             ]).fetchone()
             inserted_count += 1
 
             # Tag with recurring_event_id if a matching event is found
             if new_row:
+                adjust_rollup_for_ids(conn, [new_row[0]], +1)
                 rec_event_id = _find_matching_recurring_event(
                     conn, csv_row.get('amount'), csv_row.get('date')
                 )
@@ -450,7 +488,6 @@ def finalize_reconciliation(conn, account_id: int, reconciliation_data: dict, ap
                     )
         
         # Mark unmatched manual entries
-        matched_manual_ids = {mid for _, mid in approved_set}
         for manual_id in reconciliation_data['unmatched_manual']:
             if manual_id in matched_manual_ids:
                 continue  # Skip if user manually approved a match
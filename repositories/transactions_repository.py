@@ -1,4 +1,5 @@
 from db import get_db
+from repositories.spend_rollup_repository import adjust_rollup_for_ids, adjust_rollup_for_relation
 
 # -----------------------------
 # Transactions Repository
@@ -18,6 +19,8 @@ def insert_transaction(conn, date, description, amount,
       backwards-compatible for callers that continue to pass ``conn`` as the
       first argument and ``account_name`` as a keyword.
 
+    Returns the new transaction id and folds it into the monthly spend rollup.
+
     Raises ``ValueError`` on unique‑constraint violations.
     """
     # resolve account identifier
@@ -39,14 +42,17 @@ def insert_transaction(conn, date, description, amount,
             ).fetchone()[0]
 
     try:
-        conn.execute(
+        transaction_id = conn.execute(
             """
             INSERT INTO transactions
-            (account_id, date, description, amount, balance, category, source, user_id, merchant_id, merchant_normalized)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (account_id, date, description, amount, balance, category, source, user_id, merchant_id,
+             merchant_normalized, fingerprint)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, tx_fingerprint(?, ?, ?, ?))
+            RETURNING id
             """,
-            (account_id, date, description, amount, balance, category, source, user_id, merchant_id, merchant_normalized)
-        )
+            (account_id, date, description, amount, balance, category, source, user_id, merchant_id,
+             merchant_normalized, account_id, date, description, amount)
+        ).fetchone()[0]
     except Exception as e:
         msg = str(e).lower()
         if "unique" in msg:
@@ -54,6 +60,95 @@ def insert_transaction(conn, date, description, amount,
         else:
             raise
 
+    adjust_rollup_for_ids(conn, [transaction_id], +1)
+    return transaction_id
+
+def _batch_table(rows: list[dict], columns: dict):
+    import pyarrow as pa
+
+    return pa.table({c: pa.array([row.get(c) for row in rows], t) for c, t in columns.items()})
+
+
+def find_existing_batch_rows(conn, rows: list[dict]) -> set[int]:
+    """
+    ``row_number`` of each prepared row whose unique key (account_id, date,
+    description, amount) is already in the ledger. One semi-join per batch,
+    pruned by the indexed 64-bit fingerprint (see tx_fingerprint in
+    db.init_db); the key columns are rechecked so a hash collision cannot
+    drop a new row.
+    """
+    import pyarrow as pa
+
+    if not rows:
+        return set()
+    batch = _batch_table(rows, {
+        "row_number": pa.int64(), "account_id": pa.int64(), "date": pa.string(),
+        "description": pa.string(), "amount": pa.float64(),
+    })
+    conn.register("ingest_keys", batch)
+    try:
+        found = conn.execute(
+            """
+            WITH b AS (
+                SELECT row_number, account_id, CAST(date AS DATE) AS date, description, amount,
+                       tx_fingerprint(account_id, date, description, amount) AS fingerprint
+                FROM ingest_keys
+            )
+            SELECT b.row_number FROM b
+            SEMI JOIN transactions t
+                ON t.fingerprint = b.fingerprint
+               AND t.account_id = b.account_id AND t.date = b.date
+               AND t.description = b.description AND t.amount = b.amount
+            """
+        ).fetchall()
+    finally:
+        conn.unregister("ingest_keys")
+    return {r[0] for r in found}
+
+
+def insert_transactions_batch(conn, rows: list[dict]) -> list[tuple]:
+    """
+    Set-based insert of prepared rows (account_id, date, description, amount,
+    balance, category, source, user_id, merchant_id, merchant_normalized,
+    ingestion_run_id).
+    Folds them into the spend rollup and returns (id, date, category) for
+    each. Rows must be new: filter with find_existing_batch_rows in the same
+    transaction (a probe per row, as ON CONFLICT does, grows with the table).
+
+    The batch is handed to DuckDB as an Arrow table rather than bound list
+    parameters, which convert value by value.
+    """
+    import pyarrow as pa
+
+    if not rows:
+        return []
+    columns = {
+        "account_id": pa.int64(), "date": pa.string(), "description": pa.string(),
+        "amount": pa.float64(), "balance": pa.float64(), "category": pa.string(),
+        "source": pa.string(), "user_id": pa.int64(), "merchant_id": pa.int64(),
+        "merchant_normalized": pa.string(), "ingestion_run_id": pa.int64(),
+    }
+    conn.register("ingest_batch", _batch_table(rows, columns))
+    try:
+        inserted = conn.execute(
+            f"""
+            INSERT INTO transactions ({", ".join(columns)}, fingerprint)
+            SELECT {", ".join(columns)}, tx_fingerprint(account_id, date, description, amount)
+            FROM ingest_batch
+            RETURNING id, date, category
+            """
+        ).fetchall()
+    finally:
+        conn.unregister("ingest_batch")
+
+    conn.register("ingest_ids", pa.table({"id": pa.array([r[0] for r in inserted], pa.int64())}))
+    try:
+        adjust_rollup_for_relation(conn, "ingest_ids", +1)
+    finally:
+        conn.unregister("ingest_ids")
+    return inserted
+
+
 def transaction_exists(conn, account_name, date, description, amount):
     """
     Checks if a transaction already exists.
@@ -61,14 +156,20 @@ def transaction_exists(conn, account_name, date, description, amount):
     if not account_name:
         account_name = "Primary Account"
 
+    account = conn.execute(
+        "SELECT id FROM accounts WHERE account_name = ?", (account_name,)
+    ).fetchone()
+    if not account:
+        return False
+
     row = conn.execute(
         """
         SELECT 1
-        FROM transactions t
-        JOIN accounts a ON t.account_id = a.id
-        WHERE a.account_name = ? AND t.date = ? AND t.description = ? AND t.amount = ?
+        FROM transactions
+        WHERE fingerprint = tx_fingerprint(?, ?, ?, ?)
+          AND account_id = ? AND date = ? AND description = ? AND amount = ?
         """,
-        (account_name, date, description, amount)
+        (account[0], date, description, amount, account[0], date, description, amount)
     ).fetchone()
 
     return bool(row)
@@ -148,6 +249,144 @@ def get_transactions_filtered(conn, start_date=None, end_date=None, category=Non
         for r in rows
     ]
 
+# Filters accepted by build_transaction_filters (all optional)
+TRANSACTION_FILTER_KEYS = (
+    "start_date", "end_date", "category", "account_id", "min_amount", "max_amount",
+    "merchant", "source", "reconciliation_status", "q",
+)
+
+# sort name -> (column, descending)
+TRANSACTION_SORTS = {
+    "date_desc": ("t.date", True),
+    "date_asc": ("t.date", False),
+    "amount_desc": ("t.amount", True),
+    "amount_asc": ("t.amount", False),
+}
+
+
+def build_transaction_filters(filters: dict) -> tuple[str, list]:
+    """
+    Translate a filter dict into a SQL predicate over ``transactions t``.
+    Returns (where_sql, params); where_sql always starts with "WHERE 1=1".
+
+    merchant matches merchant_normalized exactly (callers normalize it);
+    q is a case-insensitive substring match on description.
+    """
+    where = "WHERE 1=1"
+    params = []
+    clauses = [
+        ("start_date", "t.date >= ?"),
+        ("end_date", "t.date <= ?"),
+        ("category", "t.category = ?"),
+        ("account_id", "t.account_id = ?"),
+        ("min_amount", "t.amount >= ?"),
+        ("max_amount", "t.amount <= ?"),
+        ("merchant", "t.merchant_normalized = ?"),
+        ("source", "t.source = ?"),
+        ("reconciliation_status", "t.reconciliation_status = ?"),
+    ]
+    for key, clause in clauses:
+        value = filters.get(key)
+        if value is not None and value != "":
+            where += f" AND {clause}"
+            params.append(value)
+    if filters.get("q"):
+        where += " AND t.description ILIKE ?"
+        params.append(f"%{filters['q']}%")
+    return where, params
+
+
+def get_transactions_page(conn, filters: dict, sort: str = "date_desc",
+                          after: tuple | None = None, limit: int = 100) -> list[dict]:
+    """
+    One keyset page of transactions. ``after`` is the (sort_value, id) of the
+    last row of the previous page; rows strictly after it in sort order are
+    returned. Ties on the sort column are broken by id in the same direction,
+    so paging is stable and each page costs the same regardless of depth.
+    """
+    column, descending = TRANSACTION_SORTS[sort]
+    where, params = build_transaction_filters(filters)
+    op = "<" if descending else ">"
+    if after is not None:
+        where += f" AND ({column} {op} ? OR ({column} = ? AND t.id {op} ?))"
+        params += [after[0], after[0], after[1]]
+    direction = "DESC" if descending else "ASC"
+
+    rows = conn.execute(
+        f"""
+        SELECT t.id, t.account_id, a.account_name, t.date, t.description, t.amount,
+               t.balance, t.category, t.source, t.user_id, t.merchant_id, t.merchant_normalized,
+               t.created_at, t.reconciliation_status
+        FROM transactions t
+        JOIN accounts a ON t.account_id = a.id
+        {where}
+        ORDER BY {column} {direction}, t.id {direction}
+        LIMIT ?
+        """,
+        params + [limit],
+    ).fetchall()
+    return [
+        {
+            "id": r[0],
+            "account_id": r[1],
+            "account_name": r[2],
+            "date": r[3],
+            "description": r[4],
+            "amount": r[5],
+            "balance": r[6],
+            "category": r[7],
+            "source": r[8],
+            "user_id": r[9],
+            "merchant_id": r[10],
+            "merchant_normalized": r[11],
+            "created_at": r[12],
+            "reconciliation_status": r[13],
+        }
+        for r in rows
+    ]
+
+
+def get_transactions_export_query(filters: dict) -> tuple[str, list]:
+    """
+    (sql, params) selecting every transaction matching ``filters`` in
+    (date, id) order, for streaming exports. Not executed here so callers
+    can hand it to COPY ... TO or an Arrow reader.
+    """
+    where, params = build_transaction_filters(filters)
+    sql = f"""
+    SELECT t.id, t.account_id, a.account_name, t.date, t.description, t.amount,
+           t.balance, t.category, t.source, t.merchant_normalized, t.merchant_id,
+           t.reconciliation_status, t.created_at
+    FROM transactions t
+    JOIN accounts a ON t.account_id = a.id
+    {where}
+    ORDER BY t.date, t.id
+    """
+    return sql, params
+
+
+def copy_query_to_file(conn, sql: str, params: list, path: str, fmt: str) -> None:
+    """Write a query result to ``path`` with DuckDB COPY (csv or parquet)."""
+    options = {
+        "csv": "FORMAT CSV, HEADER",
+        "parquet": "FORMAT PARQUET, COMPRESSION ZSTD",
+    }[fmt]
+    escaped = path.replace("'", "''")
+    conn.execute(f"COPY ({sql}) TO '{escaped}' ({options})", params)
+
+
+def count_transactions_capped(conn, filters: dict, cap: int) -> int:
+    """
+    Exact count of matching transactions, but stops scanning after ``cap + 1``
+    rows. A result greater than ``cap`` means "more than cap".
+    """
+    where, params = build_transaction_filters(filters)
+    return conn.execute(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM transactions t {where} LIMIT ?)",
+        params + [cap + 1],
+    ).fetchone()[0]
+
+
 def get_transaction_by_id(conn, transaction_id):
     """
     Returns a single transaction by its ID.
@@ -166,17 +405,23 @@ def get_transaction_by_id(conn, transaction_id):
 
 def update_category(conn, transaction_id, new_category):
     """
-    Updates the category of a transaction.
+    Updates the category of a transaction, moving its rollup contribution.
+    Run it inside the caller's transaction so the rollup and the ledger
+    move together.
     """
+    adjust_rollup_for_ids(conn, [transaction_id], -1)
     conn.execute(
         "UPDATE transactions SET category = ? WHERE id = ?",
         (new_category, transaction_id)
     )
+    adjust_rollup_for_ids(conn, [transaction_id], +1)
 
 def delete_transaction(conn, transaction_id):
     """
-    Deletes a transaction by ID.
+    Deletes a transaction by ID, removing its rollup contribution. Run it
+    inside the caller's transaction.
     """
+    adjust_rollup_for_ids(conn, [transaction_id], -1)
     conn.execute(
         "DELETE FROM transactions WHERE id = ?",
         (transaction_id,)
@@ -184,21 +429,127 @@ def delete_transaction(conn, transaction_id):
 
 def delete_transactions(conn, transaction_ids: list[int]) -> int:
     """
-    Deletes multiple transactions by their IDs.
+    Deletes multiple transactions by their IDs, removing their rollup
+    contribution. Run it inside the caller's transaction.
 
     Returns the number of rows actually deleted.
     """
     if not transaction_ids:
         return 0
-    placeholders = ", ".join("?" for _ in transaction_ids)
-    # Count rows that actually exist before deleting
-    existing = conn.execute(
-        f"SELECT COUNT(*) FROM transactions WHERE id IN ({placeholders})",
-        transaction_ids,
+    adjust_rollup_for_ids(conn, transaction_ids, -1)
+    deleted = conn.execute(
+        "DELETE FROM transactions WHERE id IN (SELECT unnest(?::BIGINT[])) RETURNING id",
+        [list(transaction_ids)],
+    ).fetchall()
+    return len(deleted)
+
+
+def bulk_update_category(conn, transaction_ids: list[int], category) -> int:
+    """
+    Sets ``category`` on all given transactions with one UPDATE, moving
+    their rollup contribution. Run it inside the caller's transaction.
+    Returns the number of rows updated.
+    """
+    if not transaction_ids:
+        return 0
+    adjust_rollup_for_ids(conn, transaction_ids, -1)
+    updated = conn.execute(
+        "UPDATE transactions SET category = ? WHERE id IN (SELECT unnest(?::BIGINT[])) RETURNING id",
+        [category, list(transaction_ids)],
+    ).fetchall()
+    adjust_rollup_for_ids(conn, transaction_ids, +1)
+    return len(updated)
+
+
+def bulk_set_recurring_link(conn, transaction_ids: list[int], recurring_event_id) -> int:
+    """
+    Sets (or clears, with None) recurring_event_id on all given transactions.
+    Returns the number of rows updated.
+    """
+    if not transaction_ids:
+        return 0
+    updated = conn.execute(
+        """
+        UPDATE transactions SET recurring_event_id = ?
+        WHERE id IN (SELECT unnest(?::BIGINT[]))
+        RETURNING id
+        """,
+        [recurring_event_id, list(transaction_ids)],
+    ).fetchall()
+    return len(updated)
+
+
+def recurring_event_exists(conn, recurring_event_id: int) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM recurring_events WHERE id = ?", [recurring_event_id]
     ).fetchone()
-    actual_count = existing[0] if existing else 0
+    return row is not None
+
+
+def get_transaction_ids_matching(conn, filters: dict) -> list[int]:
+    """Ids of all transactions matching ``filters`` (see build_transaction_filters)."""
+    where, params = build_transaction_filters(filters)
+    rows = conn.execute(f"SELECT t.id FROM transactions t {where}", params).fetchall()
+    return [r[0] for r in rows]
+
+
+def get_month_category_buckets(conn, transaction_ids: list[int]) -> list[tuple]:
+    """Distinct (date, category) pairs of the given transactions, one per month."""
+    if not transaction_ids:
+        return []
+    return conn.execute(
+        """
+        SELECT DISTINCT CAST(date_trunc('month', date) AS DATE), category
+        FROM transactions
+        WHERE id IN (SELECT unnest(?::BIGINT[]))
+        """,
+        [list(transaction_ids)],
+    ).fetchall()
+
+def get_merchant_fields_batch(conn, after_id=None, limit=10000) -> list[dict]:
+    """
+    Returns the next batch of (id, description, merchant fields) in id order,
+    starting strictly after ``after_id``.
+    """
+    query = """
+    SELECT id, description, merchant_normalized, merchant_id
+    FROM transactions
+    """
+    params = []
+    if after_id is not None:
+        query += " WHERE id > ?"
+        params.append(after_id)
+    query += " ORDER BY id LIMIT ?"
+    params.append(limit)
+
+    rows = conn.execute(query, params).fetchall()
+    return [
+        {
+            "id": r[0],
+            "description": r[1],
+            "merchant_normalized": r[2],
+            "merchant_id": r[3],
+        }
+        for r in rows
+    ]
+
+
+def bulk_set_merchant_fields(conn, transaction_ids: list[int], merchant_names: list[str], merchant_ids: list) -> None:
+    """
+    Sets merchant_normalized and merchant_id for many transactions in one
+    UPDATE. The three lists are parallel.
+    """
     conn.execute(
-        f"DELETE FROM transactions WHERE id IN ({placeholders})",
-        transaction_ids,
+        """
+        UPDATE transactions
+        SET merchant_normalized = u.merchant_normalized,
+            merchant_id = u.merchant_id
+        FROM (
+            SELECT unnest(?::BIGINT[]) AS id,
+                   unnest(?::VARCHAR[]) AS merchant_normalized,
+                   unnest(?::BIGINT[]) AS merchant_id
+        ) u
+        WHERE transactions.id = u.id
+        """,
+        [transaction_ids, merchant_names, merchant_ids],
     )
-    return actual_count
\ No newline at end of file
@@ -1,5 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from services.ai_categorization_service import run_ai_reclassify_uncategorized
+from services.ai_metrics_service import get_ai_metrics
+from services.ai_job_service import (
+    enqueue_ai_job,
+    get_ai_job,
+    list_ai_jobs,
+    cancel_ai_job,
+)
 
 router = APIRouter()
 
@@ -12,3 +19,36 @@ def reclassify_uncategorized(max_merchants: int = None):
     """
     result = run_ai_reclassify_uncategorized(max_merchants=max_merchants)
     return result
+
+
+@router.post("/ai/jobs")
+def create_ai_job(batch_size: int = None):
+    """Queue a background job that drains all uncategorized merchants."""
+    return enqueue_ai_job(batch_size=batch_size)
+
+
+@router.get("/ai/jobs")
+def ai_jobs(limit: int = 20):
+    return {"jobs": list_ai_jobs(limit=limit)}
+
+
+@router.get("/ai/jobs/{job_id}")
+def ai_job_status(job_id: int):
+    job = get_ai_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/ai/jobs/{job_id}/cancel")
+def cancel_job(job_id: int):
+    job = cancel_ai_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/ai/metrics")
+def ai_metrics(since_hours: int = 168):
+    """Latency, token and cache statistics for AI categorization."""
+    return get_ai_metrics(since_hours=since_hours)
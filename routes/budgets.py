@@ -1,9 +1,14 @@
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
+from services.budget_alert_service import get_recent_alerts
 from services.budget_service import (
     set_category_budget,
     get_category_budget_summary,
+    get_budget_trend,
+    rebuild_spend_rollup,
 )
 
 router = APIRouter()
@@ -26,8 +31,41 @@ def create_or_update_category_budget(request: CategoryBudgetRequest):
 
 
 @router.get("/budgets/summary")
-def category_budget_summary():
-    return get_category_budget_summary()
+def category_budget_summary(
+    period: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+):
+    """Budget vs. spend per category.
+
+    ``period``: month (default), YYYY-MM, quarter, YYYY-Qn, ytd, YYYY, or
+    custom with ``start``/``end`` (YYYY-MM).
+    """
+    try:
+        return get_category_budget_summary(period=period, start=start, end=end)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/budgets/trend")
+def budget_trend(months: int = 12, end: Optional[str] = None):
+    """Category x month spend matrix with budget lines and month-over-month deltas."""
+    try:
+        return get_budget_trend(months=months, end=end)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/budgets/alerts")
+def budget_alerts(limit: int = 50):
+    """Most recent budget threshold alerts, newest first."""
+    return get_recent_alerts(limit=limit)
+
+
+@router.post("/budgets/rollup/rebuild")
+def rebuild_budget_rollup():
+    """Full rebuild of the monthly category spend rollup."""
+    return {"status": "ok", **rebuild_spend_rollup()}
 
 
 @router.get("/budgets", response_class=HTMLResponse)
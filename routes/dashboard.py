@@ -1,11 +1,8 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from datetime import date
-from db import get_db
-from services.forecast_service import calculate_two_week_forecast
-from services.projection_service import calculate_two_week_projection
-from services.budget_service import get_spend_vs_budget_summary
+from services.dashboard_service import build_dashboard_context
+from utils.timing import timed, format_server_timing
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
@@ -17,85 +14,14 @@ def root():
 
 @router.get("/dashboard", response_class=HTMLResponse)
 def dashboard(request: Request):
-    conn = get_db()
+    context, timings, descriptions = build_dashboard_context()
 
-    # --- Current balance ---
-    current_balance = conn.execute(
-        "SELECT COALESCE(SUM(amount),0) FROM transactions"
-    ).fetchone()[0]
+    with timed(timings, "render"):
+        response = templates.TemplateResponse(request, "dashboard.html", context)
+    response.headers["Server-Timing"] = format_server_timing(timings, descriptions)
+    return response
 
-    # Spend vs budget summary (Sprint 8)
-    spend_vs_budget = get_spend_vs_budget_summary()
 
-    # --- Monthly income / expenses ---
-    monthly = conn.execute("""
-        SELECT
-            COALESCE(SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END), 0) AS income,
-            COALESCE(SUM(CASE WHEN amount < 0 THEN amount ELSE 0 END), 0) AS expenses
-        FROM transactions
-        WHERE date >= date_trunc('month', CURRENT_DATE)
-    """).fetchone()
-    monthly_income = monthly[0]
-    monthly_expenses = monthly[1]
-    monthly_net = monthly_income + monthly_expenses
-
-    # --- Spending by category ---
-    categories = conn.execute("""
-        SELECT category, SUM(amount) as total
-        FROM transactions
-        WHERE amount < 0
-        AND date >= date_trunc('month', CURRENT_DATE)
-        GROUP BY category
-        ORDER BY total ASC
-    """).fetchall()
-    category_labels = [row[0] for row in categories]
-    category_totals = [float(abs(row[1])) for row in categories]
-
-    # --- Recent transactions ---
-    recent_transactions = conn.execute("""
-        SELECT id, date, description, amount, category, recurring_event_id
-        FROM transactions
-        ORDER BY id DESC
-        LIMIT 5
-    """).fetchall()
-
-    conn.close()  # release before projection opens its own connection
-
-    # --- Two-week projection (new deterministic engine) ---
-    try:
-        projection = calculate_two_week_projection()
-        projected_balance = projection.timeline[-1].projected_balance
-        # legacy forecast service needs its own connection now that conn is closed
-        forecast_conn = get_db()
-        try:
-            forecast = calculate_two_week_forecast(forecast_conn, date.today())
-        finally:
-            forecast_conn.close()
-        upcoming_items = forecast['items']
-    except Exception as e:
-        print("Projection error:", e)
-        projected_balance = 0.0
-        upcoming_items = []
-    
-            
-
-    return templates.TemplateResponse(
-        request,
-        "dashboard.html",
-        {
-            "current_balance": current_balance,
-            "monthly_income": monthly_income,
-            "monthly_expenses": monthly_expenses,
-            "monthly_net": monthly_net,
-            "categories": categories,
-            "category_labels": category_labels,
-            "category_totals": category_totals,
-            "recent_transactions": recent_transactions,
-            "projected_balance": projected_balance,
-            "upcoming_items": upcoming_items,
-            "spend_vs_budget": spend_vs_budget,
-        }
-    )
 from fastapi import Form, HTTPException
 from fastapi.responses import RedirectResponse
 from repositories.accounts_repository import get_or_create_account
@@ -1,5 +1,18 @@
-from fastapi import APIRouter
-from services.ingestion_service import get_ingestion_history
+from typing import Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
+from services.ingestion_service import (
+    get_ingestion_history,
+    get_ingestion_rejections,
+    undo_ingestion_run,
+)
+from services.ingestion_job_service import (
+    enqueue_ingestion_job,
+    get_ingestion_job,
+    get_ingestion_batch,
+    take_pending_review,
+)
+from routes.reconciliation import store_reconciliation_session
 
 router = APIRouter()
 
@@ -7,3 +20,57 @@ router = APIRouter()
 @router.get("/ingestion/history")
 def ingestion_history(limit: int = 100):
     return get_ingestion_history(limit=limit)
+
+
+@router.get("/ingestion/runs/{run_id}/rejections")
+def ingestion_rejections(run_id: int, limit: int = Query(1000, ge=1, le=100000)):
+    return get_ingestion_rejections(run_id, limit=limit)
+
+
+@router.post("/ingestion/runs/{run_id}/undo")
+def ingestion_undo(run_id: int):
+    """Delete the rows a run inserted and restore the ones it rewrote."""
+    try:
+        result = undo_ingestion_run(run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Ingestion run not found")
+    return result
+
+
+@router.post("/ingestion/bulk", status_code=202)
+def ingestion_bulk(file: UploadFile = File(...), account_id: Optional[int] = Form(None)):
+    """Queue a Parquet or Arrow IPC file for bulk import; poll /ingestion/jobs/{id}."""
+    try:
+        return enqueue_ingestion_job(
+            file.file, file.filename or "bulk.parquet", account_id=account_id, mode="bulk",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/ingestion/jobs/{job_id}")
+def ingestion_job_status(job_id: int):
+    """Phase and progress of a background upload; review_url once matching is done."""
+    job = get_ingestion_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    review = take_pending_review(job_id)
+    if review:
+        store_reconciliation_session(review["session_id"], review)
+    return job
+
+
+@router.get("/ingestion/batches/{batch_id}")
+def ingestion_batch_status(batch_id: str):
+    """Combined status of files uploaded together; per-file review_url for reconcile jobs."""
+    batch = get_ingestion_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Ingestion batch not found")
+    for job in batch["jobs"]:
+        review = take_pending_review(job["id"])
+        if review:
+            store_reconciliation_session(review["session_id"], review)
+    return batch
+
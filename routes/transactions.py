@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from typing import Optional
+from urllib.parse import urlencode
 
 from services.transaction_service import (
-    get_all_transactions,
     update_transaction_category,
     reclassify_all_transactions,
-    get_filtered_transactions,
+    get_transactions_page,
     delete_transactions,
     link_transaction_to_recurring,
+    apply_bulk_operations,
 )
+from services.merchant_service import backfill_merchant_fields
+from services.export_service import export_transactions
+from services.search_service import search_transactions
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
@@ -19,6 +24,18 @@ templates = Jinja2Templates(directory="templates")
 class LinkRecurringRequest(BaseModel):
     recurring_event_id: int | None = None
 
+
+class BulkOperation(BaseModel):
+    op: str
+    ids: list[int] | None = None
+    filter: dict | None = None
+    category: str | None = None
+    recurring_event_id: int | None = None
+
+
+class BulkRequest(BaseModel):
+    operations: list[BulkOperation]
+
 # Standard allowed categories for dropdown
 ALLOWED_CATEGORIES = [
     "Car Insurance",
@@ -46,66 +63,94 @@ ALLOWED_CATEGORIES = [
 # READ TRANSACTIONS
 # -------------------------
 
+def transaction_filters(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    account_id: Optional[int] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    merchant: Optional[str] = None,
+    source: Optional[str] = None,
+    reconciliation_status: Optional[str] = None,
+    q: Optional[str] = None,
+) -> dict:
+    """Shared query parameters for filtered transaction listings."""
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "category": category,
+        "account_id": account_id,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "merchant": merchant,
+        "source": source,
+        "reconciliation_status": reconciliation_status,
+        "q": q,
+    }
+
+
 @router.get("/transactions/from-db")
-def get_transactions_from_db():
-    transactions = get_all_transactions()
-    # Convert tuples to dicts for consistent JSON response
-    tx_dicts = [
-        {
-            "id": t[0],
-            "account_name": t[1],
-            "date": t[2],
-            "description": t[3],
-            "amount": t[4],
-            "balance": t[5],
-            "category": t[6],
-            "source": t[7],
-            "user_id": t[8],
-            "merchant_id": t[9],
-            "merchant_normalized": t[10],
-            "created_at": t[11],
-        }
-        for t in transactions
-    ]
-    return {"transactions": tx_dicts}
+def get_transactions_from_db(
+    filters: dict = Depends(transaction_filters),
+    sort: str = "date_desc",
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+):
+    """One keyset page of transactions as JSON; follow ``next_cursor`` for more."""
+    try:
+        return get_transactions_page(filters, sort=sort, cursor=cursor, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/transactions/search")
+def search_transactions_route(q: str = "", limit: int = Query(50, ge=1, le=500)):
+    """Ranked full-text search over descriptions and merchants, with fuzzy fallback."""
+    try:
+        return search_transactions(q, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/transactions/export")
+def export_transactions_route(
+    filters: dict = Depends(transaction_filters),
+    format: str = "csv",
+):
+    """Stream the filtered ledger as csv, parquet or arrow (IPC stream)."""
+    try:
+        chunks, media_type, filename = export_transactions(filters, fmt=format)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/transactions")
 def get_transactions(
     request: Request,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    category: Optional[str] = None,
-    account_id: Optional[int] = None,
+    filters: dict = Depends(transaction_filters),
+    sort: str = "date_desc",
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
 ):
-    """Render transactions page with inline category editing."""
-    if start_date is None and end_date is None and category is None and account_id is None:
-        transactions = get_all_transactions()
-        # Convert tuples to dicts for template rendering
-        tx_dicts = [
-            {
-                "id": t[0],
-                "account_name": t[1],
-                "date": t[2],
-                "description": t[3],
-                "amount": t[4],
-                "balance": t[5],
-                "category": t[6] if t[6] else "",
-                "source": t[7],
-                "user_id": t[8],
-                "merchant_id": t[9],
-                "merchant_normalized": t[10],
-                "created_at": t[11],
-            }
-            for t in transactions
-        ]
-    else:
-        tx_dicts = get_filtered_transactions(
-            start_date=start_date,
-            end_date=end_date,
-            category=category,
-            account_id=account_id,
-        )
+    """Render one page of transactions with inline category editing."""
+    try:
+        page = get_transactions_page(filters, sort=sort, cursor=cursor, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    tx_dicts = [{**t, "category": t["category"] or ""} for t in page["transactions"]]
+
+    next_url = None
+    if page["next_cursor"]:
+        params = {k: v for k, v in filters.items() if v is not None and v != ""}
+        params.update(sort=sort, limit=limit, cursor=page["next_cursor"])
+        next_url = "/transactions?" + urlencode(params)
 
     return templates.TemplateResponse(
         request,
@@ -113,6 +158,9 @@ def get_transactions(
         {
             "transactions": tx_dicts,
             "allowed_categories": ALLOWED_CATEGORIES,
+            "total_count": page["total_count"],
+            "total_is_exact": page["total_is_exact"],
+            "next_url": next_url,
         },
     )
 
@@ -141,6 +189,16 @@ def reclassify():
     return {"success": True, "updated": updated_count}
 
 
+@router.post("/transactions/merchants/backfill")
+def backfill_merchants():
+    """Recompute merchant_normalized / merchant_id for rows that are missing or stale.
+
+    Idempotent; returns scanned and updated counts.
+    """
+    result = backfill_merchant_fields()
+    return {"success": True, **result}
+
+
 # -------------------------
 # DELETE TRANSACTIONS
 # -------------------------
@@ -179,4 +237,11 @@ async def delete_selected_transactions(request: Request):
         deleted_count = delete_transactions(transaction_ids)
         return {"status": "success", "deleted_count": deleted_count}
     except Exception as e:
-        return {"status": "error", "error": str(e)}
\ No newline at end of file
+        return {"status": "error", "error": str(e)}
+
+@router.post("/transactions/bulk")
+def bulk_update_transactions(payload: BulkRequest):
+    """Apply set_category / delete / link_recurring / unlink_recurring
+    operations in one database transaction; nothing is applied if any fails.
+    """
+    return apply_bulk_operations([op.model_dump() for op in payload.operations])
@@ -1,14 +1,10 @@
+import html
 from fastapi import APIRouter, UploadFile, File, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
-from typing import Optional
-import csv
-import io
-from services.csv_ingest_service import ingest_csv
-from services.reconciliation_service import initiate_reconciliation
+from fastapi.responses import HTMLResponse
+from typing import List, Optional
+from services.ingestion_job_service import enqueue_ingestion_batch
+from services.bank_profiles import BANK_PROFILES
 from repositories.accounts_repository import get_or_create_account, list_accounts
-from routes.reconciliation import store_reconciliation_session
-from utils.money import parse_money
-from utils.dates import normalize_date
 
 router = APIRouter()
 
@@ -183,6 +179,10 @@ def upload_page():
         account_options += f'        <option value="{acc["id"]}">{acc["account_name"]}</option>\n'
     account_options += '        <option value="__new__">+ New Account…</option>\n'
 
+    profile_options = '<option value="">Auto-detect</option>\n'
+    for profile in BANK_PROFILES:
+        profile_options += f'        <option value="{profile.name}">{profile.label}</option>\n'
+
     return f"""<!DOCTYPE html>
 <html>
 <head>
@@ -207,15 +207,25 @@ def upload_page():
                        placeholder="e.g. Savings, Checking…">
             </div>
 
-            <label for="csvFile">Select CSV File</label>
-            <input type="file" id="csvFile" name="file" accept=".csv" required>
+            <label for="profileSelect">Bank Format</label>
+            <select id="profileSelect" name="profile">
+                {profile_options}
+            </select>
+
+            <label for="csvFile">Select CSV Files or ZIP</label>
+            <input type="file" id="csvFile" name="files" accept=".csv,.zip" multiple required>
+
+            <label for="directImport" style="text-transform:none; font-weight:normal;">
+                <input type="checkbox" id="directImport" name="direct_import" value="1">
+                Import directly, skipping reconciliation (recommended for very large exports)
+            </label>
 
             <button type="submit" id="submitBtn">Upload</button>
 
             <div class="info">
                 <strong>Expected CSV Format:</strong><br>
                 Date, Description, Amount, Balance, Category<br>
-                <em>Dates should be in YYYY-MM-DD format.</em>
+                <em>Exports from Chase, Amex, Capital One, Citi, Discover and Bank of America are detected automatically.</em>
             </div>
         </form>
     </div>
@@ -240,9 +250,12 @@ def upload_page():
 
 @router.post("/upload", response_class=HTMLResponse)
 def upload_csv(
-    file: UploadFile = File(...),
+    files: Optional[List[UploadFile]] = File(None),
+    file: Optional[UploadFile] = File(None),
     account_id: Optional[str] = Form(None),
     new_account_name: Optional[str] = Form(None),
+    direct_import: Optional[str] = Form(None),
+    profile: Optional[str] = Form(None),
 ):
     # Resolve account
     resolved_account_id = None
@@ -250,154 +263,147 @@ def upload_csv(
         if new_account_name and new_account_name.strip():
             account = get_or_create_account(new_account_name.strip())
             resolved_account_id = account["id"]
-        # else fall through → ingest_csv will use account from CSV or Primary Account
+        # else fall through → ingest_csv_stream will use account from CSV or Primary Account
     elif account_id and account_id.isdigit():
         resolved_account_id = int(account_id)
 
-    contents_bytes = file.file.read()
+    # Parsing, matching and inserting run on the ingestion worker; the
+    # response is a progress page that polls /ingestion/jobs/{id}, or
+    # /ingestion/batches/{id} when several CSVs were uploaded together.
+    USE_RECONCILIATION = True  # Feature flag - set to False to use old ingest workflow
+
+    mode = "reconcile" if USE_RECONCILIATION and resolved_account_id and not direct_import else "direct"
+    uploads = [(f.file, f.filename) for f in [*(files or []), *([file] if file else [])] if f.filename]
+    if not uploads:
+        return _error_page("No file selected", None)
     try:
-        contents = contents_bytes.decode("utf-8-sig")
-    except UnicodeDecodeError:
-        return _error_page("File must be UTF-8 encoded CSV", None)
+        batch = enqueue_ingestion_batch(
+            uploads, account_id=resolved_account_id, mode=mode, profile=profile or None,
+        )
+    except (OSError, ValueError) as e:
+        return _error_page(html.escape(f"Could not queue upload: {e}"), None)
 
-    # Parse CSV to check format
-    csv_rows, parse_error = _parse_csv_rows(contents)
-    if parse_error:
-        return _error_page(parse_error["message"], parse_error.get("row"))
+    if len(batch["jobs"]) == 1:
+        job = batch["jobs"][0]
+        return _progress_page(job["id"], job["filename"])
+    return _batch_progress_page(batch["batch_id"], len(batch["jobs"]))
 
-    # If resolved_account_id is available and we have manual transactions, use reconciliation workflow
-    USE_RECONCILIATION = True  # Feature flag - set to False to use old ingest workflow
-    
-    if USE_RECONCILIATION and resolved_account_id and csv_rows:
-        try:
-            # Initiate reconciliation (fuzzy matching with existing manual entries)
-            reconciliation_result = initiate_reconciliation(resolved_account_id, csv_rows)
-            session_id = reconciliation_result["session_id"]
-            
-            # Store session data for review page
-            store_reconciliation_session(session_id, {
-                "account_id": resolved_account_id,
-                "session_id": session_id,
-                "auto_matched": reconciliation_result["auto_matched"],
-                "review_matches": reconciliation_result["review_matches"],
-                "unmatched_csv": reconciliation_result["unmatched_csv"],
-                "unmatched_manual": reconciliation_result["unmatched_manual"],
-                "csv_rows": reconciliation_result["csv_rows"],
-                "existing_entries": reconciliation_result["existing_entries"],
-            })
-            
-            # Redirect to reconciliation review page
-            return RedirectResponse(
-                url=f"/reconciliation/review?session_id={session_id}",
-                status_code=303
-            )
-        except Exception as e:
-            # Fall back to old workflow if reconciliation fails
-            return _error_page(f"Reconciliation failed: {str(e)}", None)
-    
-    # Fall back to old direct ingestion workflow
-    result = ingest_csv(contents, account_id=resolved_account_id)
-
-    if not result["success"]:
-        return _error_page(result["error_message"], result["error_row"])
-
-    if result["error_message"]:
-        # Partial success: some rows imported, some failed
-        return _partial_success_page(result["rows_imported"], result["error_message"], result["error_row"])
-
-    return _success_page(result["rows_imported"], result["categories_assigned"])
-
-
-def _parse_csv_rows(contents: str):
-    """Parse CSV contents into rows for reconciliation. Returns (rows, error)."""
-    REQUIRED_COLUMNS = {"Date", "Description", "Amount"}
-    
-    reader = csv.DictReader(io.StringIO(contents, newline=""))
-    if not reader.fieldnames:
-        return None, {"message": "CSV is missing headers", "row": None}
-
-    missing = sorted(REQUIRED_COLUMNS - set(reader.fieldnames))
-    if missing:
-        return None, {"message": f"CSV is missing required columns: {', '.join(missing)}", "row": None}
-
-    rows = []
-    for idx, row in enumerate(reader, start=1):
-        try:
-            raw_date = (row.get("Date") or "").strip()
-            raw_description = (row.get("Description") or "").strip()
-            if not raw_date or not raw_description:
-                return None, {"message": "Missing required date or description", "row": idx}
-
-            date = normalize_date(raw_date)
-            description = raw_description
-            amount = parse_money(row.get("Amount"))
-            balance = parse_money(row.get("Balance")) if row.get("Balance") else None
-            category = row.get("Category") or None
-
-            rows.append({
-                "date": date,
-                "description": description,
-                "amount": amount,
-                "balance": balance,
-                "category": category,
-            })
-        except Exception as e:
-            return None, {"message": str(e), "row": idx}
-
-    return rows, None
-
-
-def _success_page(rows_imported: int, categories_assigned: dict) -> str:
-    cat_lines = ""
-    if categories_assigned:
-        cat_lines = "<ul style='margin:8px 0 0 0; padding-left:20px;'>"
-        for cat, count in sorted(categories_assigned.items()):
-            cat_lines += f"<li>{cat}: {count} row{'s' if count != 1 else ''}</li>"
-        cat_lines += "</ul>"
 
+def _progress_page(job_id: int, filename: str) -> str:
     return f"""<!DOCTYPE html>
 <html>
 <head>
-    <title>Upload Successful</title>
+    <title>Importing…</title>
     {_COMMON_STYLES}
 </head>
 <body>
-    <h1>Upload Complete</h1>
+    <h1>Importing {html.escape(filename)}</h1>
     <a class="back-link" href="/upload">← Upload Another File</a>
 
     <div class="card">
-        <div class="success">
-            <strong>✓ {rows_imported} row{'s' if rows_imported != 1 else ''} imported successfully</strong>
-            {cat_lines}
-        </div>
+        <div id="status"><p>Queued…</p></div>
+        <progress id="bar" max="100" value="0" style="width:100%;"></progress>
+        <div class="info" id="counts"></div>
         <a href="/dashboard">→ Go to Dashboard</a>
     </div>
+
+    <script>
+        var PHASES = {{
+            queued: 'Queued…', parsing: 'Parsing file…', matching: 'Matching against existing entries…',
+            inserting: 'Importing rows…', completed: 'Import complete', duplicate: 'Already imported',
+            awaiting_review: 'Opening review…', failed: 'Import failed'
+        }};
+        function esc(text) {{
+            var d = document.createElement('div');
+            d.textContent = text || '';
+            return d.innerHTML;
+        }}
+        function poll() {{
+            fetch('/ingestion/jobs/{job_id}').then(function (r) {{ return r.json(); }}).then(function (job) {{
+                document.getElementById('bar').value = job.progress_pct;
+                document.getElementById('counts').textContent =
+                    job.rows_parsed + ' parsed · ' + job.rows_matched + ' matched · ' + job.inserted_count + ' inserted';
+                var status = document.getElementById('status');
+                if (job.status === 'awaiting_review' && job.review_url) {{
+                    window.location = job.review_url;
+                    return;
+                }}
+                if (job.status === 'completed' || job.status === 'duplicate') {{
+                    var msg = '<div class="success"><strong>✓ ' + job.inserted_count + ' rows imported, ' +
+                        job.skipped_count + ' skipped</strong></div>';
+                    if (job.error) {{ msg += '<div class="error">⚠ ' + esc(job.error) + '</div>'; }}
+                    status.innerHTML = msg;
+                    return;
+                }}
+                if (job.status === 'failed') {{
+                    status.innerHTML = '<div class="error"><strong>✗ Import failed</strong><br>' + esc(job.error) + '</div>';
+                    return;
+                }}
+                status.innerHTML = '<p>' + (PHASES[job.status] || job.status) + '</p>';
+                setTimeout(poll, 1000);
+            }}).catch(function () {{ setTimeout(poll, 3000); }});
+        }}
+        poll();
+    </script>
 </body>
 </html>"""
 
 
-def _partial_success_page(rows_imported: int, error_message: str, error_row) -> str:
-    row_info = f" (row {error_row})" if error_row is not None else ""
+def _batch_progress_page(batch_id: str, file_count: int) -> str:
     return f"""<!DOCTYPE html>
 <html>
 <head>
-    <title>Upload Partial Success</title>
+    <title>Importing…</title>
     {_COMMON_STYLES}
 </head>
 <body>
-    <h1>Upload Complete</h1>
-    <a class="back-link" href="/upload">← Upload Another File</a>
+    <h1>Importing {file_count} files</h1>
+    <a class="back-link" href="/upload">← Upload More Files</a>
 
     <div class="card">
-        <div class="success">
-            <strong>✓ {rows_imported} row{'s' if rows_imported != 1 else ''} imported successfully</strong>
-        </div>
-        <div class="error">
-            <strong>⚠ Some rows were skipped</strong><br>
-            {error_message}{row_info}
-        </div>
+        <div id="status"><p>Queued…</p></div>
+        <progress id="bar" max="100" value="0" style="width:100%;"></progress>
+        <table style="width:100%; margin-top:16px; border-collapse:collapse;">
+            <thead><tr><th align="left">File</th><th align="left">Status</th>
+                <th align="right">Inserted</th><th align="right">Skipped</th><th align="left">Notes</th></tr></thead>
+            <tbody id="files"></tbody>
+        </table>
         <a href="/dashboard">→ Go to Dashboard</a>
     </div>
+
+    <script>
+        var PHASES = {{
+            queued: 'Queued', parsing: 'Parsing', matching: 'Matching', inserting: 'Importing',
+            completed: '✓ Complete', duplicate: '✓ Already imported', awaiting_review: 'Ready for review',
+            failed: '✗ Failed'
+        }};
+        function esc(text) {{
+            var d = document.createElement('div');
+            d.textContent = text || '';
+            return d.innerHTML;
+        }}
+        function poll() {{
+            fetch('/ingestion/batches/{batch_id}').then(function (r) {{ return r.json(); }}).then(function (batch) {{
+                document.getElementById('bar').value = batch.progress_pct;
+                document.getElementById('files').innerHTML = batch.jobs.map(function (job) {{
+                    var note = job.review_url ? '<a href="' + esc(job.review_url) + '" target="_blank">Review matches →</a>'
+                                              : esc(job.error);
+                    return '<tr><td>' + esc(job.filename) + '</td><td>' + (PHASES[job.status] || esc(job.status)) +
+                        '</td><td align="right">' + job.inserted_count + '</td><td align="right">' + job.skipped_count +
+                        '</td><td>' + note + '</td></tr>';
+                }}).join('');
+                var status = document.getElementById('status');
+                if (batch.status === 'finished') {{
+                    status.innerHTML = '<div class="success"><strong>✓ ' + batch.inserted_count + ' rows imported, ' +
+                        batch.skipped_count + ' skipped</strong></div>';
+                    return;
+                }}
+                status.innerHTML = '<p>Processing…</p>';
+                setTimeout(poll, 1000);
+            }}).catch(function () {{ setTimeout(poll, 3000); }});
+        }}
+        poll();
+    </script>
 </body>
 </html>"""
 
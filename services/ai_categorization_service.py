@@ -1,12 +1,24 @@
+import json
+import logging
 import os
+import time
 import requests
-from db import get_db
+from datetime import date
+from db import get_db, bump_ledger_version
 from repositories.ai_category_repository import (
     list_uncategorized_merchants,
-    get_cached_suggestion,
+    get_cached_suggestion_for_any,
     upsert_suggestion,
-    apply_suggestion_to_uncategorized,
+    apply_suggestion_to_merchants,
+    is_negatively_cached,
+    upsert_negative_cache,
+    clear_negative_cache,
 )
+from repositories.ai_metrics_repository import record_ai_metric
+from services.merchant_clustering import cluster_merchants
+from services.budget_alert_service import evaluate_budget_alerts
+
+logger = logging.getLogger(__name__)
 
 # Environment configuration with defaults
 AI_ENABLED = os.getenv("AI_ENABLED", "false").lower() in ("true", "1", "yes")
@@ -15,6 +27,9 @@ AI_MODEL = os.getenv("AI_MODEL", "qwen2.5:14b")
 AI_TIMEOUT_SECONDS = int(os.getenv("AI_TIMEOUT_SECONDS", "10"))
 AI_MAX_MERCHANTS_PER_RUN = int(os.getenv("AI_MAX_MERCHANTS_PER_RUN", "10"))
 AI_NUM_PREDICT = int(os.getenv("AI_NUM_PREDICT", "30"))
+AI_NEGATIVE_CACHE_TTL_HOURS = int(os.getenv("AI_NEGATIVE_CACHE_TTL_HOURS", "24"))
+AI_CLUSTER_SIMILARITY = float(os.getenv("AI_CLUSTER_SIMILARITY", "0.8"))
+AI_CLUSTER_WINDOW = int(os.getenv("AI_CLUSTER_WINDOW", "500"))
 
 # Fixed allowed categories (Sprint 12 v1)
 ALLOWED_CATEGORIES = {
@@ -55,16 +70,20 @@ def run_ai_reclassify_uncategorized(max_merchants: int = None) -> dict:
     """
     Orchestrate AI categorization job.
     Deterministic, no side effects on error.
-    Returns dict with success, error, merchants_processed, transactions_updated,
-    cache_hits, ai_calls, failures list.
+    Uncategorized merchants are clustered first; ``max_merchants`` caps the
+    number of clusters (one AI/cache decision each) handled per run.
+    Returns dict with success, error, merchants_processed, clusters_processed,
+    transactions_updated, cache_hits, negative_cache_hits, ai_calls, failures list.
     """
     if not AI_ENABLED:
         return {
             "success": False,
             "error": "AI categorization is disabled (AI_ENABLED=false)",
             "merchants_processed": 0,
+            "clusters_processed": 0,
             "transactions_updated": 0,
             "cache_hits": 0,
+            "negative_cache_hits": 0,
             "ai_calls": 0,
             "failures": [],
         }
@@ -72,77 +91,40 @@ def run_ai_reclassify_uncategorized(max_merchants: int = None) -> dict:
     conn = get_db()
     try:
         limit = min(max_merchants or AI_MAX_MERCHANTS_PER_RUN, AI_MAX_MERCHANTS_PER_RUN)
-        merchants = list_uncategorized_merchants(conn, limit=limit)
+        # Cluster a wider window so variants share one decision; the limit caps clusters
+        merchants = list_uncategorized_merchants(conn, limit=max(limit, AI_CLUSTER_WINDOW))
+        clusters = cluster_merchants(merchants, threshold=AI_CLUSTER_SIMILARITY)[:limit]
 
-        if not merchants:
+        if not clusters:
             return {
                 "success": True,
                 "error": None,
                 "merchants_processed": 0,
+                "clusters_processed": 0,
                 "transactions_updated": 0,
                 "cache_hits": 0,
+                "negative_cache_hits": 0,
                 "ai_calls": 0,
                 "failures": [],
             }
 
-        merchants_processed = 0
-        transactions_updated = 0
-        cache_hits = 0
-        ai_calls = 0
+        counters = {
+            "merchants_processed": 0,
+            "transactions_updated": 0,
+            "cache_hits": 0,
+            "negative_cache_hits": 0,
+            "ai_calls": 0,
+        }
         failures = []
 
-        for merchant in merchants:
-            try:
-                # Check for credit card payment rule (deterministic override)
-                if _is_credit_card_payment(merchant):
-                    category = "Transfer"
-                    upsert_suggestion(conn, merchant, category, "rule:credit_card_payment")
-                    rows_updated = apply_suggestion_to_uncategorized(conn, merchant, category)
-                    transactions_updated += rows_updated
-                    merchants_processed += 1
-                    cache_hits += 1  # rule is effectively a cache hit
-                    continue
-
-                # Check cache
-                cached = get_cached_suggestion(conn, merchant)
-                if cached:
-                    rows_updated = apply_suggestion_to_uncategorized(conn, merchant, cached)
-                    transactions_updated += rows_updated
-                    merchants_processed += 1
-                    cache_hits += 1
-                    continue
-
-                # Call Ollama AI
-                suggested_category = _call_ollama(merchant)
-                if suggested_category is not None:
-                    upsert_suggestion(conn, merchant, suggested_category, AI_MODEL)
-                    rows_updated = apply_suggestion_to_uncategorized(conn, merchant, suggested_category)
-                    transactions_updated += rows_updated
-                    merchants_processed += 1
-                    ai_calls += 1
-                else:
-                    # AI could not confidently assign category: leave category as NULL (uncategorized)
-                    failures.append({
-                        "merchant": merchant,
-                        "reason": "AI returned invalid/unparseable category; category left NULL",
-                    })
-                    merchants_processed += 1
-                    ai_calls += 1
-
-            except Exception as e:
-                failures.append({
-                    "merchant": merchant,
-                    "reason": str(e),
-                })
-                merchants_processed += 1
+        for cluster in clusters:
+            categorize_cluster(conn, cluster, counters, failures)
 
         return {
             "success": True,
             "error": None,
-            "merchants_processed": merchants_processed,
-            "transactions_updated": transactions_updated,
-            "cache_hits": cache_hits,
-            "ai_calls": ai_calls,
+            "clusters_processed": len(clusters),
+            **counters,
             "failures": failures,
         }
 
@@ -151,8 +133,10 @@ def run_ai_reclassify_uncategorized(max_merchants: int = None) -> dict:
             "success": False,
             "error": str(e),
             "merchants_processed": 0,
+            "clusters_processed": 0,
             "transactions_updated": 0,
             "cache_hits": 0,
+            "negative_cache_hits": 0,
             "ai_calls": 0,
             "failures": [],
         }
@@ -160,13 +144,132 @@ def run_ai_reclassify_uncategorized(max_merchants: int = None) -> dict:
         conn.close()
 
 
-def _call_ollama(merchant_normalized: str) -> str | None:
+def categorize_cluster(conn, cluster: list[str], counters: dict, failures: list) -> None:
+    """
+    Categorize a merchant cluster (representative first, as returned by
+    cluster_merchants): credit card rule, then cache, then negative cache,
+    then Ollama — all decided on the representative — and fan the result out
+    to every member in one bulk UPDATE. Only the representative gets a cache row.
+
+    Increments ``counters`` (merchants_processed, transactions_updated,
+    cache_hits, negative_cache_hits, ai_calls) and appends to ``failures`` in
+    place. Every lookup outcome is recorded in ai_metrics. Shared by the
+    synchronous endpoint and the background job worker.
+    """
+    merchant = cluster[0]
+    try:
+        # Check for credit card payment rule (deterministic override)
+        if _is_credit_card_payment(merchant):
+            category = "Transfer"
+            upsert_suggestion(conn, merchant, category, "rule:credit_card_payment")
+            counters["transactions_updated"] += _apply_to_cluster(conn, cluster, category)
+            counters["merchants_processed"] += len(cluster)
+            counters["cache_hits"] += 1  # rule is effectively a cache hit
+            _record_metric(conn, {"event": "rule", "model": "rule:credit_card_payment", "outcome": "ok"})
+            return
+
+        # Check cache (any member's cached suggestion applies to the cluster)
+        cached = get_cached_suggestion_for_any(conn, cluster)
+        if cached:
+            counters["transactions_updated"] += _apply_to_cluster(conn, cluster, cached)
+            counters["merchants_processed"] += len(cluster)
+            counters["cache_hits"] += 1
+            _record_metric(conn, {"event": "cache_hit", "model": AI_MODEL, "outcome": "ok"})
+            return
+
+        # Skip merchants the model recently failed to categorize
+        if is_negatively_cached(conn, merchant, AI_MODEL, AI_NEGATIVE_CACHE_TTL_HOURS):
+            counters["merchants_processed"] += len(cluster)
+            counters["negative_cache_hits"] += 1
+            _record_metric(conn, {"event": "negative_cache_hit", "model": AI_MODEL, "outcome": "ok"})
+            return
+
+        # Call Ollama AI
+        call_metrics = {}
+        suggested_category = _call_ollama(merchant, call_metrics)
+        _record_metric(conn, {"event": "ai_call", **call_metrics})
+        if suggested_category is not None:
+            upsert_suggestion(conn, merchant, suggested_category, AI_MODEL)
+            clear_negative_cache(conn, merchant)
+            counters["transactions_updated"] += _apply_to_cluster(conn, cluster, suggested_category)
+            counters["merchants_processed"] += len(cluster)
+            counters["ai_calls"] += 1
+        else:
+            # AI could not confidently assign category: leave category as NULL (uncategorized)
+            if call_metrics.get("outcome") == "invalid":
+                # Only a definite answer outside the allowed set is cached; transport errors are retried
+                upsert_negative_cache(conn, merchant, AI_MODEL)
+            failures.append({
+                "merchant": merchant,
+                "reason": "AI returned invalid/unparseable category; category left NULL",
+            })
+            counters["merchants_processed"] += len(cluster)
+            counters["ai_calls"] += 1
+
+    except Exception as e:
+        failures.append({
+            "merchant": merchant,
+            "reason": str(e),
+        })
+        counters["merchants_processed"] += len(cluster)
+
+
+def _apply_to_cluster(conn, cluster: list[str], category: str) -> int:
+    """
+    Bulk-apply ``category`` to the cluster in one transaction (rollup and
+    ledger move together), then re-check that category's budget.
+    """
+    conn.begin()
+    try:
+        updated = apply_suggestion_to_merchants(conn, cluster, category)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if updated:
+        bump_ledger_version()
+        evaluate_budget_alerts(conn, [(date.today(), category)])
+    return updated
+
+
+def _record_metric(conn, metric: dict) -> None:
+    """Best-effort metrics write; instrumentation must never fail categorization."""
+    try:
+        record_ai_metric(conn, metric)
+    except Exception as e:
+        logger.warning(f"Failed to record AI metric: {e}")
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000.0, 1)
+
+
+def _call_ollama(merchant_normalized: str, metrics: dict | None = None) -> str | None:
     """
     Call Ollama /api/generate with temp=0, num_predict=30, timeout=10s.
     Return validated category or None.
     Fail-open: returns None on error or if response not in ALLOWED_CATEGORIES.
     Does NOT write 'Uncategorized' to DB — returns None to leave category as NULL.
+
+    The response is streamed so timings can be captured. If ``metrics`` is
+    given it is filled in place with model, outcome (ok | invalid | http_error
+    | timeout | error), http_status, connect_ms (request sent → response
+    headers), ttft_ms (→ first generated token), total_ms, prompt_tokens and
+    response_tokens.
     """
+    if metrics is None:
+        metrics = {}
+    metrics.update({
+        "model": AI_MODEL,
+        "outcome": "error",
+        "http_status": None,
+        "connect_ms": None,
+        "ttft_ms": None,
+        "total_ms": None,
+        "prompt_tokens": None,
+        "response_tokens": None,
+    })
+    started = time.perf_counter()
     try:
         url = f"{AI_OLLAMA_BASE_URL}/api/generate"
         categories_list = ", ".join(sorted(ALLOWED_CATEGORIES))
@@ -180,31 +283,55 @@ Return ONLY the category name, nothing else."""
         payload = {
             "model": AI_MODEL,
             "prompt": prompt,
-            "stream": False,
+            "stream": True,
             "options": {
                 "temperature": 0,
                 "num_predict": AI_NUM_PREDICT,
             },
         }
 
-        response = requests.post(url, json=payload, timeout=AI_TIMEOUT_SECONDS)
-        if response.status_code != 200:
-            return None
+        with requests.post(url, json=payload, timeout=AI_TIMEOUT_SECONDS, stream=True) as response:
+            metrics["connect_ms"] = _elapsed_ms(started)
+            metrics["http_status"] = response.status_code
+            if response.status_code != 200:
+                metrics["outcome"] = "http_error"
+                return None
 
-        data = response.json()
-        suggested = data.get("response", "").strip()
+            # Ollama streams one JSON object per line; the final one carries token counts
+            parts = []
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                piece = chunk.get("response", "")
+                if piece and metrics["ttft_ms"] is None:
+                    metrics["ttft_ms"] = _elapsed_ms(started)
+                parts.append(piece)
+                if chunk.get("done"):
+                    metrics["prompt_tokens"] = chunk.get("prompt_eval_count")
+                    metrics["response_tokens"] = chunk.get("eval_count")
+                    break
+
+        suggested = "".join(parts).strip()
 
         # Validate against allowed categories (case-insensitive match)
         for allowed in ALLOWED_CATEGORIES:
             if suggested.lower() == allowed.lower():
+                metrics["outcome"] = "ok"
                 return allowed
 
         # If AI response not in allowed set, return None (do not write to DB, leave NULL)
+        metrics["outcome"] = "invalid"
         return None
 
+    except requests.Timeout:
+        metrics["outcome"] = "timeout"
+        return None
     except Exception:
         # Fail-open: return None on any error
         return None
+    finally:
+        metrics["total_ms"] = _elapsed_ms(started)
 
 
 def _is_credit_card_payment(merchant_normalized: str) -> bool:
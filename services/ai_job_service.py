@@ -0,0 +1,208 @@
+"""
+AI Categorization Job Service — resumable background draining of uncategorized merchants.
+
+Jobs are persisted in ``ai_jobs``. A single worker thread claims queued jobs,
+processes merchants in batches ordered by merchant_normalized, and checkpoints
+the keyset cursor plus counters after every batch. Jobs left 'running' by a
+previous process are requeued on worker start and resume from the checkpoint.
+"""
+import logging
+import os
+import threading
+
+from db import get_db
+from repositories.ai_category_repository import (
+    list_uncategorized_merchants,
+    count_uncategorized_merchants,
+)
+from repositories.ai_job_repository import (
+    create_job,
+    get_job,
+    list_jobs,
+    claim_next_job,
+    requeue_interrupted_jobs,
+    checkpoint_job,
+    request_cancel,
+    is_cancel_requested,
+    finish_job,
+)
+from services.ai_categorization_service import (
+    AI_ENABLED,
+    AI_CLUSTER_SIMILARITY,
+    categorize_cluster,
+)
+from services.merchant_clustering import cluster_merchants
+
+logger = logging.getLogger(__name__)
+
+AI_JOB_BATCH_SIZE = int(os.getenv("AI_JOB_BATCH_SIZE", "100"))
+AI_JOB_POLL_SECONDS = int(os.getenv("AI_JOB_POLL_SECONDS", "30"))
+
+# Set on enqueue so the worker does not wait out the poll interval
+_wake = threading.Event()
+
+
+def enqueue_ai_job(batch_size: int = None) -> dict:
+    """
+    Queue a background job that drains all uncategorized merchants.
+    Returns dict with success, error, job.
+    """
+    if not AI_ENABLED:
+        return {
+            "success": False,
+            "error": "AI categorization is disabled (AI_ENABLED=false)",
+            "job": None,
+        }
+
+    batch_size = max(1, int(batch_size or AI_JOB_BATCH_SIZE))
+    conn = get_db()
+    try:
+        total = count_uncategorized_merchants(conn)
+        job = create_job(conn, batch_size=batch_size, total_merchants=total)
+    finally:
+        conn.close()
+
+    _wake.set()
+    return {"success": True, "error": None, "job": _with_progress(job)}
+
+
+def get_ai_job(job_id: int) -> dict | None:
+    """Return job status with progress percentage, or None if not found."""
+    conn = get_db()
+    try:
+        job = get_job(conn, job_id)
+    finally:
+        conn.close()
+    return _with_progress(job) if job else None
+
+
+def list_ai_jobs(limit: int = 20) -> list[dict]:
+    """Return most recent jobs first."""
+    conn = get_db()
+    try:
+        return [_with_progress(j) for j in list_jobs(conn, limit=limit)]
+    finally:
+        conn.close()
+
+
+def cancel_ai_job(job_id: int) -> dict | None:
+    """Request cancellation. Returns updated job, or None if not found."""
+    conn = get_db()
+    try:
+        job = request_cancel(conn, job_id)
+    finally:
+        conn.close()
+    return _with_progress(job) if job else None
+
+
+def _with_progress(job: dict) -> dict:
+    total = job["total_merchants"] or 0
+    if job["status"] == "completed":
+        progress = 100.0
+    elif total:
+        progress = round(min(100.0, 100.0 * job["merchants_processed"] / total), 1)
+    else:
+        progress = 0.0
+    return {**job, "progress_pct": progress}
+
+
+def run_job(job: dict) -> str:
+    """
+    Process a claimed job batch by batch until the backlog is drained,
+    cancellation is requested, or an unexpected error occurs.
+    Returns the terminal status written to the job.
+    """
+    job_id = job["id"]
+    cursor = job["last_merchant"]
+    batch_size = job["batch_size"]
+
+    conn = None
+    try:
+        conn = get_db()
+        while True:
+            if is_cancel_requested(conn, job_id):
+                finish_job(conn, job_id, "cancelled")
+                return "cancelled"
+
+            merchants = list_uncategorized_merchants(conn, limit=batch_size, after=cursor)
+            if not merchants:
+                finish_job(conn, job_id, "completed")
+                return "completed"
+
+            counters = {
+                "merchants_processed": 0,
+                "transactions_updated": 0,
+                "cache_hits": 0,
+                "negative_cache_hits": 0,
+                "ai_calls": 0,
+            }
+            failures = []
+            # Batches are ordered by merchant_normalized, so prefix variants land together
+            for cluster in cluster_merchants(merchants, threshold=AI_CLUSTER_SIMILARITY):
+                categorize_cluster(conn, cluster, counters, failures)
+
+            cursor = merchants[-1]
+            checkpoint_job(conn, job_id, cursor, counters, len(failures))
+            for failure in failures:
+                logger.info(f"AI job {job_id}: {failure['merchant']}: {failure['reason']}")
+
+    except Exception as e:
+        logger.exception(f"AI job {job_id} failed")
+        _fail_job(conn, job_id, str(e))
+        return "failed"
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _fail_job(conn, job_id: int, error: str) -> None:
+    """Mark a claimed job failed, on a fresh connection if ``conn`` is missing or unusable."""
+    if conn is not None:
+        try:
+            finish_job(conn, job_id, "failed", error=error)
+            return
+        except Exception as e:
+            logger.warning(f"AI job {job_id}: could not record failure, retrying on a new connection: {e}")
+    conn = get_db()
+    try:
+        finish_job(conn, job_id, "failed", error=error)
+    finally:
+        conn.close()
+
+
+def start_ai_job_worker() -> None:
+    """
+    Worker loop (called from a daemon thread). Requeues interrupted jobs
+    once, then processes queued jobs one at a time, sleeping between polls.
+    Errors, including the startup requeue's, are logged and retried.
+    """
+    recovered = False
+    while True:
+        try:
+            if not recovered:
+                conn = get_db()
+                try:
+                    requeued = requeue_interrupted_jobs(conn)
+                finally:
+                    conn.close()
+                recovered = True
+                if requeued:
+                    logger.info(f"Requeued {requeued} interrupted AI job(s).")
+
+            # Clear before polling: an enqueue after the poll sets it again
+            _wake.clear()
+            conn = get_db()
+            try:
+                job = claim_next_job(conn)
+            finally:
+                conn.close()
+
+            if job is None:
+                _wake.wait(timeout=AI_JOB_POLL_SECONDS)
+                continue
+
+            status = run_job(job)
+            logger.info(f"AI job {job['id']} finished: {status}")
+        except Exception as e:
+            logger.exception(f"AI job worker error, retrying: {e}")
+            _wake.wait(timeout=AI_JOB_POLL_SECONDS)
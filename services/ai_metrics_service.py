@@ -0,0 +1,90 @@
+from db import get_db
+from repositories.ai_metrics_repository import (
+    LATENCY_BUCKETS_MS,
+    get_event_counts,
+    get_model_call_stats,
+    get_latency_histograms,
+)
+from services.ai_categorization_service import AI_NUM_PREDICT
+
+
+def _ratio(part: int, whole: int) -> float | None:
+    return round(part / whole, 4) if whole else None
+
+
+def _percentiles(values) -> dict:
+    if values is None:
+        return {"p50": None, "p90": None, "p99": None}
+    return {
+        "p50": round(values[0], 1) if values[0] is not None else None,
+        "p90": round(values[1], 1) if values[1] is not None else None,
+        "p99": round(values[2], 1) if values[2] is not None else None,
+    }
+
+
+def get_ai_metrics(since_hours: int = 168) -> dict:
+    """
+    Summarize AI categorization instrumentation over the last ``since_hours``:
+    lookup hit ratios, per-model error rates, latency percentiles and
+    histograms, and response token usage relative to AI_NUM_PREDICT.
+
+    Read-only. No side effects.
+    """
+    conn = get_db()
+    try:
+        events = get_event_counts(conn, since_hours)
+        model_stats = get_model_call_stats(conn, since_hours, AI_NUM_PREDICT)
+        histogram_rows = get_latency_histograms(conn, since_hours)
+    finally:
+        conn.close()
+
+    lookups = sum(events.values())
+    cache_hits = events.get("cache_hit", 0) + events.get("rule", 0)
+    negative_hits = events.get("negative_cache_hit", 0)
+
+    bucket_labels = [f"<={edge}" for edge in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+    histograms: dict = {}
+    for row in histogram_rows:
+        counts = histograms.setdefault(row["model"], {}).setdefault(
+            row["phase"], [0] * len(bucket_labels)
+        )
+        counts[row["bucket"]] = row["count"]
+
+    models = []
+    for s in model_stats:
+        models.append({
+            "model": s["model"],
+            "calls": s["calls"],
+            "ok": s["ok"],
+            "invalid": s["invalid"],
+            "errors": s["errors"],
+            "error_rate": _ratio(s["errors"], s["calls"]),
+            "invalid_rate": _ratio(s["invalid"], s["calls"]),
+            "connect_ms": _percentiles(s["connect_ms"]),
+            "ttft_ms": _percentiles(s["ttft_ms"]),
+            "total_ms": _percentiles(s["total_ms"]),
+            "histograms": histograms.get(s["model"], {}),
+            "tokens": {
+                "avg_prompt": round(s["avg_prompt_tokens"], 1) if s["avg_prompt_tokens"] is not None else None,
+                "avg_response": round(s["avg_response_tokens"], 1) if s["avg_response_tokens"] is not None else None,
+                "p90_response": s["p90_response_tokens"],
+                "max_response": s["max_response_tokens"],
+                "hit_num_predict": s["hit_num_predict"],
+            },
+        })
+
+    return {
+        "since_hours": since_hours,
+        "num_predict": AI_NUM_PREDICT,
+        "histogram_buckets_ms": bucket_labels,
+        "lookups": {
+            "total": lookups,
+            "rule": events.get("rule", 0),
+            "cache_hits": events.get("cache_hit", 0),
+            "negative_cache_hits": negative_hits,
+            "ai_calls": events.get("ai_call", 0),
+            "cache_hit_ratio": _ratio(cache_hits, lookups),
+            "negative_cache_hit_ratio": _ratio(negative_hits, lookups),
+        },
+        "models": models,
+    }
@@ -0,0 +1,284 @@
+"""
+Bank format profiles — how each institution lays out its CSV export.
+
+A profile names the header for each canonical field, the date formats the
+bank uses and its sign convention:
+
+- "signed":   one Amount column, negative = money out (the app's convention)
+- "inverted": one Amount column, positive = money out (most card issuers)
+- "split":    separate Debit (out) and Credit (in) columns, either may be blank
+
+sniff_profile picks the profile once per file from the header and a few
+sample rows (including which date format applies); compile_batch_converter
+then turns it into a converter over blocks of csv.reader lists with the
+column indices, date format and sign handling fixed up front, parsing
+each column in one pass, so no per-row format guessing happens during
+ingest.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from utils.dates import parse_date_column
+from utils.money import parse_money_column
+
+# Rows inspected when sniffing the date format
+SNIFF_SAMPLE_ROWS = 20
+# Distinct date strings remembered per file before the memo is reset
+DATE_MEMO_MAX = 10000
+
+
+@dataclass(frozen=True)
+class BankProfile:
+    name: str
+    label: str
+    # canonical field -> header in the export; date and description are required
+    columns: dict
+    date_formats: tuple = ("%m/%d/%Y", "%Y-%m-%d")
+    sign: str = "signed"
+    debit_column: str | None = None
+    credit_column: str | None = None
+    # headers that must be present for the profile to match (beyond columns)
+    marker_columns: tuple = field(default_factory=tuple)
+
+    def required_headers(self) -> set:
+        headers = {self.columns["date"], self.columns["description"], *self.marker_columns}
+        if self.sign == "split":
+            headers |= {self.debit_column, self.credit_column}
+        else:
+            headers.add(self.columns["amount"])
+        return headers
+
+
+# Most specific first: the first profile whose required headers are all present wins
+BANK_PROFILES = [
+    BankProfile(
+        name="capital_one",
+        label="Capital One",
+        columns={"date": "Transaction Date", "description": "Description", "category": "Category"},
+        date_formats=("%Y-%m-%d", "%m/%d/%Y"),
+        sign="split",
+        debit_column="Debit",
+        credit_column="Credit",
+        marker_columns=("Card No.",),
+    ),
+    BankProfile(
+        name="citi",
+        label="Citi",
+        columns={"date": "Date", "description": "Description"},
+        sign="split",
+        debit_column="Debit",
+        credit_column="Credit",
+        marker_columns=("Status",),
+    ),
+    BankProfile(
+        name="chase_credit",
+        label="Chase (credit card)",
+        columns={"date": "Transaction Date", "description": "Description",
+                 "amount": "Amount", "category": "Category"},
+        marker_columns=("Post Date", "Type"),
+    ),
+    BankProfile(
+        name="chase_checking",
+        label="Chase (checking)",
+        columns={"date": "Posting Date", "description": "Description",
+                 "amount": "Amount", "balance": "Balance"},
+        marker_columns=("Details",),
+    ),
+    BankProfile(
+        name="amex",
+        label="American Express",
+        columns={"date": "Date", "description": "Description", "amount": "Amount"},
+        sign="inverted",
+        marker_columns=("Card Member",),
+    ),
+    BankProfile(
+        name="discover",
+        label="Discover",
+        columns={"date": "Trans. Date", "description": "Description",
+                 "amount": "Amount", "category": "Category"},
+        sign="inverted",
+    ),
+    BankProfile(
+        name="bank_of_america",
+        label="Bank of America",
+        columns={"date": "Date", "description": "Description",
+                 "amount": "Amount", "balance": "Running Bal."},
+        marker_columns=("Running Bal.",),
+    ),
+    # The app's own layout (see README "CSV format reference")
+    BankProfile(
+        name="generic",
+        label="Generic (Date, Description, Amount, Balance)",
+        columns={"date": "Date", "description": "Description", "amount": "Amount",
+                 "balance": "Balance", "category": "Category", "source": "Source",
+                 "user_id": "User ID", "account_name": "Account Name"},
+    ),
+]
+
+BANK_PROFILES_BY_NAME = {p.name: p for p in BANK_PROFILES}
+
+
+def sniff_profile(fieldnames: list[str], sample_rows: list[list[str]],
+                  profile_name: str | None = None) -> tuple[BankProfile, str]:
+    """
+    Return (profile, date_format) for a file. ``profile_name`` forces a
+    profile instead of matching on headers. Raises ValueError when no
+    profile fits the header or no date format parses the sample.
+    """
+    headers = {h.strip() for h in fieldnames if h}
+    if profile_name:
+        profile = BANK_PROFILES_BY_NAME.get(profile_name)
+        if profile is None:
+            raise ValueError(f"Unknown bank format: {profile_name!r}")
+        missing = sorted(profile.required_headers() - headers)
+        if missing:
+            raise ValueError(f"CSV is missing required columns for {profile.label}: {', '.join(missing)}")
+    else:
+        profile = next((p for p in BANK_PROFILES if p.required_headers() <= headers), None)
+        if profile is None:
+            raise ValueError(
+                "Unrecognized CSV layout; expected at least Date, Description and Amount columns"
+            )
+
+    index = _index_of(fieldnames, profile.columns["date"])
+    dates = [r[index].strip() for r in sample_rows[:SNIFF_SAMPLE_ROWS] if len(r) > index and r[index].strip()]
+    for fmt in profile.date_formats:
+        if all(_parses(d, fmt) for d in dates):
+            return profile, fmt
+    raise ValueError(f"Dates in this file do not match {profile.label} formats ({', '.join(profile.date_formats)})")
+
+
+def compile_batch_converter(profile: BankProfile, date_format: str, fieldnames: list[str]):
+    """
+    Build ``convert(rows) -> (records, errors)`` for blocks of csv.reader
+    rows of this file. Each column is parsed in one pass (see
+    utils.money.parse_money_column and utils.dates.parse_date_column).
+    records[i] is None for an invalid row, otherwise a dict with date (ISO
+    string), description, amount, balance (floats or None), category,
+    source, user_id and account_name; errors maps i -> reason.
+    """
+    def column(canonical, required=False):
+        header = profile.columns.get(canonical)
+        if header is None:
+            return None
+        try:
+            return _index_of(fieldnames, header)
+        except ValueError:
+            if required:
+                raise
+            return None
+
+    i_date, i_desc = column("date", required=True), column("description", required=True)
+    i_balance, i_category = column("balance"), column("category")
+    i_source, i_user, i_account = column("source"), column("user_id"), column("account_name")
+    if profile.sign == "split":
+        amount_indices = (_index_of(fieldnames, profile.debit_column),
+                          _index_of(fieldnames, profile.credit_column))
+    else:
+        amount_indices = (column("amount", required=True),)
+    # Shorter rows are rejected; optional columns past this may be missing
+    width = max(i_date, i_desc, *amount_indices) + 1
+    date_memo = {}
+
+    def convert(rows):
+        records = [None] * len(rows)
+        errors = {}
+        positions = range(len(rows))
+        if any(len(values) < width for values in rows):
+            positions = []
+            for i, values in enumerate(rows):
+                if len(values) < width:
+                    errors[i] = "Row has fewer columns than the header"
+                else:
+                    positions.append(i)
+            rows = [rows[i] for i in positions]
+
+        def take(index):
+            if index is None:
+                return [""] * len(rows)
+            if index < width:
+                return [values[index] for values in rows]
+            return [values[index] if len(values) > index else "" for values in rows]
+
+        # failed maps k (index into the filtered rows) -> first error, checked in row-converter order
+        failed = {}
+        descriptions = [d.strip() for d in take(i_desc)]
+        raw_dates = take(i_date)
+        for k, (raw_date, description) in enumerate(zip(raw_dates, descriptions)):
+            if not description or not raw_date.strip():
+                failed[k] = "Missing required date or description"
+        if len(date_memo) > DATE_MEMO_MAX:
+            date_memo.clear()
+        dates, date_errors = parse_date_column(raw_dates, date_format, date_memo)
+        for k, message in date_errors.items():
+            failed.setdefault(k, message)
+        amounts = _amount_column(profile, [take(i) for i in amount_indices], failed)
+        balances, balance_errors = parse_money_column(take(i_balance), required=False)
+        for k, message in balance_errors.items():
+            failed.setdefault(k, message)
+
+        categories, sources = take(i_category), take(i_source)
+        user_ids, account_names = take(i_user), take(i_account)
+        for k in range(len(rows)):
+            if k in failed:
+                errors[positions[k]] = failed[k]
+                continue
+            user_id = user_ids[k].strip()
+            try:
+                user_id = int(user_id) if user_id else None
+            except ValueError as e:
+                errors[positions[k]] = str(e)
+                continue
+            records[positions[k]] = {
+                "date": dates[k],
+                "description": descriptions[k],
+                "amount": amounts[k],
+                "balance": balances[k],
+                "category": categories[k].strip() or None,
+                "source": sources[k].strip() or "unknown",
+                "user_id": user_id,
+                "account_name": account_names[k].strip() or "Primary Account",
+            }
+        return records, errors
+
+    return convert
+
+
+def _index_of(fieldnames: list[str], header: str) -> int:
+    for i, name in enumerate(fieldnames):
+        if name and name.strip() == header:
+            return i
+    raise ValueError(f"CSV is missing required columns: {header}")
+
+
+def _parses(value: str, fmt: str) -> bool:
+    try:
+        datetime.strptime(value, fmt)
+        return True
+    except ValueError:
+        return False
+
+
+def _amount_column(profile: BankProfile, columns: list[list], failed: dict) -> list:
+    """Signed amounts (negative = money out) from the profile's amount column(s)."""
+    if profile.sign != "split":
+        amounts, errors = parse_money_column(columns[0])
+        for k, message in errors.items():
+            failed.setdefault(k, message)
+        if profile.sign == "inverted":
+            amounts = [-a if a is not None else None for a in amounts]
+        return amounts
+
+    debits, debit_errors = parse_money_column(columns[0], required=False)
+    credits, credit_errors = parse_money_column(columns[1], required=False)
+    amounts = []
+    for k, (debit, credit) in enumerate(zip(debits, credits)):
+        if k in debit_errors or k in credit_errors:
+            failed.setdefault(k, debit_errors.get(k) or credit_errors[k])
+            amounts.append(None)
+        elif debit is None and credit is None:
+            failed.setdefault(k, "missing money value")
+            amounts.append(None)
+        else:
+            amounts.append(round(abs(credit or 0.0) - abs(debit or 0.0), 2))
+    return amounts
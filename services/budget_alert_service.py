@@ -0,0 +1,121 @@
+"""
+Budget Alert Service — threshold alerts evaluated incrementally on ledger writes.
+
+Writers call evaluate_budget_alerts with the (date, category) buckets they
+touched. Each bucket costs one budget lookup against the spend rollup, so
+evaluation is O(1) per write. Crossed thresholds are recorded once per
+(category, month, threshold) in ``budget_alerts``, which doubles as an
+outbox: the Telegram bot delivers unsent rows from its own event loop.
+
+Only the current month alerts; imports of past months are not actionable.
+"""
+import logging
+import os
+from datetime import date, datetime
+
+from db import get_db
+from repositories.budget_alerts_repository import (
+    get_bucket_budget_status,
+    record_alerts,
+    list_unsent_alerts,
+    mark_alerts_sent,
+    record_alert_failures,
+    list_recent_alerts,
+)
+from repositories.category_budgets_repository import get_all_category_budgets
+
+logger = logging.getLogger(__name__)
+
+BUDGET_ALERT_THRESHOLDS = sorted(
+    int(t) for t in os.getenv("BUDGET_ALERT_THRESHOLDS", "80,100,120").split(",") if t.strip()
+)
+# Failed deliveries before an alert stops being retried
+BUDGET_ALERT_MAX_ATTEMPTS = int(os.getenv("BUDGET_ALERT_MAX_ATTEMPTS", "5"))
+
+
+def evaluate_budget_alerts(conn, buckets=None) -> list[dict]:
+    """
+    Re-evaluate the given (date, category) buckets and record newly crossed
+    thresholds. ``buckets=None`` evaluates every budgeted category for the
+    current month (for bulk operations). Returns the new alerts.
+
+    Best-effort: alerting must never fail the write that triggered it.
+    """
+    try:
+        current = date.today().replace(day=1)
+        if buckets is None:
+            categories = {
+                b["category_name"] for b in get_all_category_budgets() if b["active"]
+            }
+        else:
+            categories = {
+                category for tx_date, category in buckets
+                if category and _month_of(tx_date) == current
+            }
+
+        alerts = []
+        for category in sorted(categories):
+            status = get_bucket_budget_status(conn, current, category)
+            if status is None:
+                continue
+            spent, budget = status
+            crossed = [t for t in BUDGET_ALERT_THRESHOLDS if spent >= budget * t / 100]
+            alerts += record_alerts(conn, current, category, crossed, spent, budget)
+        return alerts
+    except Exception as e:
+        logger.warning(f"Budget alert evaluation failed: {e}")
+        return []
+
+
+def _month_of(value) -> date:
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], "%Y-%m-%d").date()
+    elif isinstance(value, datetime):
+        value = value.date()
+    return value.replace(day=1)
+
+
+def format_alert(alert: dict) -> str:
+    """One-line plain-text Telegram message for an alert (category names are user input)."""
+    pct = 100 * alert["spent"] / alert["budget"] if alert["budget"] else 0
+    month = alert["month"].strftime("%b %Y")
+    if alert["threshold_pct"] >= 100:
+        headline = f"⚠️ {alert['category']} is over budget"
+    else:
+        headline = f"🔔 {alert['category']} reached {alert['threshold_pct']}% of budget"
+    return (
+        f"{headline} for {month}: "
+        f"${alert['spent']:,.2f} of ${alert['budget']:,.2f} ({pct:.0f}%)"
+    )
+
+
+def get_pending_alerts(limit: int = 50) -> list[dict]:
+    conn = get_db()
+    try:
+        return list_unsent_alerts(conn, BUDGET_ALERT_MAX_ATTEMPTS, limit=limit)
+    finally:
+        conn.close()
+
+
+def mark_delivered(alert_ids: list[int]) -> None:
+    conn = get_db()
+    try:
+        mark_alerts_sent(conn, alert_ids)
+    finally:
+        conn.close()
+
+
+def mark_delivery_failed(alert_ids: list[int], error: str, delivered_chats: list[str] = ()) -> None:
+    conn = get_db()
+    try:
+        record_alert_failures(conn, alert_ids, error, delivered_chats)
+    finally:
+        conn.close()
+
+
+def get_recent_alerts(limit: int = 50) -> list[dict]:
+    conn = get_db()
+    try:
+        return list_recent_alerts(conn, limit=limit)
+    finally:
+        conn.close()
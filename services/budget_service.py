@@ -1,10 +1,12 @@
+import re
+from datetime import date, datetime
+
+from db import get_db, bump_ledger_version
 from repositories.category_budgets_repository import (
     upsert_category_budget,
-    get_all_category_budgets,
-    get_spend_grouped_by_category,
+    get_budget_vs_spend,
 )
-
-# repository import already includes spend aggregation; we'll use it for the new summary
+from repositories.spend_rollup_repository import rebuild_rollup, get_spend_pivot
 
 
 def set_category_budget(category_name: str, monthly_budget: float, active: bool = True) -> None:
@@ -13,83 +15,180 @@ def set_category_budget(category_name: str, monthly_budget: float, active: bool
     Deterministic. No ledger mutation.
     """
     upsert_category_budget(category_name, monthly_budget, active)
+    bump_ledger_version()
 
 
-def get_category_budget_summary() -> list[dict]:
+def resolve_budget_period(period: str | None = None, start: str | None = None,
+                          end: str | None = None, today: date | None = None) -> tuple[date, date, int]:
+    """
+    Turn a period selector into (first_month, last_month, month_count).
+    Months are the first day of the month; the rollup is month-grained.
+
+    period:
+      - None / "month"  current month
+      - "YYYY-MM"       that month
+      - "quarter"       current calendar quarter; "YYYY-Qn" a specific one
+      - "ytd"           January through the current month
+      - "YYYY"          that calendar year
+      - "custom"        ``start`` through ``end`` (YYYY-MM or YYYY-MM-DD, whole months)
+
+    Raises ValueError on an unrecognized or inverted period.
     """
-    Returns list of summary dicts containing:
+    today = today or date.today()
+    current = date(today.year, today.month, 1)
+    p = (period or "month").strip().lower()
+
+    if start or end or p == "custom":
+        if not (start and end):
+            raise ValueError("custom period requires both start and end")
+        first, last = _parse_month(start), _parse_month(end)
+    elif p == "month":
+        first = last = current
+    elif p == "quarter":
+        first = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+        last = date(today.year, first.month + 2, 1)
+    elif p == "ytd":
+        first, last = date(today.year, 1, 1), current
+    elif re.fullmatch(r"\d{4}-q[1-4]", p):
+        year, q = int(p[:4]), int(p[-1])
+        first, last = date(year, 3 * q - 2, 1), date(year, 3 * q, 1)
+    elif re.fullmatch(r"\d{4}", p):
+        first, last = date(int(p), 1, 1), date(int(p), 12, 1)
+    else:
+        first = last = _parse_month(p)
+
+    if last < first:
+        raise ValueError("period end is before period start")
+    months = (last.year - first.year) * 12 + last.month - first.month + 1
+    return first, last, months
+
+
+def _parse_month(value: str) -> date:
+    try:
+        parsed = datetime.strptime(value.strip()[:7], "%Y-%m")
+    except ValueError:
+        raise ValueError(f"Unrecognized period: {value!r}")
+    return date(parsed.year, parsed.month, 1)
+
+
+def _budget_vs_spend(period=None, start=None, end=None) -> tuple[date, date, list[dict]]:
+    first, last, months = resolve_budget_period(period, start, end)
+    conn = get_db()
+    try:
+        return first, last, get_budget_vs_spend(conn, first, last, months)
+    finally:
+        conn.close()
+
+
+def get_category_budget_summary(period: str | None = None, start: str | None = None,
+                                end: str | None = None) -> list[dict]:
+    """
+    Returns list of summary dicts, one per configured budget, containing:
       - category_name
       - monthly_budget
-      - current_spend
+      - budget (monthly_budget scaled to the period)
+      - current_spend (net outflow over the period, from the spend rollup)
       - remaining
       - active
+      - period_start / period_end (first day of the first and last month)
 
+    Period selection as in resolve_budget_period; defaults to the current month.
     Deterministic read-only aggregation. No side effects.
     """
-    budgets = get_all_category_budgets()
-    spend = get_spend_grouped_by_category()
-
-    spend_lookup = {s["category_name"]: s["current_spend"] for s in spend}
-
-    summary = []
-
-    for b in budgets:
-        category_name = b["category_name"]
-        monthly_budget = b["monthly_budget"]
-        active = b["active"]
-        current_spend = spend_lookup.get(category_name, 0.0)
-
-        remaining = None
-        if monthly_budget is not None:
-            remaining = monthly_budget - current_spend
-
-        summary.append(
-            {
-                "category_name": category_name,
-                "monthly_budget": monthly_budget,
-                "current_spend": current_spend,
-                "remaining": remaining,
-                "active": active,
-            }
-        )
-
-    return summary
-
-
-# ------------------------------------------------------------------
-# New function for Sprint 8
-# ------------------------------------------------------------------
-
-def get_spend_vs_budget_summary() -> list[dict]:
+    first, last, rows = _budget_vs_spend(period, start, end)
+    return [
+        {
+            "category_name": r["category"],
+            "monthly_budget": r["monthly_budget"],
+            "budget": r["budget"],
+            "current_spend": r["spent"],
+            "remaining": r["remaining"],
+            "active": r["active"],
+            "period_start": first.isoformat(),
+            "period_end": last.isoformat(),
+        }
+        for r in rows
+        if r["has_budget"]
+    ]
+
+
+def get_spend_vs_budget_summary(period: str | None = None) -> list[dict]:
     """
-    Deterministic aggregation of total spend per category compared against
-    configured budget.
+    Deterministic aggregation of spend per category for the period
+    (default: current month) compared against configured budget.
 
     Returns a list of dictionaries containing:
         category, budget, spent, remaining
 
     Read-only. No side effects.
     """
-    # reuse existing repository helpers; they open/close their own connections
-    budgets = get_all_category_budgets()
-    spend_entries = get_spend_grouped_by_category()
-
-    # build lookup maps (filter out None categories)
-    budget_map = {b["category_name"]: float(b["monthly_budget"] or 0.0) for b in budgets if b["category_name"] is not None}
-    spend_map = {s["category_name"]: float(s["current_spend"]) for s in spend_entries if s["category_name"] is not None}
-
-    # deterministic ordering by category name
-    categories = sorted(set(budget_map.keys()) | set(spend_map.keys()))
-
+    _, _, rows = _budget_vs_spend(period)
     result = []
-    for cat in categories:
-        spent = round(spend_map.get(cat, 0.0), 2)
-        budget = round(budget_map.get(cat, 0.0), 2)
-        remaining = round(budget - spent, 2)
+    for r in rows:
+        if r["category"] is None:
+            continue
+        budget = round(float(r["budget"] or 0.0), 2)
         result.append({
-            "category": cat,
+            "category": r["category"],
             "budget": budget,
-            "spent": spent,
-            "remaining": remaining,
+            "spent": r["spent"],
+            "remaining": round(budget - r["spent"], 2),
         })
     return result
+
+
+def get_budget_trend(months: int = 12, end: str | None = None) -> dict:
+    """
+    Category x month spend for the ``months`` months ending at ``end``
+    (YYYY-MM, default current month), in a columnar layout:
+
+      - months:     ["YYYY-MM", ...] ascending
+      - categories: [name, ...] (None = uncategorized, listed last)
+      - budget:     monthly budget per category (None if not budgeted)
+      - spent:      one array per category, aligned with months (net
+                    outflow; 0.0 for months with net inflow)
+      - mom_delta:  month-over-month change per category (first month None)
+      - total_spent: per-month total across categories
+
+    Raises ValueError if months is outside 1..120.
+    """
+    if not 1 <= months <= 120:
+        raise ValueError("months must be between 1 and 120")
+    last = _parse_month(end) if end else date.today().replace(day=1)
+    index = last.year * 12 + last.month - 1
+    month_keys = [
+        f"{i // 12:04d}-{i % 12 + 1:02d}" for i in range(index - months + 1, index + 1)
+    ]
+
+    conn = get_db()
+    try:
+        rows = get_spend_pivot(conn, month_keys)
+    finally:
+        conn.close()
+
+    spent = [r["spent"] for r in rows]
+    return {
+        "months": month_keys,
+        "categories": [r["category"] for r in rows],
+        "budget": [r["monthly_budget"] for r in rows],
+        "spent": spent,
+        "mom_delta": [
+            [None] + [round(cur - prev, 2) for prev, cur in zip(series, series[1:])]
+            for series in spent
+        ],
+        "total_spent": [round(sum(col), 2) for col in zip(*spent)] if spent else [0.0] * months,
+    }
+
+
+def rebuild_spend_rollup() -> dict:
+    """
+    Recompute the monthly category spend rollup from the full ledger.
+    Use after bulk edits made outside the repository layer.
+    """
+    conn = get_db()
+    try:
+        buckets = rebuild_rollup(conn)
+    finally:
+        conn.close()
+    bump_ledger_version()
+    return {"buckets": buckets}
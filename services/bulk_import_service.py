@@ -0,0 +1,230 @@
+"""
+Bulk Import Service — Parquet / Arrow IPC files for historical backfills.
+
+Typed columnar files skip CSV decoding and per-row conversion. DuckDB
+scans the file in place (Parquet through a pyarrow dataset, Arrow IPC
+memory-mapped), stages it once in a temp table, and validation,
+de-duplication and the insert run as set-based statements, the insert in
+one transaction. Merchant normalization and rule categorization run once
+per distinct description (normalize_many, then a rules join in SQL) and
+are joined back to the rows.
+
+Columns are matched case-insensitively, with spaces or underscores:
+date, description and amount are required; balance, category, source,
+user_id and account_name are optional, as in the CSV layout.
+"""
+import logging
+import os
+import time
+
+from db import get_db, bump_ledger_version
+from repositories.accounts_repository import get_or_create_account_ids
+from repositories.bulk_import_repository import (
+    stage_bulk_rows,
+    get_bulk_rejections,
+    get_bulk_account_names,
+    get_bulk_descriptions,
+    resolve_bulk_descriptions,
+    build_bulk_new_rows,
+    get_bulk_duplicate_rows,
+    insert_bulk_new_rows,
+    get_bulk_category_counts,
+    get_bulk_alert_buckets,
+    drop_bulk_tables,
+)
+from repositories.category_rules_repository import get_all_category_rules
+from repositories.spend_rollup_repository import adjust_rollup_for_relation
+from services.budget_alert_service import evaluate_budget_alerts
+from services.csv_ingest_service import INGEST_MAX_REJECTIONS, ingest_result
+from services.merchant_normalization import normalize_many
+from services.merchant_service import resolve_merchant_ids
+from services.search_service import request_search_index_refresh
+from utils.timing import timed
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_BULK_COLUMNS = ("date", "description", "amount")
+OPTIONAL_BULK_COLUMNS = ("balance", "category", "source", "user_id", "account_name")
+
+_PARQUET_MAGIC = b"PAR1"
+_ARROW_FILE_MAGIC = b"ARROW1"
+_ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+
+def detect_bulk_format(path: str) -> str:
+    """"parquet", "arrow" (IPC file) or "arrow_stream" from the file's magic bytes."""
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(_PARQUET_MAGIC):
+        return "parquet"
+    if head.startswith(_ARROW_FILE_MAGIC):
+        return "arrow"
+    if head.startswith(_ARROW_STREAM_MAGIC):
+        return "arrow_stream"
+    raise ValueError("Bulk import expects a Parquet or Arrow IPC file")
+
+
+def bulk_import_file(path: str, account_id: int = None, run_id: int = None, on_phase=None) -> dict:
+    """
+    Import a Parquet or Arrow IPC file into the ledger. Rows go to
+    ``account_id``, or to their account_name column (default "Primary
+    Account"), and are tagged with ``run_id``. ``on_phase(status)`` is
+    called as the import moves through parsing, matching and inserting.
+
+    Same result shape as ingest_csv_stream; ``profile`` is the file format.
+    Invalid rows and rows already in the ledger (or repeated in the file)
+    are skipped. Raises ValueError on an unreadable file or a schema
+    without the required columns.
+    """
+    import pyarrow as pa
+
+    started = time.perf_counter()
+    timings = {}
+    fmt = detect_bulk_format(path)
+    source = _open_source(path, fmt)
+    columns, date_kind = _map_columns(source.schema)
+
+    stats = {
+        "bytes": os.path.getsize(path), "parsed": 0, "inserted": 0, "invalid": 0, "duplicates": 0,
+        "first_error": None, "rejections": [], "categories": {}, "alert_buckets": set(),
+    }
+    conn = get_db()
+    try:
+        if on_phase:
+            on_phase("parsing")
+        conn.register("bulk_source", source)
+        try:
+            with timed(timings, "parse"):
+                stats["parsed"] = stage_bulk_rows(conn, columns, date_kind)
+        finally:
+            conn.unregister("bulk_source")
+        stats["invalid"], stats["rejections"] = get_bulk_rejections(conn, INGEST_MAX_REJECTIONS)
+        if stats["rejections"]:
+            row_number, reason = stats["rejections"][0]
+            stats["first_error"] = (reason, row_number)
+
+        if on_phase:
+            on_phase("matching")
+        # Interned ids are cached in-process, so intern outside the transaction
+        with timed(timings, "normalize"):
+            names = get_bulk_account_names(conn)
+            if account_id is None:
+                account_ids = get_or_create_account_ids(conn, names)
+            else:
+                account_ids = {name: account_id for name in names}
+            descriptions = get_bulk_descriptions(conn)
+            merchant_names = normalize_many(descriptions)
+            merchant_ids = resolve_merchant_ids(conn, merchant_names)
+        with timed(timings, "categorize"):
+            rules = [r for r in get_all_category_rules(conn) if r.get("pattern")]
+            resolve_bulk_descriptions(
+                conn,
+                pa.table({
+                    "description": pa.array(descriptions, pa.string()),
+                    "merchant_normalized": pa.array(merchant_names, pa.string()),
+                    "merchant_id": pa.array([merchant_ids.get(n) for n in merchant_names], pa.int64()),
+                }),
+                pa.table({
+                    "rank": pa.array(range(len(rules)), pa.int64()),
+                    "pattern": pa.array([r["pattern"].lower() for r in rules], pa.string()),
+                    "category": pa.array([r["category"] for r in rules], pa.string()),
+                }),
+            )
+
+        conn.begin()
+        try:
+            with timed(timings, "match"):
+                valid, new = build_bulk_new_rows(conn, pa.table({
+                    "account_name": pa.array(list(account_ids), pa.string()),
+                    "account_id": pa.array(list(account_ids.values()), pa.int64()),
+                }))
+            if on_phase:
+                on_phase("inserting")
+            with timed(timings, "write"):
+                stats["inserted"] = insert_bulk_new_rows(conn, run_id)
+                adjust_rollup_for_relation(conn, "bulk_new", +1)
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if stats["inserted"]:
+            bump_ledger_version()
+
+        stats["duplicates"] = valid - new
+        room = INGEST_MAX_REJECTIONS - len(stats["rejections"])
+        if stats["duplicates"] and room > 0:
+            stats["rejections"] += [(n, "duplicate") for n in get_bulk_duplicate_rows(conn, room)]
+        stats["categories"] = get_bulk_category_counts(conn)
+        buckets = get_bulk_alert_buckets(conn)
+        if buckets:
+            evaluate_budget_alerts(conn, buckets)
+        drop_bulk_tables(conn)
+    finally:
+        conn.close()
+
+    timings["total"] = (time.perf_counter() - started) * 1000
+    if stats["inserted"]:
+        request_search_index_refresh()
+    logger.info(
+        f"Bulk import of {path} ({fmt}): {stats['inserted']} inserted, {stats['invalid']} invalid, "
+        f"{stats['duplicates']} duplicate in {timings['total']:.0f} ms"
+    )
+    return ingest_result(stats, timings, fmt)
+
+
+def _open_source(path: str, fmt: str):
+    """An Arrow object DuckDB can scan without copying: a dataset or a memory-mapped table."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    try:
+        if fmt == "parquet":
+            return ds.dataset(path, format="parquet")
+        source = pa.memory_map(path)
+        if fmt == "arrow":
+            return pa.ipc.open_file(source).read_all()
+        return pa.ipc.open_stream(source).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ValueError(f"Could not read {fmt.replace('_', ' ')} file: {e}")
+
+
+def _map_columns(schema) -> tuple[dict, str]:
+    """
+    Map canonical column names to the file's columns and check their
+    types. Returns (columns, date_kind) for stage_bulk_rows.
+    """
+    import pyarrow.types as pt
+
+    by_key = {}
+    for field in schema:
+        by_key.setdefault(field.name.strip().lower().replace(" ", "_"), field)
+    missing = [c for c in REQUIRED_BULK_COLUMNS if c not in by_key]
+    if missing:
+        raise ValueError(f"File is missing required columns: {', '.join(missing)}")
+
+    def is_text(t):
+        return pt.is_string(t) or pt.is_large_string(t) or pt.is_dictionary(t) and is_text(t.value_type)
+
+    def is_number(t):
+        return pt.is_integer(t) or pt.is_floating(t) or pt.is_decimal(t)
+
+    checks = {
+        "date": lambda t: is_text(t) or pt.is_date(t) or pt.is_timestamp(t),
+        "description": is_text,
+        "amount": lambda t: is_number(t) or is_text(t),
+        "balance": lambda t: is_number(t) or is_text(t) or pt.is_null(t),
+        "category": lambda t: is_text(t) or pt.is_null(t),
+        "source": lambda t: is_text(t) or pt.is_null(t),
+        "user_id": lambda t: pt.is_integer(t) or is_text(t) or pt.is_null(t),
+        "account_name": lambda t: is_text(t) or pt.is_null(t),
+    }
+    columns = {}
+    for name in (*REQUIRED_BULK_COLUMNS, *OPTIONAL_BULK_COLUMNS):
+        field = by_key.get(name)
+        if field is None:
+            continue
+        if not checks[name](field.type):
+            raise ValueError(f"Column {field.name!r} has unsupported type {field.type}")
+        columns[name] = field.name
+    date_kind = "string" if is_text(by_key["date"].type) else "temporal"
+    return columns, date_kind
@@ -1,21 +1,53 @@
+import codecs
 import csv
+import hashlib
 import io
 import logging
+import os
+import time
+from itertools import chain, islice
 from duckdb import IntegrityError
+from db import get_db, bump_ledger_version
 from services.transaction_service import add_transaction
-from repositories.ingestion_repository import record_ingestion_run
+from services.merchant_service import annotate_merchant_fields
+from services.category_rule_engine import evaluate_category
+from services.budget_alert_service import evaluate_budget_alerts
+from services.bank_profiles import SNIFF_SAMPLE_ROWS, sniff_profile, compile_batch_converter
+from repositories.ingestion_repository import (
+    record_ingestion_run,
+    record_rejections,
+    find_known_fingerprints,
+    record_known_fingerprints,
+    record_row_fingerprints,
+    tag_ingestion_run_rows,
+)
+from repositories.accounts_repository import get_or_create_account_ids
+from repositories.category_rules_repository import get_all_category_rules
+from repositories.transactions_repository import (
+    find_existing_batch_rows,
+    insert_transactions_batch,
+)
+from services.search_service import request_search_index_refresh
 from utils.money import parse_money
 from utils.dates import normalize_date
+from utils.timing import accumulated
 
 REQUIRED_COLUMNS = {"Date", "Description", "Amount", "Balance"}
 
+# Streaming ingest: bytes read from the upload per chunk, rows per DuckDB flush
+INGEST_CHUNK_BYTES = int(os.getenv("INGEST_CHUNK_BYTES", str(1024 * 1024)))
+INGEST_BATCH_ROWS = int(os.getenv("INGEST_BATCH_ROWS", "5000"))
+# Rejected rows stored per run in ingestion_rejections; the rest are only counted
+INGEST_MAX_REJECTIONS = int(os.getenv("INGEST_MAX_REJECTIONS", "10000"))
+
 logging.basicConfig(
     filename="csv_ingest.log",
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
-def ingest_csv(contents: str, account_id: int = None):
+def ingest_csv(contents: str, account_id: int = None, filename: str = "upload.csv"):
+    started = time.perf_counter()
     reader = csv.DictReader(io.StringIO(contents, newline=""))
     if not reader.fieldnames:
         return {
@@ -38,42 +70,45 @@ def ingest_csv(contents: str, account_id: int = None):
 
     results = []
     categories_assigned = {}
+    timings = {}
+    inserted_ids = []
 
     for idx, row in enumerate(reader, start=1):
         row_result = {"row": idx, "success": False, "error": None, "category": None}
 
         try:
-            raw_date = (row.get("Date") or "").strip()
-            raw_description = (row.get("Description") or "").strip()
-            if not raw_date or not raw_description:
-                raise ValueError("Missing required date or description")
-
-            date = normalize_date(raw_date)
-            description = raw_description
-            amount = parse_money(row.get("Amount"))
-            balance = parse_money(row.get("Balance")) if row.get("Balance") else None
-            category = row.get("Category") or None
-            source = row.get("Source") or "unknown"
-            user_id = row.get("User ID") or None
-            merchant_id = row.get("Merchant ID") or None
-            account_name = row.get("Account Name")  # optional, repository handles mapping
+            with accumulated(timings, "normalize"):
+                raw_date = (row.get("Date") or "").strip()
+                raw_description = (row.get("Description") or "").strip()
+                if not raw_date or not raw_description:
+                    raise ValueError("Missing required date or description")
+
+                date = normalize_date(raw_date)
+                description = raw_description
+                amount = parse_money(row.get("Amount"))
+                balance = parse_money(row.get("Balance")) if row.get("Balance") else None
+                category = row.get("Category") or None
+                source = row.get("Source") or "unknown"
+                user_id = row.get("User ID") or None
+                account_name = row.get("Account Name")  # optional, repository handles mapping
 
             # delegate to service layer (handles connection lifecycle)
-            add_transaction(
-                date=date,
-                description=description,
-                amount=amount,
-                balance=balance,
-                category=category,
-                source=source,
-                user_id=user_id,
-                merchant_id=merchant_id,
-                account_id=account_id,
-                account_name=account_name,
-            )
+            with accumulated(timings, "write"):
+                transaction_id = add_transaction(
+                    date=date,
+                    description=description,
+                    amount=amount,
+                    balance=balance,
+                    category=category,
+                    source=source,
+                    user_id=user_id,
+                    account_id=account_id,
+                    account_name=account_name,
+                )
 
             row_result["success"] = True
             row_result["category"] = category
+            inserted_ids.append(transaction_id)
 
         except IntegrityError:
             row_result["error"] = "Duplicate transaction (unique constraint)"
@@ -82,19 +117,29 @@ def ingest_csv(contents: str, account_id: int = None):
 
         results.append(row_result)
         if row_result["success"]:
-            logging.info(f"Row {idx} inserted successfully (account={account_name or 'Primary Account'})")
             cat_key = row_result["category"] or "Uncategorized"
             categories_assigned[cat_key] = categories_assigned.get(cat_key, 0) + 1
-        else:
-            logging.warning(f"Row {idx} failed: {row_result['error']}")
 
     inserted_count = sum(r["success"] for r in results)
     skipped_count = len(results) - inserted_count
-    record_ingestion_run(
-        filename="upload.csv",
+    timings["total"] = (time.perf_counter() - started) * 1000
+    run = record_ingestion_run(
+        filename=filename,
         inserted_count=inserted_count,
         skipped_count=skipped_count,
+        bytes_total=len(contents.encode("utf-8")),
+        row_count=len(results),
+        timings=timings,
     )
+    rejections = [(r["row"], r["error"]) for r in results if not r["success"]]
+    record_rejections(run["id"], rejections[:INGEST_MAX_REJECTIONS])
+    conn = get_db()
+    try:
+        tag_ingestion_run_rows(conn, run["id"], inserted_ids)
+    finally:
+        conn.close()
+    if inserted_count:
+        request_search_index_refresh()
 
     first_failure = next((r for r in results if not r["success"]), None)
 
@@ -104,4 +149,436 @@ def ingest_csv(contents: str, account_id: int = None):
         "categories_assigned": categories_assigned,
         "error_message": first_failure["error"] if first_failure else None,
         "error_row": first_failure["row"] if first_failure else None,
-    }
\ No newline at end of file
+    }
+
+
+def ingest_csv_stream(fileobj, account_id: int = None, filename: str = "upload.csv",
+                      on_progress=None, record_run: bool = True, profile_name: str = None,
+                      run_id: int = None):
+    """
+    Streaming counterpart of ingest_csv for large exports.
+
+    Reads ``fileobj`` (binary, e.g. UploadFile.file) in INGEST_CHUNK_BYTES
+    chunks, validates rows through a generator pipeline and inserts them in
+    INGEST_BATCH_ROWS batches, each in its own DuckDB transaction. Memory
+    use depends on the batch size, not the file size.
+
+    The bank format is sniffed from the header and first rows (or forced
+    with ``profile_name``, see services.bank_profiles) and compiled into
+    one converter for the whole file, applied a block of rows at a time.
+    Rows whose raw fingerprint an earlier run recorded (and whose ledger row
+    still exists) are skipped before conversion; inserted rows are tagged with ``run_id`` and fingerprints
+    of this file's valid rows recorded under it (or under the run recorded
+    at the end when record_run is set).
+
+    Same result shape as ingest_csv plus rows_skipped, profile and
+    diagnostics: bytes_total, row_count, timings (ms per phase, see
+    INGEST_PHASES) and rejections ((row_number, reason), at most
+    INGEST_MAX_REJECTIONS).
+    Invalid and duplicate rows are skipped; the first invalid one is reported.
+    ``on_progress(rows_parsed, rows_inserted)`` is called after every batch.
+    With ``record_run=False`` the caller records the ingestion run itself.
+    """
+    started = time.perf_counter()
+    stats = _new_stats()
+    timings = {}
+    reader = csv.reader(_iter_lines(_iter_text_chunks(fileobj, stats, timings)))
+    try:
+        fieldnames = next(reader, None)
+        sample = [values for values in islice(reader, SNIFF_SAMPLE_ROWS)]
+    except UnicodeDecodeError:
+        return _stream_failure("File must be UTF-8 encoded CSV")
+    if not fieldnames:
+        return _stream_failure("CSV is missing headers")
+    try:
+        profile, date_format = sniff_profile(fieldnames, sample, profile_name)
+        convert = compile_batch_converter(profile, date_format, fieldnames)
+    except ValueError as e:
+        return _stream_failure(str(e))
+
+    conn = get_db()
+    try:
+        rules = get_all_category_rules(conn)
+        pending_rows = []
+        pending_ids = []
+        pending_known = []
+
+        def find_known(fingerprints):
+            known = find_known_fingerprints(conn, fingerprints)
+            if run_id is None:
+                pending_known.extend(known)
+            else:
+                record_known_fingerprints(conn, run_id, list(known))
+            return known
+
+        rows = _iter_valid_rows(chain(sample, reader), convert, account_id, stats, timings, find_known=find_known)
+        try:
+            while batch := list(islice(rows, INGEST_BATCH_ROWS)):
+                inserted = _write_rows(conn, batch, account_id, rules, stats, timings, run_id)
+                if run_id is None:
+                    pending_rows.extend(batch)
+                    pending_ids.extend(r[0] for r in inserted)
+                if on_progress:
+                    on_progress(stats["parsed"], stats["inserted"])
+        except UnicodeDecodeError:
+            _reject(stats, None, "File must be UTF-8 encoded CSV")
+
+        if stats["alert_buckets"]:
+            evaluate_budget_alerts(conn, sorted(stats["alert_buckets"], key=str))
+    finally:
+        conn.close()
+
+    # Reading the next row pulls (and so includes) the decode work; report it once
+    timings["parse"] = max(0.0, timings.get("parse", 0.0) - timings.get("decode", 0.0))
+    timings["total"] = (time.perf_counter() - started) * 1000
+
+    if record_run:
+        run = record_ingestion_run(
+            filename=filename,
+            inserted_count=stats["inserted"],
+            skipped_count=stats["invalid"] + stats["duplicates"],
+            bytes_total=stats["bytes"],
+            row_count=stats["parsed"],
+            timings=timings,
+            profile=profile.name,
+        )
+        record_rejections(run["id"], stats["rejections"])
+        conn = get_db()
+        try:
+            record_known_fingerprints(conn, run["id"], pending_known)
+            record_row_fingerprints(conn, run["id"], pending_rows)
+            tag_ingestion_run_rows(conn, run["id"], pending_ids)
+        finally:
+            conn.close()
+    if stats["inserted"]:
+        request_search_index_refresh()
+    logging.info(
+        f"Ingested {filename}: {stats['inserted']} inserted, {stats['invalid']} invalid, "
+        f"{stats['duplicates']} duplicate in {timings['total']:.0f} ms"
+    )
+    return ingest_result(stats, timings, profile.name)
+
+
+def prepare_csv_file(path: str, account_id: int = None, profile_name: str = None) -> dict:
+    """
+    Decode, parse and convert a whole CSV file without touching the
+    database, so it can run in a worker process. Returns success,
+    error_message, profile, rows (converted dicts with row_number and
+    fingerprint), stats and timings; write the rows with
+    write_prepared_rows and build the result with ingest_result.
+    """
+    stats = _new_stats()
+    timings = {}
+    with open(path, "rb") as f:
+        reader = csv.reader(_iter_lines(_iter_text_chunks(f, stats, timings)))
+        try:
+            fieldnames = next(reader, None)
+            sample = [values for values in islice(reader, SNIFF_SAMPLE_ROWS)]
+        except UnicodeDecodeError:
+            return {**_stream_failure("File must be UTF-8 encoded CSV"), "rows": []}
+        if not fieldnames:
+            return {**_stream_failure("CSV is missing headers"), "rows": []}
+        try:
+            profile, date_format = sniff_profile(fieldnames, sample, profile_name)
+            convert = compile_batch_converter(profile, date_format, fieldnames)
+        except ValueError as e:
+            return {**_stream_failure(str(e)), "rows": []}
+        try:
+            rows = list(_iter_valid_rows(chain(sample, reader), convert, account_id, stats, timings))
+        except UnicodeDecodeError:
+            return {**_stream_failure("File must be UTF-8 encoded CSV"), "rows": []}
+
+    timings["parse"] = max(0.0, timings.get("parse", 0.0) - timings.get("decode", 0.0))
+    return {
+        "success": True,
+        "error_message": None,
+        "profile": profile.name,
+        "rows": rows,
+        "stats": stats,
+        "timings": timings,
+    }
+
+
+def intern_prepared_rows(conn, rows: list[dict], timings: dict) -> None:
+    """
+    Set merchant fields on rows from prepare_csv_file. Interned ids are
+    cached in-process, so call this before opening the write transaction.
+    """
+    with accumulated(timings, "normalize"):
+        annotate_merchant_fields(conn, rows)
+
+
+def write_prepared_rows(conn, rows: list[dict], account_id, rules, stats: dict, timings: dict,
+                        run_id: int) -> None:
+    """
+    Insert rows from prepare_csv_file and intern_prepared_rows inside the
+    caller's transaction, skipping ones an earlier run already ingested.
+    Updates ``stats``.
+    """
+    for start in range(0, len(rows), INGEST_BATCH_ROWS):
+        batch = rows[start:start + INGEST_BATCH_ROWS]
+        with accumulated(timings, "match"):
+            known = find_known_fingerprints(conn, [row["fingerprint"] for row in batch])
+            record_known_fingerprints(conn, run_id, list(known))
+        if known:
+            batch = _drop_known(batch, known, stats)
+        _write_rows(conn, batch, account_id, rules, stats, timings, run_id, commit=False)
+
+
+def ingest_result(stats: dict, timings: dict, profile_name: str | None) -> dict:
+    """Result dict of a finished ingest (see ingest_csv_stream)."""
+    error_message, error_row = stats["first_error"] or (None, None)
+    if error_message is None and stats["duplicates"]:
+        error_message = f"{stats['duplicates']} duplicate transaction(s) skipped"
+    return {
+        "success": True,
+        "rows_imported": stats["inserted"],
+        "rows_skipped": stats["invalid"] + stats["duplicates"],
+        "categories_assigned": stats["categories"],
+        "error_message": error_message,
+        "error_row": error_row,
+        "bytes_total": stats["bytes"],
+        "row_count": stats["parsed"],
+        "timings": timings,
+        "rejections": stats["rejections"],
+        "profile": profile_name,
+    }
+
+
+def _new_stats() -> dict:
+    return {
+        "bytes": 0, "parsed": 0, "inserted": 0, "invalid": 0, "duplicates": 0,
+        "first_error": None, "rejections": [], "categories": {}, "alert_buckets": set(),
+    }
+
+
+def _write_rows(conn, batch: list[dict], account_id, rules, stats: dict, timings: dict,
+                run_id: int | None, commit: bool = True) -> list[tuple]:
+    """
+    Insert a batch of new rows tagged with ``run_id``, record their
+    fingerprints and tally categories and alert months. Returns
+    (id, date, category) of the inserted rows.
+    """
+    inserted = _flush_batch(conn, batch, account_id, rules, stats, timings, run_id, commit=commit)
+    if run_id is not None:
+        with accumulated(timings, "write"):
+            record_row_fingerprints(conn, run_id, batch)
+    stats["inserted"] += len(inserted)
+    for _, tx_date, category in inserted:
+        cat_key = category or "Uncategorized"
+        stats["categories"][cat_key] = stats["categories"].get(cat_key, 0) + 1
+        stats["alert_buckets"].add((tx_date.replace(day=1), category))
+    return inserted
+
+
+def _iter_text_chunks(fileobj, stats: dict, timings: dict):
+    """Read and decode a binary stream chunk by chunk (BOM-tolerant UTF-8)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    while True:
+        with accumulated(timings, "decode"):
+            chunk = fileobj.read(INGEST_CHUNK_BYTES)
+            text = decoder.decode(chunk, final=not chunk)
+        stats["bytes"] += len(chunk)
+        if text:
+            yield text
+        if not chunk:
+            return
+
+
+def _iter_lines(chunks):
+    """Re-split text chunks into lines (with endings) for csv; quoted newlines are csv's job."""
+    tail = ""
+    for chunk in chunks:
+        parts = (tail + chunk).split("\n")
+        tail = parts.pop()
+        for part in parts:
+            yield part + "\n"
+    if tail:
+        yield tail
+
+
+def _iter_valid_rows(records, convert, account_id, stats: dict, timings: dict, find_known=None):
+    """
+    Yield converted row dicts, converting INGEST_BATCH_ROWS raw rows at a
+    time. With ``find_known(fingerprints) -> set``, rows an earlier run
+    already ingested are dropped before conversion. Dropped and invalid
+    rows are counted and recorded as rejections.
+    """
+    clock = time.perf_counter
+    parse_ms = normalize_ms = 0.0
+    idx = 0
+    try:
+        while True:
+            t0 = clock()
+            raw = list(islice(records, INGEST_BATCH_ROWS))
+            block = [values for values in raw if values]  # drop blank lines
+            t1 = clock()
+            parse_ms += t1 - t0
+            if not raw:
+                return
+            row_numbers = range(idx + 1, idx + len(block) + 1)
+            idx += len(block)
+            stats["parsed"] = idx
+
+            with accumulated(timings, "match"):
+                fingerprints = _row_fingerprints(account_id, block)
+                known = find_known(fingerprints) if find_known else None
+            if known:
+                keep = []
+                for pos, fingerprint in enumerate(fingerprints):
+                    if fingerprint in known:
+                        stats["duplicates"] += 1
+                        _reject(stats, row_numbers[pos], "already imported")
+                    else:
+                        keep.append(pos)
+                block = [block[pos] for pos in keep]
+                fingerprints = [fingerprints[pos] for pos in keep]
+                row_numbers = [row_numbers[pos] for pos in keep]
+
+            t2 = clock()
+            converted, errors = convert(block)
+            for pos, record in enumerate(converted):
+                if record is None:
+                    stats["invalid"] += 1
+                    _reject(stats, row_numbers[pos], errors[pos])
+                else:
+                    record["row_number"] = row_numbers[pos]
+                    record["fingerprint"] = fingerprints[pos]
+            normalize_ms += clock() - t2
+            for record in converted:
+                if record is not None:
+                    yield record
+    finally:
+        timings["parse"] = timings.get("parse", 0.0) + parse_ms * 1000
+        timings["normalize"] = timings.get("normalize", 0.0) + normalize_ms * 1000
+
+
+def _drop_known(rows: list[dict], known: set, stats: dict) -> list[dict]:
+    """Rows whose fingerprint is not in ``known``; the rest are rejected as already imported."""
+    kept = []
+    for row in rows:
+        if row["fingerprint"] in known:
+            stats["duplicates"] += 1
+            _reject(stats, row["row_number"], "already imported")
+        else:
+            kept.append(row)
+    return kept
+
+
+def _row_fingerprints(account_id, rows: list[list[str]]) -> list[int]:
+    """Stable 64-bit fingerprints of raw csv rows, scoped to the target account."""
+    prefix = f"{account_id}\x1e"
+    return [
+        int.from_bytes(
+            hashlib.blake2b((prefix + "\x1f".join(values)).encode(), digest_size=8).digest(),
+            "big", signed=True,
+        )
+        for values in rows
+    ]
+
+
+def _reject(stats: dict, row_number, reason: str) -> None:
+    if stats["first_error"] is None:
+        stats["first_error"] = (reason, row_number)
+    if len(stats["rejections"]) < INGEST_MAX_REJECTIONS:
+        stats["rejections"].append((row_number, reason))
+
+
+def _flush_batch(conn, batch: list[dict], account_id, rules, stats: dict, timings: dict,
+                 run_id: int | None = None, commit: bool = True) -> list[tuple]:
+    """
+    Resolve accounts, categories and merchants for a batch, then insert its
+    new rows atomically. If not ``commit`` the rows go into the caller's
+    transaction and must already carry merchant fields (intern_prepared_rows).
+    """
+    with accumulated(timings, "normalize"):
+        # Interned merchant ids are cached in-process, so intern outside the transaction
+        if commit:
+            annotate_merchant_fields(conn, batch)
+        if account_id is None:
+            account_ids = get_or_create_account_ids(conn, (r["account_name"] for r in batch))
+        for row in batch:
+            row["account_id"] = account_id if account_id is not None else account_ids[row["account_name"]]
+            row["ingestion_run_id"] = run_id
+
+    with accumulated(timings, "categorize"):
+        for row in batch:
+            if row["category"] is None:
+                row["category"] = evaluate_category(row["description"], rules)
+
+    if commit:
+        conn.begin()
+    try:
+        with accumulated(timings, "match"):
+            existing = find_existing_batch_rows(conn, batch)
+            seen = set()
+            new_rows = []
+            for row in batch:
+                key = (row["account_id"], row["date"], row["description"], row["amount"])
+                if row["row_number"] in existing or key in seen:
+                    stats["duplicates"] += 1
+                    _reject(stats, row["row_number"], "duplicate")
+                    continue
+                seen.add(key)
+                new_rows.append(row)
+        with accumulated(timings, "write"):
+            inserted = insert_transactions_batch(conn, new_rows)
+            if commit:
+                conn.commit()
+    except Exception:
+        if commit:
+            conn.rollback()
+        raise
+    if commit and inserted:
+        bump_ledger_version()
+    return inserted
+
+
+def _stream_failure(message: str) -> dict:
+    return {
+        "success": False,
+        "rows_imported": 0,
+        "rows_skipped": 0,
+        "categories_assigned": {},
+        "error_message": message,
+        "error_row": None,
+        "bytes_total": 0,
+        "row_count": 0,
+        "timings": {},
+        "rejections": [(None, message)],
+        "profile": None,
+    }
+
+
+def parse_csv_rows(contents: str, profile_name: str = None, account_id: int = None):
+    """
+    Parse CSV contents into rows for reconciliation. Returns (rows, error);
+    each row carries the raw-row ``fingerprint`` for ``account_id``.
+    """
+    reader = csv.reader(io.StringIO(contents, newline=""))
+    fieldnames = next(reader, None)
+    if not fieldnames:
+        return None, {"message": "CSV is missing headers", "row": None}
+    records = [values for values in reader if values]
+    try:
+        profile, date_format = sniff_profile(fieldnames, records[:SNIFF_SAMPLE_ROWS], profile_name)
+        convert = compile_batch_converter(profile, date_format, fieldnames)
+    except ValueError as e:
+        return None, {"message": str(e), "row": None}
+
+    converted, errors = convert(records)
+    if errors:
+        first = min(errors)
+        return None, {"message": errors[first], "row": first + 1}
+    rows = [
+        {
+            "date": row["date"],
+            "description": row["description"],
+            "amount": row["amount"],
+            "balance": row["balance"],
+            "category": row["category"],
+            "fingerprint": fingerprint,
+        }
+        for row, fingerprint in zip(converted, _row_fingerprints(account_id, records))
+    ]
+    return rows, None
@@ -0,0 +1,117 @@
+"""
+Dashboard Service — one consolidated ledger snapshot per ledger version.
+
+The snapshot (balance, month income/expenses, category breakdown, recent
+transactions, budget status) is one DuckDB round-trip and is cached until
+the ledger version changes, the month rolls over, or the TTL expires (a
+backstop for writes made outside this process). Projections stay uncached.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import date
+
+from db import get_db, get_ledger_version
+from repositories.dashboard_repository import get_dashboard_snapshot as repo_get_dashboard_snapshot
+from services.forecast_service import calculate_two_week_forecast
+from services.projection_service import calculate_two_week_projection
+from utils.timing import timed
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_TTL_SECONDS = int(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+
+# Single entry: (cache_key, created_monotonic, snapshot)
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_dashboard_snapshot() -> tuple[dict, bool]:
+    """
+    Return (snapshot, cache_hit). Snapshot keys: current_balance,
+    monthly_income, monthly_expenses, categories, recent_transactions,
+    budget_status. Treat the returned dict as read-only; it is shared.
+    """
+    global _cache
+    month_start = date.today().replace(day=1)
+    key = (get_ledger_version(), month_start)
+
+    with _cache_lock:
+        cached = _cache
+    if cached and cached[0] == key and time.monotonic() - cached[1] < DASHBOARD_CACHE_TTL_SECONDS:
+        return cached[2], True
+
+    conn = get_db()
+    try:
+        snapshot = repo_get_dashboard_snapshot(conn, month_start)
+    finally:
+        conn.close()
+
+    with _cache_lock:
+        _cache = (key, time.monotonic(), snapshot)
+    return snapshot, False
+
+
+def invalidate_dashboard_cache() -> None:
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def build_dashboard_context() -> tuple[dict, dict, dict]:
+    """
+    Template context for the dashboard plus per-section timings (ms) and
+    Server-Timing descriptions.
+    """
+    timings = {}
+    with timed(timings, "snapshot"):
+        snapshot, cache_hit = get_dashboard_snapshot()
+
+    income = snapshot["monthly_income"]
+    expenses = snapshot["monthly_expenses"]
+    categories = [(c["category"], c["total"]) for c in snapshot["categories"]]
+    spend_vs_budget = [
+        {**b, "remaining": round(b["budget"] - b["spent"], 2)}
+        for b in snapshot["budget_status"]
+    ]
+
+    # --- Two-week projection (new deterministic engine) ---
+    try:
+        with timed(timings, "projection"):
+            projection = calculate_two_week_projection()
+        projected_balance = projection.timeline[-1].projected_balance
+        with timed(timings, "forecast"):
+            forecast_conn = get_db()
+            try:
+                forecast = calculate_two_week_forecast(forecast_conn, date.today())
+            finally:
+                forecast_conn.close()
+        upcoming_items = forecast['items']
+    except Exception as e:
+        logger.warning(f"Projection error: {e}")
+        projected_balance = 0.0
+        upcoming_items = []
+
+    context = {
+        "current_balance": snapshot["current_balance"],
+        "monthly_income": income,
+        "monthly_expenses": expenses,
+        "monthly_net": income + expenses,
+        # names used by the balance card in dashboard.html
+        "income": income,
+        "expenses": expenses,
+        "net": income + expenses,
+        "categories": categories,
+        "category_labels": [c[0] for c in categories],
+        "category_totals": [float(abs(c[1])) for c in categories],
+        "recent_transactions": [
+            (t["id"], t["date"], t["description"], t["amount"], t["category"], t["recurring_event_id"])
+            for t in snapshot["recent_transactions"]
+        ],
+        "projected_balance": projected_balance,
+        "upcoming_items": upcoming_items,
+        "spend_vs_budget": spend_vs_budget,
+    }
+    descriptions = {"snapshot": "hit" if cache_hit else "miss"}
+    return context, timings, descriptions
@@ -0,0 +1,93 @@
+"""
+Export Service — stream the filtered ledger as CSV, Parquet or Arrow.
+
+Nothing is materialized in Python:
+- csv / parquet: DuckDB COPY writes to a temp file, which is streamed back in
+  fixed-size chunks and deleted when the response finishes.
+- arrow: record batches are pulled from DuckDB and written as an Arrow IPC
+  stream one batch at a time (requires pyarrow).
+"""
+import io
+import os
+import tempfile
+
+from db import get_db
+from repositories.transactions_repository import (
+    get_transactions_export_query,
+    copy_query_to_file,
+)
+from services.merchant_normalization import normalize_merchant
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+EXPORT_CHUNK_BYTES = 1024 * 1024
+EXPORT_BATCH_ROWS = 65536
+
+
+def export_transactions(filters: dict | None = None, fmt: str = "csv"):
+    """
+    Returns (chunk_iterator, media_type, filename) for the filtered ledger.
+    Raises ValueError on an unknown format or if arrow is requested without pyarrow.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r} (expected csv, parquet or arrow)")
+    filters = {k: v for k, v in (filters or {}).items() if v is not None and v != ""}
+    if filters.get("merchant"):
+        filters["merchant"] = normalize_merchant(filters["merchant"])
+    sql, params = get_transactions_export_query(filters)
+
+    media_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"transactions.{extension}"
+    if fmt == "arrow":
+        try:
+            import pyarrow  # noqa: F401 — DuckDB needs it for record batches
+        except ImportError:
+            raise ValueError("arrow export requires pyarrow")
+        return _stream_arrow(sql, params), media_type, filename
+    return _stream_copy(sql, params, fmt), media_type, filename
+
+
+def _stream_copy(sql: str, params: list, fmt: str):
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        conn = get_db()
+        try:
+            copy_query_to_file(conn, sql, params, path, fmt)
+        finally:
+            conn.close()
+        with open(path, "rb") as f:
+            while chunk := f.read(EXPORT_CHUNK_BYTES):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def _stream_arrow(sql: str, params: list):
+    import pyarrow as pa
+
+    conn = get_db()
+    try:
+        result = conn.execute(sql, params)
+        to_reader = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+        reader = to_reader(EXPORT_BATCH_ROWS)
+
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, reader.schema) as writer:
+            yield _drain(sink)  # schema message
+            for batch in reader:
+                writer.write_batch(batch)
+                yield _drain(sink)
+        yield _drain(sink)  # end-of-stream marker
+    finally:
+        conn.close()
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
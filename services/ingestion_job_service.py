@@ -0,0 +1,631 @@
+"""
+Ingestion Job Service — CSV uploads processed off the request thread.
+
+An upload is copied to INGEST_UPLOAD_DIR and recorded as a queued row in
+``ingestion_runs``; the HTTP request returns immediately. A single worker
+thread claims queued jobs and records phase progress on the row:
+
+- direct:    parsing/inserting (streamed, see ingest_csv_stream) -> completed
+- reconcile: parsing -> matching -> awaiting_review
+- bulk:      parsing -> matching -> inserting -> completed (Parquet or Arrow
+             IPC backfills, see services.bulk_import_service)
+
+Reconciliation review sessions live in process memory (routes.reconciliation),
+so a finished match is parked here until the status route hands it over.
+Jobs left mid-phase by a previous process are requeued if their upload
+file still exists; re-running is safe because ingestion skips duplicates.
+Jobs left awaiting review lost their session with that process and are
+marked failed; nothing was written for them, so the file can be uploaded again.
+
+Re-uploads are cheap: a file whose sha256 matches a completed run for the
+same account finishes at enqueue as a 'duplicate' run, without being
+read, and rows whose raw fingerprint an earlier run recorded are dropped
+before conversion or reconciliation scoring.
+
+Files uploaded together (several files, or the CSVs inside a ZIP) share a
+batch_id. The worker claims a batch's direct jobs together, parses and
+converts the files concurrently in a process pool (INGEST_PARSE_WORKERS),
+then writes them serially, one DuckDB transaction per target account.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from db import get_db, bump_ledger_version
+from repositories.ingestion_repository import (
+    create_ingestion_job,
+    get_ingestion_job as repo_get_ingestion_job,
+    claim_next_ingestion_job,
+    claim_batch_ingestion_jobs,
+    list_batch_jobs,
+    list_interrupted_ingestion_jobs,
+    fail_orphaned_reviews,
+    update_ingestion_progress,
+    finish_ingestion_job,
+    requeue_ingestion_job,
+    record_rejections,
+    find_completed_run_by_hash,
+    find_known_fingerprints,
+    record_known_fingerprints,
+)
+from services.bank_profiles import BANK_PROFILES_BY_NAME
+from repositories.category_rules_repository import get_all_category_rules
+from services.budget_alert_service import evaluate_budget_alerts
+from services.bulk_import_service import bulk_import_file
+from services.csv_ingest_service import (
+    INGEST_MAX_REJECTIONS,
+    ingest_csv_stream,
+    parse_csv_rows,
+    prepare_csv_file,
+    intern_prepared_rows,
+    write_prepared_rows,
+    ingest_result,
+)
+from services.reconciliation_service import initiate_reconciliation
+from services.search_service import request_search_index_refresh
+from utils.timing import timed, accumulated
+
+logger = logging.getLogger(__name__)
+
+INGEST_UPLOAD_DIR = os.getenv("INGEST_UPLOAD_DIR", "data/uploads")
+INGEST_JOB_POLL_SECONDS = int(os.getenv("INGEST_JOB_POLL_SECONDS", "30"))
+# Batch uploads: parser processes, and the largest file parsed in one piece
+# (bigger files are streamed on the worker thread instead)
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+INGEST_PARALLEL_MAX_BYTES = int(os.getenv("INGEST_PARALLEL_MAX_BYTES", str(64 * 1024 * 1024)))
+# Total uncompressed size accepted from one ZIP upload
+INGEST_ZIP_MAX_BYTES = int(os.getenv("INGEST_ZIP_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Set on enqueue so the worker does not wait out the poll interval
+_wake = threading.Event()
+
+# job id -> reconciliation session payload awaiting hand-off to the review page
+_pending_reviews = {}
+_pending_lock = threading.Lock()
+
+_parse_pool = None
+
+
+def enqueue_ingestion_batch(uploads: list[tuple], account_id: int | None, mode: str,
+                            profile: str | None = None) -> dict:
+    """
+    Queue several uploads as one batch. ``uploads`` is a list of
+    (fileobj, filename); ZIP archives are expanded to the CSV files they
+    contain. Returns {"batch_id", "jobs"}. Raises ValueError on a bad
+    archive or if no CSV file was uploaded.
+    """
+    _validate_request(account_id, mode, profile)
+    batch_id = uuid.uuid4().hex
+    jobs = []
+    for fileobj, filename in uploads:
+        filename = filename or "upload.csv"
+        if filename.lower().endswith(".zip"):
+            for member_obj, member_name in _iter_zip_csvs(fileobj, filename):
+                with member_obj:
+                    jobs.append(enqueue_ingestion_job(
+                        member_obj, member_name, account_id, mode, profile, batch_id=batch_id,
+                    ))
+        else:
+            jobs.append(enqueue_ingestion_job(
+                fileobj, filename, account_id, mode, profile, batch_id=batch_id,
+            ))
+    if not jobs:
+        raise ValueError("No CSV files found in the upload")
+    return {"batch_id": batch_id, "jobs": jobs}
+
+
+def _iter_zip_csvs(fileobj, filename: str):
+    """Yield (member file object, "archive.zip/member.csv") for each CSV in a ZIP."""
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise ValueError(f"{filename} is not a valid ZIP archive")
+    with archive:
+        members = [
+            m for m in archive.infolist()
+            if not m.is_dir()
+            and m.filename.lower().endswith(".csv")
+            and not m.filename.startswith("__MACOSX/")
+            and not os.path.basename(m.filename).startswith(".")
+        ]
+        if sum(m.file_size for m in members) > INGEST_ZIP_MAX_BYTES:
+            raise ValueError(f"{filename} expands beyond the {INGEST_ZIP_MAX_BYTES} byte limit")
+        for member in members:
+            yield archive.open(member), f"{filename}/{member.filename}"
+
+
+def enqueue_ingestion_job(fileobj, filename: str, account_id: int | None, mode: str,
+                          profile: str | None = None, batch_id: str | None = None) -> dict:
+    """
+    Copy the upload to disk and queue it. ``mode`` is "direct",
+    "reconcile" (requires an account) or "bulk" (a Parquet or Arrow IPC
+    file); ``profile`` forces a bank format instead of sniffing it.
+    Returns the job.
+    """
+    _validate_request(account_id, mode, profile)
+
+    os.makedirs(INGEST_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(INGEST_UPLOAD_DIR, f"{uuid.uuid4().hex}.{'bulk' if mode == 'bulk' else 'csv'}")
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as out:
+        while chunk := fileobj.read(1024 * 1024):
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    content_hash = digest.hexdigest()
+
+    conn = get_db()
+    try:
+        previous = find_completed_run_by_hash(conn, content_hash, account_id)
+        if previous is not None:
+            os.remove(path)
+        job = create_ingestion_job(
+            conn,
+            filename=filename or "upload.csv",
+            mode=mode,
+            account_id=account_id,
+            upload_path=None if previous else path,
+            bytes_total=size,
+            profile=profile or None,
+            content_hash=content_hash,
+            status="queued" if previous is None else "parsing",
+            batch_id=batch_id,
+            duplicate_of=previous["id"] if previous else None,
+        )
+        if previous is not None:
+            message = f"Identical file already imported (run {previous['id']})"
+            update_ingestion_progress(
+                conn, job["id"],
+                bytes_processed=job["bytes_total"],
+                row_count=previous["row_count"],
+                skipped_count=previous["row_count"],
+            )
+            record_rejections(job["id"], [(None, message)])
+            finish_ingestion_job(conn, job["id"], "duplicate", error=message)
+            return _with_progress(repo_get_ingestion_job(conn, job["id"]))
+    finally:
+        conn.close()
+
+    _wake.set()
+    return _with_progress(job)
+
+
+def _validate_request(account_id, mode: str, profile: str | None) -> None:
+    if profile and profile not in BANK_PROFILES_BY_NAME:
+        raise ValueError(f"Unknown bank format: {profile!r}")
+    if mode not in ("direct", "reconcile", "bulk"):
+        raise ValueError(f"Unknown ingestion mode: {mode!r}")
+    if mode == "bulk" and profile:
+        raise ValueError("Bank formats apply to CSV uploads only")
+    if mode == "reconcile" and account_id is None:
+        raise ValueError("Reconciliation requires an account")
+
+
+def get_ingestion_batch(batch_id: str) -> dict | None:
+    """
+    Combined status of an upload batch: status ("running" until every job
+    is completed, duplicate, awaiting_review, failed or undone), overall progress_pct, totals
+    and the jobs.
+    """
+    conn = get_db()
+    try:
+        jobs = [_with_progress(job) for job in list_batch_jobs(conn, batch_id)]
+    finally:
+        conn.close()
+    if not jobs:
+        return None
+    bytes_total = sum(job["bytes_total"] or 0 for job in jobs)
+    done = sum((job["bytes_total"] or 0) * job["progress_pct"] / 100 for job in jobs)
+    running = any(job["status"] not in ("completed", "duplicate", "awaiting_review", "failed", "undone") for job in jobs)
+    return {
+        "batch_id": batch_id,
+        "status": "running" if running else "finished",
+        "progress_pct": round(100.0 * done / bytes_total, 1) if bytes_total else (0.0 if running else 100.0),
+        "inserted_count": sum(job["inserted_count"] or 0 for job in jobs),
+        "skipped_count": sum(job["skipped_count"] or 0 for job in jobs),
+        "jobs": jobs,
+    }
+
+
+def get_ingestion_job(job_id: int) -> dict | None:
+    """Job status with progress_pct and, once matching is done, review_url."""
+    conn = get_db()
+    try:
+        job = repo_get_ingestion_job(conn, job_id)
+    finally:
+        conn.close()
+    return _with_progress(job) if job else None
+
+
+def take_pending_review(job_id: int) -> dict | None:
+    """Pop the reconciliation session payload produced by a reconcile job."""
+    with _pending_lock:
+        return _pending_reviews.pop(job_id, None)
+
+
+def _with_progress(job: dict) -> dict:
+    if job["status"] in ("completed", "duplicate", "awaiting_review", "undone"):
+        progress = 100.0
+    elif job["bytes_total"]:
+        progress = round(min(100.0, 100.0 * (job["bytes_processed"] or 0) / job["bytes_total"]), 1)
+    else:
+        progress = 0.0
+    review_url = None
+    if job["status"] == "awaiting_review" and job["review_session_id"]:
+        review_url = f"/reconciliation/review?session_id={job['review_session_id']}"
+    job = {k: v for k, v in job.items() if k != "upload_path"}
+    return {**job, "progress_pct": progress, "review_url": review_url}
+
+
+def run_ingestion_job(job: dict) -> str:
+    """Process a claimed job. Returns the final status written to it."""
+    job_id = job["id"]
+    path = job["upload_path"]
+    conn = None
+    try:
+        conn = get_db()
+        if job["mode"] == "reconcile":
+            status = _run_reconcile(conn, job)
+        elif job["mode"] == "bulk":
+            status = _run_bulk(conn, job)
+        else:
+            status = _run_direct(conn, job)
+        return status
+    except Exception as e:
+        logger.exception(f"Ingestion job {job_id} failed")
+        _fail_job(conn, job_id, str(e))
+        return "failed"
+    finally:
+        if conn is not None:
+            conn.close()
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def _fail_job(conn, job_id: int, error: str) -> None:
+    """Mark a claimed job failed, on a fresh connection if ``conn`` is missing or unusable."""
+    if conn is not None:
+        try:
+            finish_ingestion_job(conn, job_id, "failed", error=error)
+            return
+        except Exception as e:
+            logger.warning(f"Ingestion job {job_id}: could not record failure, retrying on a new connection: {e}")
+    conn = get_db()
+    try:
+        finish_ingestion_job(conn, job_id, "failed", error=error)
+    finally:
+        conn.close()
+
+
+def _run_direct(conn, job: dict) -> str:
+    job_id = job["id"]
+    with open(job["upload_path"], "rb") as f:
+        update_ingestion_progress(conn, job_id, status="inserting")
+
+        def on_progress(rows_parsed, rows_inserted):
+            update_ingestion_progress(
+                conn, job_id,
+                bytes_processed=f.tell(), rows_parsed=rows_parsed, inserted_count=rows_inserted,
+            )
+
+        result = ingest_csv_stream(
+            f, account_id=job["account_id"], filename=job["filename"],
+            on_progress=on_progress, record_run=False, profile_name=job["profile"],
+            run_id=job_id,
+        )
+
+    return _finish_with_result(conn, job, result)
+
+
+def _finish_with_result(conn, job: dict, result: dict) -> str:
+    """Record an ingest result on the job and mark it completed or failed."""
+    job_id = job["id"]
+    record_rejections(job_id, result["rejections"])
+    if not result["success"]:
+        finish_ingestion_job(conn, job_id, "failed", error=result["error_message"])
+        return "failed"
+    update_ingestion_progress(
+        conn, job_id,
+        bytes_processed=job["bytes_total"],
+        inserted_count=result["rows_imported"],
+        skipped_count=result["rows_skipped"],
+        row_count=result["row_count"],
+        profile=result["profile"],
+        **{f"{phase}_ms": ms for phase, ms in result["timings"].items()},
+    )
+    error = result["error_message"]
+    if error and result["error_row"] is not None:
+        error = f"{error} (row {result['error_row']})"
+    finish_ingestion_job(conn, job_id, "completed", error=error)
+    return "completed"
+
+
+def _run_bulk(conn, job: dict) -> str:
+    job_id = job["id"]
+    try:
+        result = bulk_import_file(
+            job["upload_path"], account_id=job["account_id"], run_id=job_id,
+            on_phase=lambda status: update_ingestion_progress(conn, job_id, status=status),
+        )
+    except ValueError as e:
+        record_rejections(job_id, [(None, str(e))])
+        finish_ingestion_job(conn, job_id, "failed", error=str(e))
+        return "failed"
+    return _finish_with_result(conn, job, result)
+
+
+def _run_reconcile(conn, job: dict) -> str:
+    job_id = job["id"]
+    started = time.perf_counter()
+    timings = {}
+    try:
+        with timed(timings, "decode"), open(job["upload_path"], "rb") as f:
+            contents = f.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        record_rejections(job_id, [(None, "File must be UTF-8 encoded CSV")])
+        finish_ingestion_job(conn, job_id, "failed", error="File must be UTF-8 encoded CSV")
+        return "failed"
+
+    # parse_csv_rows normalizes as it parses; its time is reported as parse
+    with timed(timings, "parse"):
+        csv_rows, parse_error = parse_csv_rows(
+            contents, profile_name=job["profile"], account_id=job["account_id"],
+        )
+    if parse_error:
+        record_rejections(job_id, [(parse_error.get("row"), parse_error["message"])])
+        row_info = f" (row {parse_error['row']})" if parse_error.get("row") is not None else ""
+        finish_ingestion_job(conn, job_id, "failed", error=parse_error["message"] + row_info)
+        return "failed"
+    row_count = len(csv_rows)
+
+    # Rows an earlier run already ingested never reach match scoring
+    with timed(timings, "match"):
+        known = find_known_fingerprints(conn, [row["fingerprint"] for row in csv_rows])
+        record_known_fingerprints(conn, job_id, list(known))
+    if known:
+        record_rejections(job_id, [
+            (row_number, "already imported")
+            for row_number, row in enumerate(csv_rows, start=1)
+            if row["fingerprint"] in known
+        ][:INGEST_MAX_REJECTIONS])
+        csv_rows = [row for row in csv_rows if row["fingerprint"] not in known]
+    update_ingestion_progress(
+        conn, job_id,
+        status="matching", bytes_processed=job["bytes_total"], rows_parsed=row_count,
+        row_count=row_count, skipped_count=row_count - len(csv_rows),
+    )
+    if not csv_rows:
+        timings["total"] = (time.perf_counter() - started) * 1000
+        update_ingestion_progress(conn, job_id, **{f"{phase}_ms": ms for phase, ms in timings.items()})
+        finish_ingestion_job(conn, job_id, "completed", error="All rows were already imported")
+        return "completed"
+
+    with accumulated(timings, "match"):
+        result = initiate_reconciliation(job["account_id"], csv_rows)
+    timings["total"] = (time.perf_counter() - started) * 1000
+    session_id = result["session_id"]
+    with _pending_lock:
+        _pending_reviews[job_id] = {
+            "ingestion_run_id": job_id,
+            "account_id": job["account_id"],
+            "session_id": session_id,
+            "auto_matched": result["auto_matched"],
+            "review_matches": result["review_matches"],
+            "unmatched_csv": result["unmatched_csv"],
+            "unmatched_manual": result["unmatched_manual"],
+            "csv_rows": result["csv_rows"],
+            "existing_entries": result["existing_entries"],
+        }
+    update_ingestion_progress(
+        conn, job_id,
+        rows_matched=len(result["auto_matched"]) + len(result["review_matches"]),
+        review_session_id=session_id,
+        **{f"{phase}_ms": ms for phase, ms in timings.items()},
+    )
+    finish_ingestion_job(conn, job_id, "awaiting_review")
+    return "awaiting_review"
+
+
+def run_ingestion_batch(jobs: list[dict]) -> dict:
+    """
+    Process claimed direct jobs of one upload batch: files up to
+    INGEST_PARALLEL_MAX_BYTES are parsed concurrently in the process pool,
+    then written serially with one transaction per target account (a
+    failed write fails every job of that account). Larger files, and
+    everything when INGEST_PARSE_WORKERS < 2, go through run_ingestion_job.
+    Returns {job_id: final status}.
+    """
+    statuses = {}
+    parallel = [job for job in jobs if (job["bytes_total"] or 0) <= INGEST_PARALLEL_MAX_BYTES]
+    if INGEST_PARSE_WORKERS < 2 or len(parallel) < 2:
+        parallel = []
+    for job in jobs:
+        if job not in parallel:
+            statuses[job["id"]] = run_ingestion_job(job)
+    if not parallel:
+        return statuses
+
+    started = time.perf_counter()
+    try:
+        prepared = _prepare_files(parallel)
+        groups = {}
+        for job in parallel:
+            groups.setdefault(job["account_id"], []).append(job)
+        conn = get_db()
+        try:
+            for account_id, group in groups.items():
+                statuses.update(_write_account_group(conn, account_id, group, prepared, started))
+        finally:
+            conn.close()
+    except Exception as e:
+        # Parsing or connecting failed outside the per-account writes
+        logger.exception("Ingestion batch failed")
+        for job in parallel:
+            if job["id"] not in statuses:
+                _fail_job(None, job["id"], str(e))
+                statuses[job["id"]] = "failed"
+    finally:
+        for job in parallel:
+            if job["upload_path"] and os.path.exists(job["upload_path"]):
+                os.remove(job["upload_path"])
+    return statuses
+
+
+def _prepare_files(jobs: list[dict]) -> dict:
+    """prepare_csv_file for each job in the process pool. Returns {job_id: result}."""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=INGEST_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+        )
+    futures = {
+        job["id"]: _parse_pool.submit(prepare_csv_file, job["upload_path"], job["account_id"], job["profile"])
+        for job in jobs
+    }
+    prepared = {}
+    for job_id, future in futures.items():
+        try:
+            prepared[job_id] = future.result()
+        except Exception as e:
+            logger.exception(f"Parsing ingestion job {job_id} failed")
+            if isinstance(e, BrokenProcessPool):
+                _parse_pool = None
+            prepared[job_id] = {"success": False, "error_message": str(e) or type(e).__name__,
+                                "rejections": [(None, str(e) or type(e).__name__)], "rows": []}
+    return prepared
+
+
+def _write_account_group(conn, account_id, jobs: list[dict], prepared: dict, started: float) -> dict:
+    statuses = {}
+    ready = []
+    for job in jobs:
+        result = prepared[job["id"]]
+        if result["success"]:
+            ready.append(job)
+            update_ingestion_progress(conn, job["id"], status="inserting", rows_parsed=result["stats"]["parsed"])
+        else:
+            record_rejections(job["id"], result["rejections"])
+            finish_ingestion_job(conn, job["id"], "failed", error=result["error_message"])
+            statuses[job["id"]] = "failed"
+    if not ready:
+        return statuses
+
+    rules = get_all_category_rules(conn)
+    try:
+        for job in ready:
+            result = prepared[job["id"]]
+            intern_prepared_rows(conn, result["rows"], result["timings"])
+        conn.begin()
+        try:
+            for job in ready:
+                result = prepared[job["id"]]
+                write_prepared_rows(
+                    conn, result["rows"], account_id, rules, result["stats"], result["timings"], run_id=job["id"],
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    except Exception as e:
+        logger.exception(f"Writing ingestion batch for account {account_id} failed")
+        for job in ready:
+            finish_ingestion_job(conn, job["id"], "failed", error=f"Batch write failed: {e}")
+            statuses[job["id"]] = "failed"
+        return statuses
+    bump_ledger_version()
+
+    alert_buckets = set()
+    for job in ready:
+        result = prepared[job["id"]]
+        stats, timings = result["stats"], result["timings"]
+        alert_buckets |= stats["alert_buckets"]
+        timings["total"] = (time.perf_counter() - started) * 1000
+        summary = ingest_result(stats, timings, result["profile"])
+        record_rejections(job["id"], summary["rejections"])
+        update_ingestion_progress(
+            conn, job["id"],
+            bytes_processed=job["bytes_total"],
+            rows_parsed=summary["row_count"],
+            inserted_count=summary["rows_imported"],
+            skipped_count=summary["rows_skipped"],
+            row_count=summary["row_count"],
+            profile=summary["profile"],
+            **{f"{phase}_ms": ms for phase, ms in timings.items()},
+        )
+        error = summary["error_message"]
+        if error and summary["error_row"] is not None:
+            error = f"{error} (row {summary['error_row']})"
+        finish_ingestion_job(conn, job["id"], "completed", error=error)
+        statuses[job["id"]] = "completed"
+    if alert_buckets:
+        evaluate_budget_alerts(conn, sorted(alert_buckets, key=str))
+    if any(prepared[job["id"]]["stats"]["inserted"] for job in ready):
+        request_search_index_refresh()
+    return statuses
+
+
+def _recover_interrupted_jobs() -> None:
+    conn = get_db()
+    try:
+        for job in list_interrupted_ingestion_jobs(conn):
+            if job["upload_path"] and os.path.exists(job["upload_path"]):
+                requeue_ingestion_job(conn, job["id"])
+                logger.info(f"Requeued interrupted ingestion job {job['id']}.")
+            else:
+                finish_ingestion_job(conn, job["id"], "failed", error="Interrupted; upload file is gone")
+        orphaned = fail_orphaned_reviews(conn, "Review session lost on restart; upload the file again")
+        if orphaned:
+            logger.info(f"Failed ingestion jobs awaiting a lost review: {orphaned}")
+    finally:
+        conn.close()
+
+
+def start_ingestion_worker() -> None:
+    """
+    Worker loop (called from a daemon thread). Once at startup, requeues or
+    fails interrupted jobs and fails jobs whose review session was lost;
+    then processes queued jobs one at a time. Errors, including the startup
+    sweep's, are logged and retried.
+    """
+    recovered = False
+    while True:
+        try:
+            if not recovered:
+                _recover_interrupted_jobs()
+                recovered = True
+
+            # Clear before polling: an enqueue after the poll sets it again
+            _wake.clear()
+            conn = get_db()
+            try:
+                job = claim_next_ingestion_job(conn)
+            finally:
+                conn.close()
+
+            if job is None:
+                _wake.wait(timeout=INGEST_JOB_POLL_SECONDS)
+                continue
+
+            if job["batch_id"] and job["mode"] == "direct":
+                conn = get_db()
+                try:
+                    jobs = [job, *claim_batch_ingestion_jobs(conn, job["batch_id"], "direct")]
+                finally:
+                    conn.close()
+                for job_id, status in run_ingestion_batch(jobs).items():
+                    logger.info(f"Ingestion job {job_id} finished: {status}")
+                continue
+
+            status = run_ingestion_job(job)
+            logger.info(f"Ingestion job {job['id']} finished: {status}")
+        except Exception as e:
+            logger.exception(f"Ingestion worker error, retrying: {e}")
+            _wake.wait(timeout=INGEST_JOB_POLL_SECONDS)
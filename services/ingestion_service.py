@@ -1,5 +1,62 @@
-from repositories.ingestion_repository import get_ingestion_history as repo_get_ingestion_history
+from db import get_db, bump_ledger_version
+from repositories.ingestion_repository import (
+    get_ingestion_history as repo_get_ingestion_history,
+    get_rejections,
+    get_rejection_summary,
+    get_ingestion_job,
+    mark_duplicate_runs_undone,
+    update_ingestion_progress,
+    undo_ingestion_run as repo_undo_ingestion_run,
+)
+from services.search_service import request_search_index_refresh
+
+# Runs still being processed or awaiting review have nothing final to undo
+UNDOABLE_STATUSES = ("completed", "failed")
 
 
 def get_ingestion_history(limit: int = 100) -> list[dict]:
     return repo_get_ingestion_history(limit=limit)
+
+
+def get_ingestion_rejections(run_id: int, limit: int = 1000) -> dict:
+    """Rejected rows of a run plus counts per reason."""
+    return {
+        "run_id": run_id,
+        "summary": get_rejection_summary(run_id),
+        "rejections": get_rejections(run_id, limit=limit),
+    }
+
+
+def undo_ingestion_run(run_id: int) -> dict | None:
+    """
+    Roll back an ingestion run atomically: delete the transactions it
+    inserted and restore the rows its reconciliation rewrote. The run is
+    marked 'undone', with its 'duplicate' placeholder runs, so the same
+    file and rows can be imported again.
+    Returns {run_id, status, deleted, reverted}, or None for an unknown
+    run. Raises ValueError if the run is in progress, awaiting review or
+    already undone.
+    """
+    conn = get_db()
+    try:
+        run = get_ingestion_job(conn, run_id)
+        if run is None:
+            return None
+        if run["status"] not in UNDOABLE_STATUSES:
+            raise ValueError(f"Ingestion run {run_id} is {run['status']} and cannot be undone")
+        conn.begin()
+        try:
+            result = repo_undo_ingestion_run(conn, run_id)
+            update_ingestion_progress(conn, run_id, status="undone")
+            mark_duplicate_runs_undone(conn, run_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+
+    if result["deleted"] or result["reverted"]:
+        bump_ledger_version()
+        request_search_index_refresh()
+    return {"run_id": run_id, "status": "undone", **result}
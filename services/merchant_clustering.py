@@ -0,0 +1,134 @@
+"""
+Merchant Clustering — group near-identical normalized merchants before AI calls.
+
+Bank exports produce many variants of the same merchant that normalize_merchant
+leaves distinct ("AMAZON MKTPL*2K4", "AMAZON MKTPL*9Q1", "AMZN MKTP US").
+Clustering lets the categorizer classify one representative per cluster and
+fan the result out.
+
+Pure functions. No database access; no side effects.
+"""
+import re
+from collections import Counter
+
+# Text after '*' or '#' is either a reference code ("MKTPL*2K4") or the
+# merchant behind a payment processor ("SQ *BLUE BOTTLE"); only codes are dropped
+_REF_SEPARATOR = re.compile(r'\s*[*#]\s*')
+_REF_MAX_LEN = 3
+_DIGIT_TOKENS = re.compile(r'\S*\d\S*')
+_DIGITS = re.compile(r'\d+')
+_SPACES = re.compile(r'\s+')
+# Abbreviations banks use for the same business, folded into one spelling
+_TOKEN_ALIASES = {"AMZN": "AMAZON", "MKTP": "MKTPL", "MKTPLACE": "MKTPL", "MARKETPLACE": "MKTPL"}
+# Country codes some processors append ("AMZN MKTP US")
+_COUNTRY_SUFFIXES = {"US", "USA"}
+
+
+def _is_reference(text: str) -> bool:
+    """Every token has a digit ("2K4 991"), or it is one short token ("XQ")."""
+    tokens = text.split()
+    if len(tokens) == 1 and len(tokens[0]) <= _REF_MAX_LEN:
+        return True
+    return all(any(ch.isdigit() for ch in t) for t in tokens)
+
+
+def cluster_key(merchant: str) -> str:
+    """
+    Reduce a normalized merchant to the part that identifies the business.
+    A processor prefix stays in the key together with the merchant after it.
+
+    Examples:
+    - "AMAZON MKTPL*2K4" -> "AMAZON MKTPL"
+    - "AMZN MKTP US" -> "AMAZON MKTPL"
+    - "SHELL OIL 57442" -> "SHELL OIL"
+    - "TARGET T-1234" -> "TARGET"
+    - "SQ *BLUE BOTTLE COFFEE" -> "SQ BLUE BOTTLE COFFEE"
+    - "SQ *ACE HARDWARE 123" -> "SQ ACE HARDWARE"
+    - "PAYPAL *NETFLIX" -> "PAYPAL NETFLIX"
+    - "TST* CHIPOTLE 0412" -> "TST CHIPOTLE"
+    - "UBER *EATS" -> "UBER EATS"
+    """
+    head, *parts = _REF_SEPARATOR.split(merchant)
+    base = ' '.join([head, *(p for p in parts if not _is_reference(p))]).strip() or merchant
+    tokens = [_TOKEN_ALIASES.get(t, t) for t in _DIGIT_TOKENS.sub('', base).split()]
+    if len(tokens) > 1 and tokens[-1] in _COUNTRY_SUFFIXES:
+        tokens.pop()
+    key = ' '.join(tokens)
+    if not key:
+        # Name is itself alphanumeric ("7-ELEVEN 1234"): drop only the digit runs
+        key = _SPACES.sub(' ', _DIGITS.sub('', base)).strip()
+    return key or merchant
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the padded character trigrams of ``a`` and ``b``."""
+    ga, gb = _trigrams(a), _trigrams(b)
+    union = len(ga | gb)
+    return len(ga & gb) / union if union else 0.0
+
+
+def _representative(members: list[str]) -> str:
+    """Fewest digits, then shortest, then alphabetical: the cleanest name for the prompt."""
+    return min(members, key=lambda m: (sum(ch.isdigit() for ch in m), len(m), m))
+
+
+def cluster_merchants(merchants: list[str], threshold: float = 0.8) -> list[list[str]]:
+    """
+    Group merchants whose cluster keys are identical or have trigram Jaccard
+    similarity >= ``threshold``.
+
+    Returns a list of clusters in order of first appearance. Each cluster is
+    a list of merchants with the representative first, then the remaining
+    members in input order.
+
+    Deterministic: same inputs always produce the same clusters.
+    """
+    # Exact blocking on cluster key
+    keys: list[str] = []
+    members_by_key: dict[str, list[str]] = {}
+    for merchant in merchants:
+        key = cluster_key(merchant)
+        if key not in members_by_key:
+            members_by_key[key] = []
+            keys.append(key)
+        members_by_key[key].append(merchant)
+
+    # Union-find over keys, candidates drawn from a trigram inverted index
+    parent = list(range(len(keys)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    grams = [_trigrams(k) for k in keys]
+    index: dict[str, list[int]] = {}
+    for i, g in enumerate(grams):
+        shared = Counter()
+        for t in g:
+            for j in index.get(t, ()):
+                shared[j] += 1
+        for j, overlap in shared.items():
+            if overlap / (len(g) + len(grams[j]) - overlap) >= threshold:
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[max(ri, rj)] = min(ri, rj)
+        for t in g:
+            index.setdefault(t, []).append(i)
+
+    grouped: dict[int, list[str]] = {}
+    for i, key in enumerate(keys):
+        grouped.setdefault(find(i), []).extend(members_by_key[key])
+
+    clusters = []
+    for root in sorted(grouped):
+        members = grouped[root]
+        rep = _representative(members)
+        clusters.append([rep] + [m for m in members if m != rep])
+    return clusters
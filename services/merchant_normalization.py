@@ -1,55 +1,72 @@
 import re
+from functools import lru_cache
+
+# Store/register numbers like #1234, #456789
+_STORE_NUMBER = re.compile(r'#\d+')
+
+# Noise words (POS, ONLINE, TRANSFER, FEE, DEBIT, CREDIT) and bank codes like XXXX1234.
+# One alternation replaces the per-word loop. It must run after _STORE_NUMBER:
+# removing "#123" can expose a word boundary ("#123POS" -> "POS").
+_NOISE = re.compile(r'\b(?:POS|ONLINE|TRANSFER|FEE|DEBIT|CREDIT)\b|X{4}\d+')
+
+# Bank exports repeat the same merchants heavily; keep the hot set in memory
+_MEMO_SIZE = 16384
+
 
 def normalize_merchant(description: str) -> str:
     """
     Deterministic normalization of merchant name from transaction description.
-    
-    Pure function, no side effects, no network calls.
-    
+
+    Pure function, no side effects, no network calls. Results are memoized
+    (LRU) since bank exports repeat the same descriptions heavily.
+
     Transformations (in order):
     1. Trim whitespace from beginning and end
     2. Convert to uppercase
     3. Collapse multiple spaces to single space
     4. Remove aggressive noise: POS, ONLINE, TRANSFER, FEE
     5. Remove patterns like #<numbers>, store numbers, and bank codes
-    
+
     Examples:
     - "STARBUCKS #1234 POS" -> "STARBUCKS"
-    - "AMAZON.COM AMZN.COM/BILL" -> "AMAZON.COM"
-    - "TRANSFER TO SAVINGS" -> "TRANSFER TO SAVINGS" (only removed as suffixes)
+    - "AMAZON.COM AMZN.COM/BILL" -> "AMAZON.COM AMZN.COM/BILL"
+    - "TRANSFER TO SAVINGS" -> "TO SAVINGS"
     - "CHASE FEE" -> "CHASE"
-    
+
     Args:
         description: raw transaction description string
-    
+
     Returns:
         cleaned merchant name string
     """
     if not description or not isinstance(description, str):
         return ""
-    
-    # Step 1: Trim whitespace
-    text = description.strip()
-    
-    # Step 2: Convert to uppercase
-    text = text.upper()
-    
-    # Step 3: Collapse multiple spaces to single space
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Step 4 & 5: Remove noise patterns
-    # Remove store/register numbers like #1234, #456789
-    text = re.sub(r'#\d+', '', text)
-    
-    # Remove common noise suffixes: POS, ONLINE, TRANSFER, FEE
-    noise_words = ['POS', 'ONLINE', 'TRANSFER', 'FEE', 'DEBIT', 'CREDIT']
-    for word in noise_words:
-        text = re.sub(r'\b' + word + r'\b', '', text)
-    
-    # Remove bank codes and routing patterns (e.g., XXXX1234 at end)
-    text = re.sub(r'X{4}\d+', '', text)
-    
-    # Clean up any trailing/leading punctuation and repeated spaces again
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
+    return _normalize_cached(description)
+
+
+def normalize_many(descriptions) -> list[str]:
+    """
+    Batch form of normalize_merchant for ingestion.
+
+    Returns one normalized merchant per input, in order. Repeated descriptions
+    within the batch are normalized once.
+    """
+    seen: dict[str, str] = {}
+    result = []
+    for description in descriptions:
+        if not description or not isinstance(description, str):
+            result.append("")
+            continue
+        merchant = seen.get(description)
+        if merchant is None:
+            merchant = seen[description] = _normalize_cached(description)
+        result.append(merchant)
+    return result
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def _normalize_cached(description: str) -> str:
+    text = _STORE_NUMBER.sub('', description.upper())
+    text = _NOISE.sub('', text)
+    # split/join trims and collapses whitespace in one step
+    return ' '.join(text.split())
@@ -0,0 +1,110 @@
+"""
+Merchant dimension — resolve normalized merchant names to integer merchant ids.
+
+Ids are interned in the merchants table and never reassigned, so resolved
+ids are cached in-process for the life of the server.
+
+Every ledger write path derives merchant_normalized and merchant_id through
+merchant_fields / annotate_merchant_fields so merchant lookups stay complete.
+"""
+from db import get_db
+from repositories.merchants_repository import intern_merchants
+from repositories.transactions_repository import (
+    get_merchant_fields_batch,
+    bulk_set_merchant_fields,
+)
+from services.merchant_normalization import normalize_merchant, normalize_many
+from services.search_service import request_search_index_refresh
+
+_merchant_id_cache: dict[str, int] = {}
+
+
+def resolve_merchant_id(conn, merchant_normalized: str) -> int | None:
+    """Return the merchant id for a normalized name, interning it if new. None for empty names."""
+    if not merchant_normalized:
+        return None
+    merchant_id = _merchant_id_cache.get(merchant_normalized)
+    if merchant_id is None:
+        merchant_id = resolve_merchant_ids(conn, [merchant_normalized])[merchant_normalized]
+    return merchant_id
+
+
+def resolve_merchant_ids(conn, merchant_names) -> dict[str, int]:
+    """
+    Batch form of resolve_merchant_id for ingestion.
+    Returns {merchant_normalized: id} for every non-empty name; only cache misses hit the DB.
+    """
+    names = {n for n in merchant_names if n}
+    missing = [n for n in names if n not in _merchant_id_cache]
+    if missing:
+        _merchant_id_cache.update(intern_merchants(conn, missing))
+    return {n: _merchant_id_cache[n] for n in names}
+
+
+def merchant_fields(conn, description: str) -> tuple[str, int | None]:
+    """
+    The single normalization stage for one ledger write: returns
+    (merchant_normalized, merchant_id) derived from ``description``.
+    """
+    merchant_normalized = normalize_merchant(description)
+    return merchant_normalized, resolve_merchant_id(conn, merchant_normalized)
+
+
+def annotate_merchant_fields(conn, rows: list[dict]) -> list[dict]:
+    """
+    Batch form of merchant_fields: sets ``merchant_normalized`` and
+    ``merchant_id`` on each row dict from its ``description`` (in place).
+    Returns ``rows`` for convenience.
+    """
+    names = normalize_many(row.get("description") for row in rows)
+    ids = resolve_merchant_ids(conn, names)
+    for row, name in zip(rows, names):
+        row["merchant_normalized"] = name
+        row["merchant_id"] = ids.get(name)
+    return rows
+
+
+def backfill_merchant_fields(batch_size: int = 10000) -> dict:
+    """
+    Recompute merchant_normalized and merchant_id for every transaction whose
+    stored values are NULL or no longer match the current normalizer.
+
+    Walks the ledger in id order, normalizes each batch with normalize_many,
+    and writes only changed rows with one set-based UPDATE per batch.
+    Idempotent: a second run updates nothing.
+
+    Returns dict with scanned and updated counts.
+    """
+    conn = get_db()
+    try:
+        scanned = 0
+        updated = 0
+        after_id = None
+        while True:
+            batch = get_merchant_fields_batch(conn, after_id=after_id, limit=batch_size)
+            if not batch:
+                break
+            scanned += len(batch)
+            after_id = batch[-1]["id"]
+
+            names = normalize_many(r["description"] for r in batch)
+            ids = resolve_merchant_ids(conn, names)
+            changed = [
+                (r["id"], name, ids.get(name))
+                for r, name in zip(batch, names)
+                if r["merchant_normalized"] != name or r["merchant_id"] != ids.get(name)
+            ]
+            if changed:
+                bulk_set_merchant_fields(
+                    conn,
+                    transaction_ids=[c[0] for c in changed],
+                    merchant_names=[c[1] for c in changed],
+                    merchant_ids=[c[2] for c in changed],
+                )
+                updated += len(changed)
+
+        if updated:
+            request_search_index_refresh()
+        return {"scanned": scanned, "updated": updated}
+    finally:
+        conn.close()
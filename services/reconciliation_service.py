@@ -1,8 +1,16 @@
-from db import get_db
+from db import get_db, bump_ledger_version
 from repositories.transaction_reconciliation_repository import (
     reconcile_csv_with_manual,
     finalize_reconciliation
 )
+from services.merchant_service import annotate_merchant_fields
+from services.budget_alert_service import evaluate_budget_alerts
+from services.search_service import request_search_index_refresh
+from repositories.ingestion_repository import (
+    record_row_fingerprints,
+    update_ingestion_progress,
+    finish_ingestion_job,
+)
 
 
 def initiate_reconciliation(account_id: int, csv_rows: list) -> dict:
@@ -42,7 +50,37 @@ def apply_reconciliation(account_id: int, reconciliation_data: dict, user_approv
     """
     conn = get_db()
     try:
+        # Every row written from the CSV goes through the shared normalization stage
+        annotate_merchant_fields(conn, reconciliation_data['csv_rows'])
         result = finalize_reconciliation(conn, account_id, reconciliation_data, user_approvals)
+        if result['status'] == 'success':
+            bump_ledger_version()
+            evaluate_budget_alerts(conn)
+            request_search_index_refresh()
+            if reconciliation_data.get('ingestion_run_id') is not None:
+                _complete_ingestion_run(conn, account_id, reconciliation_data, user_approvals, result)
         return result
     finally:
         conn.close()
+
+
+def _complete_ingestion_run(conn, account_id: int, reconciliation_data: dict, user_approvals: dict,
+                            result: dict) -> None:
+    """
+    Mark the background job that produced this review completed and record
+    fingerprints of the CSV rows now in the ledger (matched or inserted),
+    so re-uploading them skips match scoring.
+    """
+    run_id = reconciliation_data['ingestion_run_id']
+    handled = {csv_idx for csv_idx, _, _ in reconciliation_data['auto_matched']}
+    handled.update(csv_idx for csv_idx, _ in user_approvals.get('approved_indices', []))
+    handled.update(reconciliation_data['unmatched_csv'])
+    handled.update(user_approvals.get('add_as_new_indices', []))
+    csv_rows = reconciliation_data['csv_rows']
+    record_row_fingerprints(conn, run_id, [
+        {**csv_rows[i], 'account_id': account_id}
+        for i in sorted(handled) if csv_rows[i].get('fingerprint') is not None
+    ])
+    update_ingestion_progress(conn, run_id, inserted_count=result['inserted_count'])
+    finish_ingestion_job(conn, run_id, 'completed')
+
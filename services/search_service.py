@@ -0,0 +1,190 @@
+"""
+Search Service — ranked text search over transaction descriptions.
+
+Stage 1 ranks with DuckDB FTS (BM25 over description and merchant_normalized).
+If the fts extension cannot be loaded it falls back to a substring scan.
+Stage 2 tops up short result lists with fuzzy matches, scored in SQL over
+the merchants dimension (thousands of names, not millions of rows): a
+jaro_winkler_similarity pass keeps the best candidates, trigram similarity
+ranks them, and transactions are joined by merchant_id.
+
+DuckDB FTS indexes do not update on write. Writes that add or rename
+searchable text call request_search_index_refresh, which marks the index
+dirty; a background thread rebuilds it once the index has been dirty for
+SEARCH_INDEX_DEBOUNCE_SECONDS, so a burst of writes costs one rebuild.
+The first search in a process schedules the startup build the same way.
+Searches keep using the previous index meanwhile. Deleted rows drop out
+of results without a rebuild because matches are joined to transactions.
+"""
+import logging
+import os
+import threading
+import time
+
+from db import get_db
+from repositories.search_repository import (
+    load_fts,
+    fts_index_exists,
+    rebuild_fts_index,
+    search_fts,
+    search_substring,
+    search_fuzzy,
+)
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FTS_ENABLED = os.getenv("SEARCH_FTS_ENABLED", "true").lower() in ("true", "1", "yes")
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.3"))
+SEARCH_FUZZY_CANDIDATES = int(os.getenv("SEARCH_FUZZY_CANDIDATES", "500"))
+SEARCH_INDEX_DEBOUNCE_SECONDS = float(os.getenv("SEARCH_INDEX_DEBOUNCE_SECONDS", "2"))
+
+_CONNECT_ATTEMPTS = 5      # a rebuild's connect can race another thread closing the database
+_CONNECT_RETRY_SECONDS = 0.2
+
+_state_lock = threading.Lock()
+_fts_available = None      # None = not tried yet
+_index_built = False       # built by this process; the first search schedules the startup build
+_index_dirty = False
+_dirty_since = 0.0
+_refreshing = False
+
+
+def search_transactions(query: str, limit: int = 50) -> dict:
+    """
+    Ranked search. Returns dict with query, engine ("fts" or "substring"),
+    index_stale, and results (transaction dicts with score and match:
+    "fts" | "substring" | "fuzzy"). Raises ValueError on an empty query.
+    """
+    query = (query or "").strip()
+    if not query:
+        raise ValueError("q is required")
+
+    conn = get_db()
+    try:
+        engine = "substring"
+        stale = False
+        results = []
+        if _ensure_fts(conn):
+            if fts_index_exists(conn):
+                engine = "fts"
+                try:
+                    results = search_fts(conn, query, limit)
+                except Exception as e:
+                    # Index may be mid-rebuild on another connection
+                    logger.warning(f"FTS search failed, using substring match: {e}")
+                    engine = "substring"
+            if not _index_built:
+                request_search_index_refresh()
+            stale = _index_dirty
+            if stale:
+                _start_refresh()
+        if engine == "substring":
+            results = search_substring(conn, query, limit)
+        for r in results:
+            r["match"] = engine
+
+        if len(results) < limit:
+            seen = {r["id"] for r in results}
+            for r in _fuzzy_matches(conn, query, limit):
+                if r["id"] not in seen and len(results) < limit:
+                    results.append({**r, "match": "fuzzy"})
+    finally:
+        conn.close()
+
+    return {"query": query, "engine": engine, "index_stale": stale, "results": results}
+
+
+def _fuzzy_matches(conn, query: str, limit: int) -> list[dict]:
+    """Transactions whose merchant is trigram-similar to the query (see search_fuzzy)."""
+    q = query.upper()
+    tokens = [t for t in q.split() if len(t) >= 3] or [q]
+    return search_fuzzy(conn, q, tokens, SEARCH_FUZZY_THRESHOLD, max(SEARCH_FUZZY_CANDIDATES, limit), limit)
+
+
+def _ensure_fts(conn) -> bool:
+    """Load the fts extension on ``conn``; remembers failure for the process lifetime."""
+    global _fts_available
+    if not SEARCH_FTS_ENABLED or _fts_available is False:
+        return False
+    try:
+        load_fts(conn)
+    except Exception:
+        try:
+            load_fts(conn, install=True)
+        except Exception as e:
+            logger.warning(f"DuckDB fts extension unavailable, search uses substring match: {e}")
+            _fts_available = False
+            return False
+    _fts_available = True
+    return True
+
+
+def request_search_index_refresh() -> bool:
+    """
+    Mark the FTS index dirty after a write and make sure a rebuild is
+    scheduled. Returns True if a refresh thread was started.
+    """
+    global _index_dirty, _dirty_since
+    if not SEARCH_FTS_ENABLED or _fts_available is False:
+        return False
+    with _state_lock:
+        if not _index_dirty:
+            _index_dirty = True
+            _dirty_since = time.monotonic()
+    return _start_refresh()
+
+
+def _start_refresh() -> bool:
+    global _refreshing
+    with _state_lock:
+        if _refreshing:
+            return False
+        _refreshing = True
+    threading.Thread(target=_refresh_index, daemon=True).start()
+    return True
+
+
+def _refresh_index() -> None:
+    global _index_built, _index_dirty, _refreshing
+    failed_connects = 0
+    try:
+        # Writes that land during a rebuild mark the index dirty again and get one more pass
+        while True:
+            with _state_lock:
+                if not _index_dirty:
+                    # Cleared under the lock so a concurrent request starts a new thread
+                    _refreshing = False
+                    return
+                wait = _dirty_since + SEARCH_INDEX_DEBOUNCE_SECONDS - time.monotonic()
+                if wait <= 0:
+                    _index_dirty = False
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            try:
+                conn = get_db()
+            except Exception as e:
+                with _state_lock:
+                    _index_dirty = True
+                failed_connects += 1
+                if failed_connects >= _CONNECT_ATTEMPTS:
+                    raise
+                logger.warning(f"FTS index rebuild could not connect, retrying: {e}")
+                time.sleep(_CONNECT_RETRY_SECONDS * failed_connects)
+                continue
+            failed_connects = 0
+            try:
+                if not _ensure_fts(conn):
+                    break
+                rebuild_fts_index(conn)
+                _index_built = True
+            except Exception:
+                with _state_lock:
+                    _index_dirty = True
+                raise
+            finally:
+                conn.close()
+    except Exception as e:
+        logger.exception(f"FTS index rebuild failed: {e}")
+    with _state_lock:
+        _refreshing = False
@@ -9,11 +9,13 @@ from telegram.ext import Application, ApplicationBuilder, CommandHandler, Contex
 from db import get_db
 from services.forecast_service import get_active_recurring_events, get_occurrences_in_window
 from services.projection_service import calculate_two_week_projection
+from services.budget_alert_service import get_pending_alerts, mark_delivered, mark_delivery_failed, format_alert
 
 logger = logging.getLogger(__name__)
 
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "")
+BUDGET_ALERT_POLL_SECONDS = int(os.environ.get("BUDGET_ALERT_POLL_SECONDS", "30"))
 
 
 # ---------------------------------------------------------------------------
@@ -119,6 +121,48 @@ async def cmd_summary(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
 
 
+# ---------------------------------------------------------------------------
+# Budget alert delivery
+# ---------------------------------------------------------------------------
+
+async def deliver_budget_alerts(bot) -> int:
+    """
+    Push unsent budget alerts to every chat in TELEGRAM_CHAT_ID and mark them
+    sent. When several thresholds of one category/month are pending, only the
+    highest is sent. Delivery is tracked per chat: a failed send counts an
+    attempt, records the chats that did get the message, and the alert is
+    retried next poll for the remaining chats until
+    BUDGET_ALERT_MAX_ATTEMPTS. DuckDB calls run in a worker thread, off the
+    bot's event loop. Returns the number of alerts delivered to every chat.
+    """
+    chat_ids = [cid.strip() for cid in TELEGRAM_CHAT_ID.split(",") if cid.strip()]
+    if not chat_ids:
+        return 0
+
+    buckets: dict[tuple, list[dict]] = {}
+    for alert in await asyncio.to_thread(get_pending_alerts):
+        buckets.setdefault((alert["category"], alert["month"]), []).append(alert)
+
+    sent = 0
+    for alerts in buckets.values():
+        top = max(alerts, key=lambda a: a["threshold_pct"])
+        ids = [a["id"] for a in alerts]
+        delivered = []
+        try:
+            for chat_id in chat_ids:
+                if chat_id in top["delivered_chats"]:
+                    continue
+                await bot.send_message(chat_id=chat_id, text=format_alert(top))
+                delivered.append(chat_id)
+        except Exception as e:
+            logger.warning(f"Budget alert {top['id']} not delivered to every chat: {e}")
+            await asyncio.to_thread(mark_delivery_failed, ids, str(e) or type(e).__name__, delivered)
+            continue
+        await asyncio.to_thread(mark_delivered, ids)
+        sent += 1
+    return sent
+
+
 # ---------------------------------------------------------------------------
 # Entry point (called from a daemon thread)
 # ---------------------------------------------------------------------------
@@ -141,8 +185,14 @@ def start_bot() -> None:
                 await application.start()
                 await application.updater.start_polling(drop_pending_updates=True)
                 logger.info("Telegram bot polling started.")
+                if not TELEGRAM_CHAT_ID:
+                    logger.warning("TELEGRAM_CHAT_ID not set — budget alerts will not be pushed.")
                 while True:
-                    await asyncio.sleep(60)
+                    try:
+                        await deliver_budget_alerts(application.bot)
+                    except Exception as e:
+                        logger.exception(f"Budget alert delivery failed: {e}")
+                    await asyncio.sleep(BUDGET_ALERT_POLL_SECONDS)
         except Exception as e:
             logger.exception(f"Bot run() raised an exception: {e}")
             raise
@@ -1,4 +1,8 @@
-from db import get_db
+import base64
+import json
+import logging
+
+from db import get_db, bump_ledger_version
 from repositories.transactions_repository import (
     get_all_transactions as repo_get_all_transactions,
     update_category as repo_update_category,
@@ -6,13 +10,30 @@ from repositories.transactions_repository import (
     get_transaction_by_id as repo_get_transaction_by_id,
     get_transactions_filtered as repo_get_transactions_filtered,
     delete_transactions as repo_delete_transactions,
+    get_transactions_page as repo_get_transactions_page,
+    count_transactions_capped,
+    bulk_update_category,
+    bulk_set_recurring_link,
+    get_transaction_ids_matching,
+    get_month_category_buckets,
+    recurring_event_exists,
+    TRANSACTION_SORTS,
+    TRANSACTION_FILTER_KEYS,
 )
+from repositories.spend_rollup_repository import count_from_rollup
 from repositories.transaction_reconciliation_repository import (
     set_transaction_recurring_link as repo_set_recurring_link,
 )
 from repositories.category_rules_repository import get_all_category_rules
 from services.category_rule_engine import evaluate_category
+from services.merchant_service import merchant_fields
 from services.merchant_normalization import normalize_merchant
+from services.budget_alert_service import evaluate_budget_alerts
+from services.search_service import request_search_index_refresh
+
+logger = logging.getLogger(__name__)
+
+BULK_OPERATIONS = ("set_category", "delete", "link_recurring", "unlink_recurring")
 
 
 def get_all_transactions(account_name=None, limit=None):
@@ -30,14 +51,24 @@ def get_all_transactions(account_name=None, limit=None):
 def update_transaction_category(transaction_id, category):
     conn = get_db()
     try:
-        repo_update_category(conn, transaction_id, category)
+        conn.begin()
+        try:
+            repo_update_category(conn, transaction_id, category)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        bump_ledger_version()
+        tx = repo_get_transaction_by_id(conn, transaction_id)
+        if tx:
+            evaluate_budget_alerts(conn, [(tx[2], category)])
     finally:
         conn.close()
 
 
 def add_transaction(*, date, description, amount,
                     balance=None, category=None, source='manual',
-                    user_id=None, merchant_id=None,
+                    user_id=None,
                     account_id=None, account_name=None):
     """Service wrapper around repository insert.
 
@@ -46,19 +77,20 @@ def add_transaction(*, date, description, amount,
 
     If no category is provided, deterministically evaluates rules.
     
-    Normalizes merchant name from description (deterministic transformation).
+    Normalizes merchant name from description (deterministic transformation)
+    and resolves it to an integer ``merchant_id`` in the merchants dimension.
     """
     conn = get_db()
     try:
         # Normalize merchant name from description
-        merchant_normalized = normalize_merchant(description)
+        merchant_normalized, merchant_id = merchant_fields(conn, description)
         
         # If no category provided, try to apply rules
         if category is None:
             rules = get_all_category_rules(conn)
             category = evaluate_category(description, rules)
 
-        return repo_insert_transaction(
+        transaction_id = repo_insert_transaction(
             conn,
             date=date,
             description=description,
@@ -72,6 +104,10 @@ def add_transaction(*, date, description, amount,
             account_id=account_id,
             account_name=account_name,
         )
+        bump_ledger_version()
+        request_search_index_refresh()
+        evaluate_budget_alerts(conn, [(date, category)])
+        return transaction_id
     finally:
         conn.close()
 
@@ -98,7 +134,15 @@ def apply_category_rules_to_transaction(transaction_id):
 
         # Update if match found
         if matched_category:
-            repo_update_category(conn, transaction_id, matched_category)
+            conn.begin()
+            try:
+                repo_update_category(conn, transaction_id, matched_category)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            bump_ledger_version()
+            evaluate_budget_alerts(conn, [(tx[2], matched_category)])
     finally:
         conn.close()
 
@@ -106,8 +150,10 @@ def apply_category_rules_to_transaction(transaction_id):
 def reclassify_all_transactions():
     """Re-apply category rules to all transactions deterministically.
 
-    Fetches all transactions, evaluates each against rules in priority order,
-    and updates category if a rule matches.
+    Fetches all transactions, evaluates each description against rules in
+    priority order, and keeps the rows whose matched category differs from
+    the stored one. Those are written with one bulk UPDATE per category, in
+    one transaction.
 
     Returns count of transactions updated.
     """
@@ -119,19 +165,31 @@ def reclassify_all_transactions():
         # Fetch rules once (sorted by priority)
         rules = get_all_category_rules(conn)
 
-        updated_count = 0
+        # Deterministically evaluate, once per distinct description
+        matched = {}
+        changes = {}
         for tx in transactions:
-            transaction_id = tx[0]
-            description = tx[3]
-
-            # Deterministically evaluate
-            matched_category = evaluate_category(description, rules)
+            transaction_id, description, category = tx[0], tx[3], tx[6]
+            if description not in matched:
+                matched[description] = evaluate_category(description, rules)
+            matched_category = matched[description]
+            if matched_category and matched_category != category:
+                changes.setdefault(matched_category, []).append(transaction_id)
 
-            # Update if match found
-            if matched_category:
-                repo_update_category(conn, transaction_id, matched_category)
-                updated_count += 1
+        updated_count = 0
+        if changes:
+            conn.begin()
+            try:
+                for matched_category, ids in changes.items():
+                    updated_count += bulk_update_category(conn, ids, matched_category)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
+        if updated_count:
+            bump_ledger_version()
+            evaluate_budget_alerts(conn)
         return updated_count
     finally:
         conn.close()
@@ -151,15 +209,195 @@ def get_filtered_transactions(start_date=None, end_date=None, category=None, acc
         conn.close()
 
 
+# Exact counts stop here; beyond it the page reports "more than" the cap
+TRANSACTIONS_COUNT_CAP = 10000
+_ROLLUP_COUNTABLE_FILTERS = {"start_date", "end_date", "category", "account_id"}
+
+
+def get_transactions_page(filters: dict | None = None, sort: str = "date_desc",
+                          cursor: str | None = None, limit: int = 100) -> dict:
+    """Keyset-paginated, filtered and sorted transactions.
+
+    ``filters`` keys as in transactions_repository.TRANSACTION_FILTER_KEYS;
+    ``cursor`` is the opaque ``next_cursor`` from the previous page.
+
+    Returns dict with transactions, next_cursor (None on the last page),
+    total_count and total_is_exact. The count comes from the monthly rollup
+    when the filters allow it, otherwise from a scan capped at
+    TRANSACTIONS_COUNT_CAP rows, so neither grows with ledger size.
+
+    Raises ValueError on an unknown sort or a malformed cursor.
+    """
+    if sort not in TRANSACTION_SORTS:
+        raise ValueError(f"Unknown sort: {sort!r}")
+    filters = {k: v for k, v in (filters or {}).items() if v is not None and v != ""}
+    if filters.get("merchant"):
+        filters["merchant"] = normalize_merchant(filters["merchant"])
+    after = _decode_cursor(cursor) if cursor else None
+
+    conn = get_db()
+    try:
+        rows = repo_get_transactions_page(conn, filters, sort=sort, after=after, limit=limit + 1)
+        total_count, total_is_exact = _count_transactions(conn, filters)
+    finally:
+        conn.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        sort_key = "date" if sort.startswith("date") else "amount"
+        next_cursor = _encode_cursor(rows[-1][sort_key], rows[-1]["id"])
+
+    return {
+        "transactions": rows,
+        "next_cursor": next_cursor,
+        "total_count": total_count,
+        "total_is_exact": total_is_exact,
+    }
+
+
+def _count_transactions(conn, filters: dict) -> tuple[int, bool]:
+    if set(filters) <= _ROLLUP_COUNTABLE_FILTERS:
+        # The rollup is month-grained: date bounds make this an estimate
+        count = count_from_rollup(
+            conn,
+            start_month=filters.get("start_date"),
+            end_month=filters.get("end_date"),
+            category=filters.get("category"),
+            account_id=filters.get("account_id"),
+        )
+        return count, not ("start_date" in filters or "end_date" in filters)
+    count = count_transactions_capped(conn, filters, TRANSACTIONS_COUNT_CAP)
+    if count > TRANSACTIONS_COUNT_CAP:
+        return TRANSACTIONS_COUNT_CAP, False
+    return count, True
+
+
+def _encode_cursor(sort_value, transaction_id: int) -> str:
+    if hasattr(sort_value, "isoformat"):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, transaction_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, transaction_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort_value, int(transaction_id)
+    except Exception:
+        raise ValueError("Malformed cursor")
+
+
 def delete_transactions(transaction_ids: list[int]) -> int:
     """Delete transactions by their IDs. Returns number deleted."""
     conn = get_db()
     try:
-        return repo_delete_transactions(conn, transaction_ids)
+        conn.begin()
+        try:
+            deleted = repo_delete_transactions(conn, transaction_ids)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
     finally:
         conn.close()
+    bump_ledger_version()
+    return deleted
 
 
 def link_transaction_to_recurring(*, transaction_id: int, recurring_event_id: int | None) -> None:
     """Set or clear the recurring_event_id link on a transaction."""
     repo_set_recurring_link(transaction_id=transaction_id, recurring_event_id=recurring_event_id)
+    bump_ledger_version()
+
+
+def apply_bulk_operations(operations: list[dict]) -> dict:
+    """
+    Apply a list of operations atomically: all of them or none.
+
+    Each operation is {"op": one of BULK_OPERATIONS, "ids": [...] or
+    "filter": {TRANSACTION_FILTER_KEYS...}, plus "category" for set_category
+    and "recurring_event_id" for link_recurring}. Filters are resolved to ids
+    inside the transaction, so later ops see the effect of earlier ones.
+
+    Returns {"success", "error", "results": [{"index", "op", "matched", "affected"}]}.
+    """
+    errors = [e for i, op in enumerate(operations) if (e := _validate_bulk_op(i, op))]
+    if not operations:
+        errors.append("No operations given")
+    if errors:
+        return {"success": False, "error": "; ".join(errors), "results": []}
+
+    conn = get_db()
+    results = []
+    touched_buckets = set()
+    try:
+        conn.begin()
+        try:
+            for i, op in enumerate(operations):
+                results.append(_apply_bulk_op(conn, i, op, touched_buckets))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"Bulk transaction update rolled back at operation {len(results)}: {e}")
+            return {
+                "success": False,
+                "error": f"Operation {len(results)} failed: {e}",
+                "results": [],
+            }
+        bump_ledger_version()
+        if touched_buckets:
+            evaluate_budget_alerts(conn, sorted(touched_buckets, key=str))
+    finally:
+        conn.close()
+
+    return {"success": True, "error": None, "results": results}
+
+
+def _validate_bulk_op(index: int, op: dict) -> str | None:
+    kind = op.get("op")
+    if kind not in BULK_OPERATIONS:
+        return f"Operation {index}: unknown op {kind!r}"
+    if not op.get("ids") and not op.get("filter"):
+        return f"Operation {index}: ids or a non-empty filter is required"
+    if op.get("ids") and op.get("filter"):
+        return f"Operation {index}: give ids or filter, not both"
+    unknown = set(op.get("filter") or {}) - set(TRANSACTION_FILTER_KEYS)
+    if unknown:
+        return f"Operation {index}: unknown filter keys {sorted(unknown)}"
+    if op.get("filter") and not any(v not in (None, "") for v in op["filter"].values()):
+        return f"Operation {index}: filter has no values"
+    if kind == "set_category" and not (op.get("category") or "").strip():
+        return f"Operation {index}: category is required for set_category"
+    if kind == "link_recurring" and op.get("recurring_event_id") is None:
+        return f"Operation {index}: recurring_event_id is required for link_recurring"
+    return None
+
+
+def _apply_bulk_op(conn, index: int, op: dict, touched_buckets: set) -> dict:
+    kind = op["op"]
+    if op.get("filter"):
+        filters = {k: v for k, v in op["filter"].items() if v is not None and v != ""}
+        if filters.get("merchant"):
+            filters["merchant"] = normalize_merchant(filters["merchant"])
+        ids = get_transaction_ids_matching(conn, filters)
+    else:
+        ids = [int(i) for i in op["ids"]]
+
+    if kind == "set_category":
+        category = op["category"].strip()
+        # Spend is net outflow, so a bucket losing refunds can cross a threshold too
+        for month, old_category in get_month_category_buckets(conn, ids):
+            touched_buckets.update({(month, old_category), (month, category)})
+        affected = bulk_update_category(conn, ids, category)
+    elif kind == "delete":
+        touched_buckets.update(get_month_category_buckets(conn, ids))
+        affected = repo_delete_transactions(conn, ids)
+    else:
+        event_id = op.get("recurring_event_id") if kind == "link_recurring" else None
+        if event_id is not None and not recurring_event_exists(conn, event_id):
+            raise ValueError(f"recurring event {event_id} not found")
+        affected = bulk_set_recurring_link(conn, ids, event_id)
+
+    return {"index": index, "op": kind, "matched": len(ids), "affected": affected}
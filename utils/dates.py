@@ -1,5 +1,52 @@
-from datetime import datetime
+from datetime import date, datetime
 
 def normalize_date(raw_date: str) -> str:
     date_obj = datetime.strptime(raw_date, "%m/%d/%Y")
-    return date_obj.strftime("%Y-%m-%d")
\ No newline at end of file
+    return date_obj.strftime("%Y-%m-%d")
+
+
+def date_parser(fmt: str):
+    """Fastest parser for one fixed format, returning an ISO date string."""
+    if fmt == "%Y-%m-%d":
+        return lambda s: date.fromisoformat(s).isoformat()
+    if fmt == "%m/%d/%Y":
+        def parse_mdy(s):
+            try:
+                month, day, year = s.split("/")
+                if len(year) != 4:
+                    raise ValueError
+                return date(int(year), int(month), int(day)).isoformat()
+            except ValueError:
+                raise ValueError(f"time data {s!r} does not match format '%m/%d/%Y'") from None
+        return parse_mdy
+    return lambda s: datetime.strptime(s, fmt).date().isoformat()
+
+
+def parse_date_column(values: list, fmt: str = "%m/%d/%Y", memo: dict | None = None) -> tuple[list, dict]:
+    """
+    Parse a whole column of date strings in one format to ISO strings.
+
+    Exports repeat the same few dates, so each distinct string is parsed
+    once; pass the same ``memo`` across calls to share it for a file.
+    Returns (dates, errors): dates[i] is None where invalid, errors maps
+    i -> message.
+    """
+    memo = {} if memo is None else memo
+    parse = None
+    dates = []
+    errors = {}
+    for i, value in enumerate(values):
+        iso = memo.get(value)
+        if iso is None:
+            parse = parse or date_parser(fmt)
+            try:
+                iso = parse(value.strip())
+            except ValueError as exc:
+                iso = exc
+            memo[value] = iso
+        if iso.__class__ is str:
+            dates.append(iso)
+        else:
+            dates.append(None)
+            errors[i] = str(iso)
+    return dates, errors
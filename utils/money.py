@@ -1,3 +1,4 @@
+import re
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
 def parse_money(value: str) -> Decimal:
@@ -22,4 +23,37 @@ def parse_money(value: str) -> Decimal:
     except InvalidOperation as exc:
         raise ValueError("invalid money value") from exc
 
-    return -amount if is_negative else amount
\ No newline at end of file
+    return -amount if is_negative else amount
+
+# Plain "-123.45"-style amounts; float() of these equals float(parse_money())
+_PLAIN_AMOUNT = re.compile(r"-?\d+(?:\.\d{1,2})?")
+
+
+def parse_money_column(values: list, required: bool = True) -> tuple[list, dict]:
+    """
+    Parse a whole column of money strings to floats rounded to cents.
+
+    Plain amounts take a fast float() path; anything else ($, commas,
+    parentheses, more than two decimals) goes through parse_money.
+    Returns (amounts, errors): amounts[i] is None where the value is blank
+    or invalid, errors maps i -> message (blank is only an error when
+    ``required``).
+    """
+    plain = _PLAIN_AMOUNT.fullmatch
+    amounts = []
+    errors = {}
+    for i, value in enumerate(values):
+        if value and plain(value):
+            amounts.append(float(value))
+            continue
+        if value is None or not value.strip():
+            amounts.append(None)
+            if required:
+                errors[i] = "empty money value"
+            continue
+        try:
+            amounts.append(float(parse_money(value)))
+        except ValueError as exc:
+            amounts.append(None)
+            errors[i] = str(exc)
+    return amounts, errors
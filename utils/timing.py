@@ -0,0 +1,37 @@
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def timed(timings: dict, name: str):
+    """Record the block's wall time in milliseconds as ``timings[name]``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def accumulated(timings: dict, name: str):
+    """Like ``timed`` but adds to ``timings[name]``, for phases entered repeatedly."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def format_server_timing(timings: dict, descriptions: dict | None = None) -> str:
+    """
+    Render {name: ms} as a Server-Timing header value, e.g.
+    'snapshot;dur=1.2;desc="hit", projection;dur=8.4'.
+    """
+    descriptions = descriptions or {}
+    parts = []
+    for name, ms in timings.items():
+        part = f"{name};dur={ms:.1f}"
+        if name in descriptions:
+            part += f';desc="{descriptions[name]}"'
+        parts.append(part)
+    return ", ".join(parts)